@@ -1,4 +1,16 @@
 from django.contrib import admin
 from .models import *
 # Register your models here.
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(User)
+
+
+@admin.register(PartnerAPIKey)
+class PartnerAPIKeyAdmin(admin.ModelAdmin):
+    list_display = ("prefix", "user", "name", "is_active", "usage_count", "last_used_at", "created_at")
+    list_filter = ("is_active",)
+    search_fields = ("prefix", "user__email", "name")
+    readonly_fields = ("prefix", "hashed_key", "usage_count", "last_used_at", "created_at")
+
+    def has_add_permission(self, request):
+        # Keys are issued by register_partner or `manage.py create_partner_key`
+        return False
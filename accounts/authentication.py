@@ -0,0 +1,232 @@
+"""
+Partner API-key authentication.
+
+Partners send their key in the ``X-API-Token`` header. Verified keys are kept
+in a per-process LRU (hashed key -> key id and user) for PARTNER_API_KEYS
+["CACHE_TTL"] seconds. Usage counts are buffered in memory and written back in
+batches. In steady state a partner request costs no database query at all.
+
+Every worker has its own LRU, so revocation goes through a version number in
+the shared cache: saving or deleting a key, or deactivating (or changing the
+role of) a user who has keys, bumps it, and cached entries verified under an
+older version are checked against the database again. With a shared cache
+backend (Redis, Memcached) that reaches every worker on its next request.
+With the default per-process LocMemCache only the worker that made the
+change sees the bump, and the others keep accepting a revoked key until its
+entry expires, CACHE_TTL seconds at most.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+from .models import PartnerAPIKey, User
+
+HEADER = "X-API-Token"
+VERSION_KEY = "partner-api-keys:version"
+
+
+def _setting(key, default):
+    return getattr(settings, "PARTNER_API_KEYS", {}).get(key, default)
+
+
+class VerifiedKeyCache:
+    """Thread-safe LRU of verified keys with a time-to-live."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, hashed_key):
+        with self._lock:
+            entry = self._entries.get(hashed_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[hashed_key]
+                return None
+            self._entries.move_to_end(hashed_key)
+            return entry[1]
+
+    def set(self, hashed_key, value):
+        with self._lock:
+            self._entries[hashed_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(hashed_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, hashed_key):
+        with self._lock:
+            self._entries.pop(hashed_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UsageCounter:
+    """Buffers per-key request counts and flushes them in one transaction."""
+
+    def __init__(self, flush_every, flush_interval):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._counts = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def hit(self, key_id):
+        with self._lock:
+            self._counts[key_id] = self._counts.get(key_id, 0) + 1
+            self._pending += 1
+            due = (
+                self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        if not counts:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            for key_id, count in counts.items():
+                PartnerAPIKey.objects.filter(pk=key_id).update(
+                    usage_count=F("usage_count") + count, last_used_at=now
+                )
+
+
+key_cache = VerifiedKeyCache(_setting("CACHE_SIZE", 10000), _setting("CACHE_TTL", 300))
+usage = UsageCounter(_setting("USAGE_FLUSH_EVERY", 100), _setting("USAGE_FLUSH_INTERVAL", 30))
+
+
+def _flush_usage_at_exit():
+    try:
+        usage.flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_usage_at_exit)
+
+
+def key_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, not 1: an evicted counter must never reuse old versions
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def revoke_cached_keys():
+    """Make every worker re-verify the keys it has cached."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def verify_api_key(raw_key):
+    """Return (api_key, user) for a valid active key, else None."""
+    hashed_key = PartnerAPIKey.hash_key(raw_key)
+    version = key_version()
+    cached = key_cache.get(hashed_key)
+    if cached is not None:
+        api_key, user, verified_under = cached
+        if verified_under != version or not (api_key.is_active and user.is_active):
+            key_cache.discard(hashed_key)
+            cached = None
+    if cached is None:
+        try:
+            api_key = PartnerAPIKey.objects.select_related("user").get(
+                hashed_key=hashed_key, is_active=True
+            )
+        except PartnerAPIKey.DoesNotExist:
+            return None
+        if not api_key.user.is_active or api_key.user.role != "partner":
+            return None
+        cached = (api_key, api_key.user, version)
+        key_cache.set(hashed_key, cached)
+
+    usage.hit(cached[0].pk)
+    return cached[:2]
+
+
+def prime_key_cache(limit=None):
+    """Load active keys into the cache, e.g. when a worker boots."""
+    version = key_version()
+    keys = PartnerAPIKey.objects.select_related("user").filter(
+        is_active=True, user__is_active=True, user__role="partner"
+    ).order_by("-last_used_at")
+    for api_key in keys[: limit or key_cache.max_size]:
+        key_cache.set(api_key.hashed_key, (api_key, api_key.user, version))
+
+
+def get_request_api_key(request):
+    """
+    The PartnerAPIKey behind a request: the one it authenticated with, or a
+    key in the X-API-Token header sent alongside a freelancer's own
+    credentials. Resolved once per request.
+    """
+    if isinstance(request.auth, PartnerAPIKey):
+        return request.auth
+    if not hasattr(request, "_partner_api_key"):
+        raw_key = request.headers.get(HEADER)
+        verified = verify_api_key(raw_key) if raw_key else None
+        request._partner_api_key = verified[0] if verified else None
+    return request._partner_api_key
+
+
+def get_request_partner(request):
+    """The partner user behind a request, if any."""
+    api_key = get_request_api_key(request)
+    return api_key.user if api_key else None
+
+
+class PartnerAPIKeyAuthentication(BaseAuthentication):
+    """Authenticates a partner platform by its X-API-Token header."""
+
+    def authenticate(self, request):
+        raw_key = request.headers.get(HEADER)
+        if not raw_key:
+            return None
+        verified = verify_api_key(raw_key)
+        if verified is None:
+            raise exceptions.AuthenticationFailed("Invalid or revoked API key.")
+        api_key, user = verified
+        return user, api_key
+
+
+def _evict_key(sender, instance, **kwargs):
+    key_cache.discard(instance.hashed_key)
+    revoke_cached_keys()
+
+
+def _user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login
+    if update_fields is not None and not {"is_active", "role"} & set(update_fields):
+        return
+    if PartnerAPIKey.objects.filter(user_id=instance.pk).exists():
+        revoke_cached_keys()
+
+
+post_save.connect(_evict_key, sender=PartnerAPIKey, dispatch_uid="partner_api_key_evict_saved")
+post_delete.connect(_evict_key, sender=PartnerAPIKey, dispatch_uid="partner_api_key_evict_deleted")
+post_save.connect(_user_changed, sender=User, dispatch_uid="partner_api_key_user_saved")
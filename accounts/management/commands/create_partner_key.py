@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import PartnerAPIKey, User
+
+
+class Command(BaseCommand):
+    help = "Issue an API key for a partner account. The raw key is printed once and never stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("--name", default="", help="Label for the key, e.g. the partner's site")
+        parser.add_argument("--revoke-existing", action="store_true", help="Deactivate the partner's other keys")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        if user.role != "partner":
+            raise CommandError(f"{user.email} is not a partner account")
+
+        if options["revoke_existing"]:
+            # Save one by one so each revoked key is evicted from the auth cache
+            for api_key in user.api_keys.filter(is_active=True):
+                api_key.is_active = False
+                api_key.save(update_fields=["is_active"])
+
+        api_key, raw_key = PartnerAPIKey.generate(user, name=options["name"])
+        self.stdout.write(self.style.SUCCESS(f"Created key {api_key.prefix} for {user.email}:"))
+        self.stdout.write(raw_key)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_partner_api_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partnerapikey',
+            name='quotas',
+            field=models.JSONField(blank=True, default=dict, help_text='Rate overrides per throttle scope, e.g. {"thirdparty.watch": "300/min", "*": "1000/min"}'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import hashlib
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
@@ -31,6 +34,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     ROLE_CHOICES = (
         ("admin", "Admin"),
         ("user", "User"),
+        ("partner", "Partner"),
     )
 
     email = models.EmailField(unique=True)
@@ -47,3 +51,40 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class PartnerAPIKey(models.Model):
+    """
+    API key a partner platform sends in the X-API-Token header. Only a
+    SHA-256 of the key is stored; the raw key is shown once at creation.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_keys")
+    name = models.CharField(max_length=100, blank=True)
+    prefix = models.CharField(max_length=8, db_index=True, help_text="Public part of the key, for identification")
+    hashed_key = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    quotas = models.JSONField(
+        default=dict, blank=True,
+        help_text='Rate overrides per throttle scope, e.g. {"thirdparty.watch": "300/min", "*": "1000/min"}',
+    )
+    usage_count = models.PositiveBigIntegerField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.email} | {self.prefix} | {'Active' if self.is_active else 'Revoked'}"
+
+    @staticmethod
+    def hash_key(raw_key):
+        # Keys are 256-bit random, so a fast hash is enough and keeps verification cheap
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    @classmethod
+    def generate(cls, user, name=""):
+        """Create a key for user. Returns (api_key, raw_key)."""
+        prefix = secrets.token_hex(4)
+        raw_key = f"{prefix}.{secrets.token_urlsafe(32)}"
+        api_key = cls.objects.create(
+            user=user, name=name, prefix=prefix, hashed_key=cls.hash_key(raw_key)
+        )
+        return api_key, raw_key
@@ -1,3 +1,97 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from . import authentication
+from .authentication import UsageCounter, VerifiedKeyCache, key_cache, revoke_cached_keys, verify_api_key
+from .models import PartnerAPIKey, User
+
+
+class PartnerAPIKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        key_cache.clear()
+        self.partner = User.objects.create_user("partner@example.com", "partner", "partner", None)
+        self.api_key, self.raw_key = PartnerAPIKey.generate(self.partner)
+
+    def test_keys_are_stored_hashed_and_verified_from_the_cache(self):
+        self.assertNotIn(self.raw_key, self.api_key.hashed_key)
+        self.assertEqual(self.api_key.hashed_key, PartnerAPIKey.hash_key(self.raw_key))
+
+        client = APIClient()
+        client.credentials(HTTP_X_API_TOKEN=self.raw_key)
+        self.assertEqual(client.get("/api/gigs/jobs/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(verify_api_key(self.raw_key), (self.api_key, self.partner))
+
+        client.credentials(HTTP_X_API_TOKEN=self.raw_key + "x")
+        self.assertEqual(client.get("/api/gigs/jobs/").status_code, 401)
+
+    def test_revocation_reaches_cached_keys(self):
+        self.assertIsNotNone(verify_api_key(self.raw_key))
+        # As if another worker revoked it: the row changes and the shared version moves
+        PartnerAPIKey.objects.filter(pk=self.api_key.pk).update(is_active=False)
+        self.assertIsNotNone(verify_api_key(self.raw_key))
+        revoke_cached_keys()
+        self.assertIsNone(verify_api_key(self.raw_key))
+
+    def test_deactivating_the_partner_revokes_their_keys(self):
+        self.assertIsNotNone(verify_api_key(self.raw_key))
+        self.partner.is_active = False
+        self.partner.save()
+        self.assertIsNone(verify_api_key(self.raw_key))
+
+        # A cached entry whose user was marked inactive is checked again
+        self.partner.is_active = True
+        self.partner.save()
+        _, user = verify_api_key(self.raw_key)
+        user.is_active = False
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(verify_api_key(self.raw_key))
+
+    def test_logins_do_not_flush_the_cache(self):
+        verify_api_key(self.raw_key)
+        self.partner.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            verify_api_key(self.raw_key)
+
+
+class VerifiedKeyCacheTests(TestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        lru = VerifiedKeyCache(max_size=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+
+    def test_entries_expire(self):
+        lru = VerifiedKeyCache(max_size=2, ttl=60)
+        with mock.patch.object(authentication.time, "monotonic", return_value=1000.0):
+            lru.set("a", 1)
+        with mock.patch.object(authentication.time, "monotonic", return_value=1059.0):
+            self.assertEqual(lru.get("a"), 1)
+        with mock.patch.object(authentication.time, "monotonic", return_value=1061.0):
+            self.assertIsNone(lru.get("a"))
+
+
+class UsageCounterTests(TestCase):
+    def test_usage_is_written_in_batches(self):
+        partner = User.objects.create_user("partner@example.com", "partner", "partner", None)
+        api_key, _ = PartnerAPIKey.generate(partner)
+        counter = UsageCounter(flush_every=3, flush_interval=3600)
+
+        with self.assertNumQueries(0):
+            counter.hit(api_key.pk)
+            counter.hit(api_key.pk)
+        counter.hit(api_key.pk)
+        api_key.refresh_from_db()
+        self.assertEqual(api_key.usage_count, 3)
+        self.assertIsNotNone(api_key.last_used_at)
 
-# Create your tests here.
+        counter.hit(api_key.pk)
+        counter.flush()
+        api_key.refresh_from_db()
+        self.assertEqual(api_key.usage_count, 4)
@@ -0,0 +1,224 @@
+"""
+Async variants of the ad watching endpoints.
+
+These mirror AdWatchingViewSet.start_view / complete_view / api_complete but
+use Django's async ORM, so under ASGI (e.g. ``uvicorn app.asgi:application``)
+a worker can keep many short watch requests in flight at once instead of
+blocking a thread on every query.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.authentication import CSRFCheck
+from rest_framework.authtoken.models import Token
+
+from . import credits, pacing
+from .models import Ad, AdSession
+
+
+async def _authenticate(request, allow_session=True):
+    """
+    Resolve the user the same way DRF's TokenAuthentication and
+    SessionAuthentication would. Returns (user, error_response).
+    """
+    auth = request.headers.get("Authorization", "").split()
+    if auth and auth[0].lower() == "token":
+        if len(auth) != 2:
+            return None, JsonResponse({"detail": "Invalid token header."}, status=401)
+        try:
+            token = await Token.objects.select_related("user").aget(key=auth[1])
+        except Token.DoesNotExist:
+            return None, JsonResponse({"detail": "Invalid token."}, status=401)
+        if not token.user.is_active:
+            return None, JsonResponse({"detail": "User inactive or deleted."}, status=401)
+        return token.user, None
+
+    if allow_session:
+        user = await request.auser()
+        if user.is_authenticated:
+            # Session auth needs the same CSRF protection DRF enforces.
+            check = CSRFCheck(lambda req: None)
+            check.process_request(request)
+            reason = check.process_view(request, None, (), {})
+            if reason:
+                return None, JsonResponse({"detail": f"CSRF Failed: {reason}"}, status=403)
+            return user, None
+
+    return None, JsonResponse(
+        {"detail": "Authentication credentials were not provided."}, status=401
+    )
+
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+    return request.POST
+
+
+async def _get_active_ad(pk):
+    try:
+        return await Ad.objects.aget(pk=pk, status="active")
+    except Ad.DoesNotExist:
+        return None
+
+
+async def _cooldown_error(user, ad):
+    """credits.cooldown_error in a worker thread, as an error response or None."""
+    error = await sync_to_async(credits.cooldown_error)(user, ad)
+    if error:
+        return JsonResponse({"success": "false", "error": error}, status=400)
+    return None
+
+
+async def _credit(user, ad, session=None):
+    """
+    credits.credit in a worker thread: the limit check and the insert need
+    one transaction, which the async ORM can't hold open. Returns an error
+    response or None.
+    """
+    error = await sync_to_async(credits.credit)(user, ad, session=session)
+    if error:
+        return JsonResponse({"success": "false", "error": error}, status=400)
+    return None
+
+
+@csrf_exempt
+@require_POST
+async def start_view(request, pk):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    ad = await _get_active_ad(pk)
+    if ad is None:
+        return JsonResponse(
+            {"success": "false", "error": "Ad not found or inactive"}, status=404
+        )
+
+    error = await _cooldown_error(user, ad)
+    if error:
+        return error
+    error = await sync_to_async(pacing.availability_error)(ad)
+    if error:
+        return JsonResponse({"success": "false", "error": error}, status=400)
+
+    await AdSession.objects.filter(user=user, ad=ad, is_completed=False).adelete()
+    ad_session = await AdSession.objects.acreate(user=user, ad=ad)
+
+    return JsonResponse(
+        {
+            "success": "true",
+            "message": "Ad view started. Please wait full duration.",
+            "started_at": ad_session.started_at.isoformat(),
+            "Duration": ad.duration,
+            "session_id": ad_session.id,
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+async def complete_view(request, pk):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+
+    ad = await _get_active_ad(pk)
+    if ad is None:
+        return JsonResponse(
+            {"success": "false", "error": "Ad not found or inactive"}, status=404
+        )
+
+    # Latest open session; concurrent start_view calls can leave more than one
+    ad_session = await (
+        AdSession.objects.filter(user=user, ad=ad, is_completed=False).order_by("-started_at").afirst()
+    )
+    if ad_session is None:
+        return JsonResponse(
+            {"success": "false", "error": "You must start viewing first"}, status=400
+        )
+
+    if ad_session.time_elapsed() < ad.duration:
+        return JsonResponse(
+            {"success": "false", "error": "You must view the full duration"}, status=400
+        )
+
+    error = await _credit(user, ad, session=ad_session)
+    if error:
+        return error
+
+    return JsonResponse(
+        {
+            "success": "true",
+            "message": f"You earned {ad.amount} USD",
+            "earned": float(ad.amount),
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+async def api_complete(request, pk):
+    """
+    Complete ad view via API (for third-party platforms like Project 2)
+    This doesn't require session, uses token authentication
+    """
+    user, error = await _authenticate(request, allow_session=False)
+    if error:
+        return error
+
+    ad = await _get_active_ad(pk)
+    if ad is None:
+        return JsonResponse(
+            {"success": "false", "error": "Ad not found or inactive"}, status=404
+        )
+
+    data = _request_data(request)
+    started_at_str = data.get("started_at")
+    duration_watched = data.get("duration_watched", 0)
+
+    if not started_at_str:
+        return JsonResponse(
+            {"success": "false", "error": "started_at timestamp is required"}, status=400
+        )
+
+    try:
+        started_at = timezone.datetime.fromisoformat(started_at_str.replace("Z", "+00:00"))
+        duration_watched = float(duration_watched)
+    except (ValueError, AttributeError, TypeError):
+        return JsonResponse(
+            {"success": "false", "error": "Invalid started_at format. Use ISO format."},
+            status=400,
+        )
+
+    elapsed = (timezone.now() - started_at).total_seconds()
+    actual_duration = max(duration_watched, elapsed)
+
+    if actual_duration < ad.duration:
+        return JsonResponse(
+            {
+                "success": "false",
+                "error": f"You must view the ad for at least {ad.duration} seconds. Watched: {int(actual_duration)}s",
+            },
+            status=400,
+        )
+
+    error = await _credit(user, ad)
+    if error:
+        return error
+
+    return JsonResponse(
+        {
+            "success": "true",
+            "message": f"You earned {ad.amount} USD",
+            "earned": str(ad.amount),
+            "ad_title": ad.title,
+            "ad_id": ad.id,
+        }
+    )
@@ -0,0 +1,84 @@
+"""
+Crediting completed ad views.
+
+A user earns from an ad once per 24 hours and from at most 10 ads per
+30 minutes. Checking those limits and then inserting the AdView is a
+read-then-write, so concurrent completions for one user could all pass the
+check and all be paid. credit() runs the check and the insert under a lock
+on the user's row (on SQLite, BEGIN IMMEDIATE already serialises writers),
+and claims the watch session with a conditional UPDATE so a session pays
+out at most once. The ad's max_show and daily budget are enforced by
+reserving the view in the pacing counters (ads.pacing) before it is written.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from api.tasks import enqueue
+from . import feed, pacing
+from .models import AdSession, AdView
+
+COOLDOWN = timedelta(hours=24)
+RATE_WINDOW = timedelta(minutes=30)
+RATE_LIMIT = 10
+
+
+def cooldown_error(user, ad):
+    """Why the user can't earn from this ad right now, or None."""
+    now = timezone.now()
+    recent_view = AdView.objects.filter(user=user, ad=ad, viewed_at__gte=now - COOLDOWN).first()
+    if recent_view:
+        remaining_seconds = (recent_view.viewed_at + COOLDOWN - now).total_seconds()
+        remaining_hours = int(remaining_seconds // 3600)
+        remaining_minutes = int((remaining_seconds % 3600) // 60)
+        return f"You can view this ad again after {remaining_hours}h {remaining_minutes}m."
+
+    window_start = now - RATE_WINDOW
+    recent_views = AdView.objects.filter(user=user, viewed_at__gte=window_start)
+    if recent_views.count() >= RATE_LIMIT:
+        oldest_recent = recent_views.order_by("viewed_at").first()
+        if oldest_recent:
+            remaining_seconds = (oldest_recent.viewed_at + RATE_WINDOW - now).total_seconds()
+            remaining_minutes = int(remaining_seconds // 60)
+            remaining_secs = int(remaining_seconds % 60)
+            return f"You can watch more ads after {remaining_minutes}m {remaining_secs}s."
+    return None
+
+
+def credit(user, ad, session=None):
+    """
+    Record a completed view of `ad` and queue its earning. Returns an error
+    message instead when a limit applies or `session` was already completed
+    by a concurrent request; nothing is written then.
+    """
+    with transaction.atomic():
+        get_user_model().objects.select_for_update().only("pk").get(pk=user.pk)
+
+        if session is not None:
+            claimed = AdSession.objects.filter(pk=session.pk, is_completed=False).update(is_completed=True)
+            if not claimed:
+                return "You must start viewing first"
+
+        error = cooldown_error(user, ad)
+        if error:
+            transaction.set_rollback(True)
+            return error
+
+        error = pacing.reserve(ad)
+        if error:
+            transaction.set_rollback(True)
+            return error
+        try:
+            AdView.objects.create(user=user, ad=ad, earned_amount=ad.amount)
+            # Earnings totals are updated by the task worker
+            enqueue("ads.credit_earnings", {"user_id": user.id, "amount": str(ad.amount)})
+        except Exception:
+            pacing.release(ad)
+            raise
+
+    if pacing.is_exhausted(ad):
+        # That was its last paid view (for today): take it out of the feed
+        feed.invalidate([ad.category])
+    return None
@@ -0,0 +1,91 @@
+"""
+The ad feed snapshot.
+
+user_ads serves every active ad minus the ones the user viewed in the last
+24 hours. The active catalog is the same for everyone, so it is rendered
+once into a snapshot (api.snapshots) and invalidated whenever an ad changes.
+Users with no recent views get the stored bytes as they are, precompressed
+included. For everyone else the viewed ads are cut out of those bytes
+(Snapshot.response(entry, exclude=...)), so there is still no serializer
+work per request.
+
+?category=<Ad.CATEGORY_CHOICES key> is served from that category's shard:
+a snapshot of its own, with its own version, ranked among the category's
+ads. Saving or deleting an ad invalidates the full feed and the shard of
+its category (before and after the save), so the other shards stay cached.
+
+Ads with no room left under their pacing caps (ads.pacing) are left out.
+The rest are ordered by ads.ranking. Crediting an ad's last view
+invalidates the full feed and the ad's shard, and the key includes the day, so ads capped by
+their daily budget come back at midnight.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from api.snapshots import Snapshot
+from . import pacing, ranking
+from .models import Ad
+from .serializers import AdSerializer
+
+CATEGORIES = [category for category, _ in Ad.CATEGORY_CHOICES]
+
+snapshot = Snapshot("ads-feed", "ADS_FEED_SECONDS", 300)
+shards = {category: Snapshot(f"ads-feed:{category}", "ADS_FEED_SECONDS", 300) for category in CATEGORIES}
+
+
+def eligible_ads(queryset=None):
+    """Active ads with room under their pacing caps, best ranked first."""
+    ads = list(queryset if queryset is not None else Ad.objects.filter(status="active"))
+    counts = {}
+    if pacing.enabled():
+        counts = pacing.counters([ad.pk for ad in ads])
+        ads = [ad for ad in ads if pacing.has_room(ad, *counts[ad.pk])]
+    return ranking.rank(ads, counts)
+
+
+def catalog(request, category=None):
+    """Snapshot entry for the eligible ads (of `category`, if given), as rendered for this host."""
+    queryset = Ad.objects.filter(status="active")
+    if category:
+        queryset = queryset.filter(category=category)
+
+    def build():
+        return {
+            "status": "success",
+            "message": "User Ads fetched successfully",
+            # Image variant URLs are absolute, so the host is part of the key
+            "data": AdSerializer(eligible_ads(queryset), many=True, context={"request": request}).data,
+        }
+    return snapshot_for(category).get((request.scheme, request.get_host(), pacing.today()), build, rows="data")
+
+
+def snapshot_for(category=None):
+    return shards[category] if category else snapshot
+
+
+def invalidate(categories=None):
+    """Invalidate the full feed and the shards of `categories` (default: every shard)."""
+    snapshot.invalidate()
+    for category in CATEGORIES if categories is None else set(categories):
+        if category in shards:
+            shards[category].invalidate()
+
+
+def invalidate_on_commit(categories=None):
+    transaction.on_commit(lambda: invalidate(categories))
+
+
+def _ad_saving(sender, instance, **kwargs):
+    # A category change leaves the ad's old shard stale too
+    instance._feed_categories = {instance.category}
+    if instance.pk is not None:
+        instance._feed_categories.update(Ad.objects.filter(pk=instance.pk).values_list("category", flat=True))
+
+
+def _ad_changed(sender, instance, **kwargs):
+    invalidate_on_commit(getattr(instance, "_feed_categories", {instance.category}))
+
+
+pre_save.connect(_ad_saving, sender=Ad, dispatch_uid="ads_feed_ad_saving")
+post_save.connect(_ad_changed, sender=Ad, dispatch_uid="ads_feed_ad_saved")
+post_delete.connect(_ad_changed, sender=Ad, dispatch_uid="ads_feed_ad_deleted")
@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ads import ranking
+from api.snapshots import Snapshot, _render_rows
+from ads.models import Ad
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the ad feed over a synthetic catalog: ranking it (done once per feed "
+        "snapshot) and cutting a user's recently viewed ads out of the rendered "
+        "snapshot (done per request). Needs no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ads", type=int, default=50000)
+        parser.add_argument("--viewed", type=int, default=10, help="Recently viewed ads to filter out per request.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        now = timezone.now()
+        ads, counts = [], {}
+        for pk in range(1, options["ads"] + 1):
+            ad = Ad(
+                pk=pk, title=f"Ad {pk}", category=rng.choice(Ad.CATEGORY_CHOICES)[0],
+                amount=Decimal(rng.randint(1, 500)) / 10000, duration=30, max_show=rng.choice([0, 1000, 5000]),
+                daily_budget=rng.choice([None, Decimal("5.0000")]), status="active", ad_type="url",
+            )
+            ad.created_at = now - timedelta(hours=rng.uniform(0, 24 * 30))
+            ads.append(ad)
+            counts[pk] = (rng.randint(0, 900), rng.randint(0, 40000))
+
+        ranked = ranking.rank(ads, counts, now)
+        # Stand-ins for the serialized rows in the feed snapshot
+        payload = {"status": "success", "message": "User Ads fetched successfully", "data": [
+            {"id": ad.pk, "title": ad.title, "category": ad.category, "amount": str(ad.amount),
+             "image_variants": {"thumb": f"https://cdn.example.com/ads/{ad.pk}/thumb.webp"}}
+            for ad in ranked
+        ]}
+        body, index = _render_rows(payload, "data")
+        entry = {"body": body, "encodings": {}, "rows": index}
+        viewed = set(rng.sample(range(1, options["ads"] + 1), min(options["viewed"], options["ads"])))
+
+        rank_ms = self.time(lambda: ranking.rank(ads, counts, now), options["repeat"])
+        filter_ms = self.time(lambda: Snapshot.response(entry, exclude=viewed), options["repeat"])
+        self.stdout.write(
+            f"{options['ads']} ads: ranking {rank_ms:.2f} ms per snapshot build, "
+            f"cutting {len(viewed)} viewed ads out of the {len(body) // 1024} KiB body "
+            f"{filter_ms:.2f} ms per request (medians of {options['repeat']})"
+        )
+
+    @staticmethod
+    def time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,130 @@
+import statistics
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from ads import credits
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at a running deployment's watch endpoints and "
+        "report throughput and latency percentiles. Run it once against the WSGI "
+        "deployment (/api/watch/) and once against the ASGI one (/api/async/watch/) "
+        "with the same worker count to compare them. The crediting endpoints pay each "
+        "user once per ad per 24 hours and for at most 10 ads per 30 minutes, so every "
+        "request uses its own (token, ad) pair; complete_view also starts each view and "
+        "waits out the ad's duration before the timed run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--prefix", default="/api/watch/",
+            help="Route prefix, /api/watch/ (sync) or /api/async/watch/ (async).",
+        )
+        parser.add_argument(
+            "--endpoint", default="start_view",
+            choices=["start_view", "complete_view", "api_complete"],
+        )
+        parser.add_argument(
+            "--ad", type=int, nargs="+", required=True,
+            help="Ad ids to hit. Crediting endpoints need enough (token, ad) pairs for --requests.",
+        )
+        parser.add_argument(
+            "--tokens-file", required=True,
+            help="File with one auth token per line; clients rotate through them.",
+        )
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        with open(options["tokens_file"]) as fh:
+            tokens = [line.strip() for line in fh if line.strip()]
+        if not tokens:
+            raise CommandError("Tokens file is empty.")
+
+        ads = options["ad"]
+        total = options["requests"]
+        if options["endpoint"] != "start_view":
+            # A user is paid for at most RATE_LIMIT ads per window
+            ads = ads[:credits.RATE_LIMIT]
+            if total > len(tokens) * len(ads):
+                raise CommandError(
+                    f"{options['endpoint']} pays each token once per ad, so {len(tokens)} token(s) and "
+                    f"{len(ads)} ad(s) allow at most {len(tokens) * len(ads)} requests; add tokens or ads."
+                )
+
+        def target(i):
+            # Tokens vary fastest, so request i < tokens * ads gets a pair of its own
+            return tokens[i % len(tokens)], ads[(i // len(tokens)) % len(ads)]
+
+        def url(ad, endpoint):
+            return "{}{}{}/{}/".format(options["base_url"].rstrip("/"), options["prefix"], ad, endpoint)
+
+        body = None
+        if options["endpoint"] == "api_complete":
+            body = {"started_at": "2000-01-01T00:00:00Z"}
+        if options["endpoint"] == "complete_view":
+            self.start_views([target(i) for i in range(total)], url, options["timeout"])
+
+        counter = iter(range(total))
+        lock = threading.Lock()
+        latencies = []
+        statuses = Counter()
+
+        def worker():
+            session = requests.Session()
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                token, ad = target(i)
+                headers = {"Authorization": f"Token {token}"}
+                start = time.perf_counter()
+                try:
+                    code = session.post(
+                        url(ad, options["endpoint"]), json=body, headers=headers, timeout=options["timeout"]
+                    ).status_code
+                except requests.RequestException:
+                    code = "error"
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[code] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        self.stdout.write(f"URL:          {url('<ad>', options['endpoint'])} for ads {', '.join(map(str, ads))}")
+        self.stdout.write(f"Requests:     {total} @ concurrency {options['concurrency']}")
+        self.stdout.write(f"Throughput:   {total / wall:.1f} req/s")
+        self.stdout.write(
+            f"Latency (ms): mean {statistics.mean(latencies) * 1000:.1f} | "
+            f"p50 {pct(0.50):.1f} | p95 {pct(0.95):.1f} | p99 {pct(0.99):.1f}"
+        )
+        self.stdout.write("Status codes: " + ", ".join(f"{k}={v}" for k, v in sorted(statuses.items(), key=str)))
+
+    def start_views(self, pairs, url, timeout):
+        """Open a watch session per (token, ad) pair, then wait out the longest ad duration."""
+        session = requests.Session()
+        longest = 0
+        for token, ad in pairs:
+            response = session.post(url(ad, "start_view"), headers={"Authorization": f"Token {token}"}, timeout=timeout)
+            if response.status_code != 200:
+                raise CommandError(f"start_view for ad {ad} failed with {response.status_code}: {response.text}")
+            longest = max(longest, response.json()["Duration"])
+        self.stdout.write(f"Started {len(pairs)} view(s); waiting {longest}s for them to complete.")
+        time.sleep(longest + 1)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ads import feed, pacing
+
+
+class Command(BaseCommand):
+    help = (
+        "Reset the ad pacing counters (views and today's spend per ad) to the AdView "
+        "totals. Run it from cron every few minutes."
+    )
+
+    def handle(self, *args, **options):
+        drifted, changed = pacing.reconcile()
+        if changed:
+            feed.invalidate({ad.category for ad in drifted})
+        for ad in drifted:
+            self.stdout.write(f"Corrected counters for ad {ad.pk} ({ad.title})")
+        self.stdout.write(self.style.SUCCESS(f"Reconciled pacing; {len(drifted)} ad(s) had drifted."))
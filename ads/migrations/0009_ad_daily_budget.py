@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0008_ad_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='daily_budget',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Maximum payout per day; empty for no cap', max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ad',
+            name='max_show',
+            field=models.PositiveIntegerField(default=1, help_text='Total paid views; 0 for no cap'),
+        ),
+    ]
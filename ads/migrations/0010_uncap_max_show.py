@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:25
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def uncap_existing_ads(apps, schema_editor):
+    """
+    max_show was never enforced before pacing, and the values on existing
+    ads were set as a per-user display count, not a lifetime total. Read as
+    total paid views they would exhaust those ads almost at once, so they
+    move to max_show_per_user for admins to review and max_show starts
+    uncapped.
+    """
+    Ad = apps.get_model('ads', 'Ad')
+    Ad.objects.exclude(max_show=0).update(max_show_per_user=F('max_show'), max_show=0)
+
+
+def restore_max_show(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    Ad.objects.exclude(max_show_per_user=0).update(max_show=F('max_show_per_user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0009_ad_daily_budget'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='max_show_per_user',
+            field=models.PositiveIntegerField(default=0, help_text='Per-user display count set before max_show was enforced; not enforced, kept for review'),
+        ),
+        migrations.RunPython(uncap_existing_ads, restore_max_show),
+        migrations.AlterField(
+            model_name='ad',
+            name='max_show',
+            field=models.PositiveIntegerField(default=0, help_text='Total paid views; 0 for no cap'),
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 
+from api.tasks import enqueue
+
 class Ad(models.Model):
     CATEGORY_CHOICES = (
         ("visit", "Visit Ad"),
@@ -27,7 +29,14 @@ class Ad(models.Model):
     category = models.CharField(max_length=100, choices=CATEGORY_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=4)
     duration = models.PositiveIntegerField(help_text="Ad Duration in Seconds")
-    max_show = models.PositiveIntegerField(default=1)
+    max_show = models.PositiveIntegerField(default=0, help_text="Total paid views; 0 for no cap")
+    max_show_per_user = models.PositiveIntegerField(
+        default=0, help_text="Per-user display count set before max_show was enforced; not enforced, kept for review"
+    )
+    daily_budget = models.DecimalField(
+        max_digits=12, decimal_places=4, blank=True, null=True,
+        help_text="Maximum payout per day; empty for no cap",
+    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     note = models.TextField(blank=True, null=True)
 
@@ -35,12 +44,20 @@ class Ad(models.Model):
     ad_input_url = models.URLField(blank=True, null=True)
     ad_input_image = models.ImageField(upload_to="ads/image_ads", blank=True, null=True)
     ad_input_script = models.TextField(blank=True, null=True)
+    # Resized renditions of ad_input_image, written by the ads.render_image_variants task
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.title} | {self.category} | {self.status} | ${self.amount}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        image_name = self.ad_input_image.name if self.ad_input_image else ""
+        if image_name != self.image_variants.get("source_name", ""):
+            enqueue("ads.render_image_variants", {"ad_id": self.pk})
+
 
 class AdView(models.Model):
     """Final record after a user has completed viewing an ad."""
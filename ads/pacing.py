@@ -0,0 +1,187 @@
+"""
+Ad pacing: the max_show and daily_budget caps.
+
+Every paid view counts against its ad's max_show (total paid views) and
+daily_budget (payout per local day). Counting AdView rows on every request
+would put an aggregate query on the watch flow. Instead, each ad has two
+counters in the shared cache, its paid views and today's spend (in units
+of 0.0001, Ad.amount's precision). They are seeded from the database the
+first time an ad is seen, or after eviction, and then only move by atomic
+incr/decr.
+
+reserve() counts a view before its AdView is written and takes it back if
+a cap would be passed, so concurrent completions cannot overshoot. Counts
+for views whose transaction later fails to commit are not taken back, so
+reconcile() (`manage.py reconcile_ad_pacing`, or the ads.reconcile_pacing
+task, every few minutes) resets the counters to the database totals.
+
+An ad that has no room for another view is exhausted: start_view refuses
+it, and the feed leaves it out. The feed snapshot is invalidated when an ad
+becomes exhausted, and it is keyed on the day, so budget-capped ads return
+at midnight.
+
+    AD_PACING = {"ENABLED": True, "CACHE_ALIAS": "default"}
+
+The alias must be a cache shared by every worker; the api.E001 system check
+refuses a per-process LocMemCache.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Ad, AdView
+
+UNIT = Decimal("0.0001")
+# Spend counters only need to outlive their day
+SPEND_TIMEOUT = 2 * 24 * 3600
+
+EXHAUSTED_MESSAGE = "This ad has reached its limit. Please try another ad."
+
+
+def _setting(key, default):
+    return getattr(settings, "AD_PACING", {}).get(key, default)
+
+
+def enabled():
+    return _setting("ENABLED", True)
+
+
+def _cache():
+    return caches[_setting("CACHE_ALIAS", "default")]
+
+
+def today():
+    return timezone.localdate()
+
+
+def units(amount):
+    return int(Decimal(amount) / UNIT)
+
+
+def _shows_key(ad_id):
+    return f"pacing:{ad_id}:shows"
+
+
+def _spend_key(ad_id, day):
+    return f"pacing:{ad_id}:spend:{day:%Y%m%d}"
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def database_totals(ad_ids, day):
+    """{ad_id: (paid views, spend units today)} from the AdView rows."""
+    shows = dict(
+        AdView.objects.filter(ad_id__in=ad_ids).values_list("ad_id").annotate(n=Count("id")).order_by()
+    )
+    spend = dict(
+        AdView.objects.filter(ad_id__in=ad_ids, viewed_at__gte=_day_start(day))
+        .values_list("ad_id").annotate(total=Sum("earned_amount")).order_by()
+    )
+    return {ad_id: (shows.get(ad_id, 0), units(spend.get(ad_id) or 0)) for ad_id in ad_ids}
+
+
+def counters(ad_ids, day=None):
+    """{ad_id: (paid views, spend units today)}, seeding missing counters from the database."""
+    day = day or today()
+    cache = _cache()
+    keys = {ad_id: (_shows_key(ad_id), _spend_key(ad_id, day)) for ad_id in ad_ids}
+    found = cache.get_many([key for pair in keys.values() for key in pair])
+    missing = [ad_id for ad_id, pair in keys.items() if not all(key in found for key in pair)]
+    if missing:
+        for ad_id, (shows, spend) in database_totals(missing, day).items():
+            # add(), not set(): a concurrent reserve() may have seeded and counted already
+            cache.add(keys[ad_id][0], shows, None)
+            cache.add(keys[ad_id][1], spend, SPEND_TIMEOUT)
+        found = cache.get_many([key for pair in keys.values() for key in pair])
+    return {ad_id: (found.get(shows_key, 0), found.get(spend_key, 0)) for ad_id, (shows_key, spend_key) in keys.items()}
+
+
+def has_room(ad, shows, spend):
+    """Whether `ad` can pay for one more view at these counts."""
+    if ad.max_show and shows >= ad.max_show:
+        return False
+    if ad.daily_budget is not None and spend + units(ad.amount) > units(ad.daily_budget):
+        return False
+    return True
+
+
+def is_exhausted(ad):
+    if not enabled():
+        return False
+    shows, spend = counters([ad.pk])[ad.pk]
+    return not has_room(ad, shows, spend)
+
+
+def availability_error(ad):
+    """Why `ad` can't be watched for pay right now, or None."""
+    return EXHAUSTED_MESSAGE if is_exhausted(ad) else None
+
+
+def _incr(key, delta, seed):
+    cache = _cache()
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Evicted since it was seeded
+        seed()
+        return cache.incr(key, delta)
+
+
+def reserve(ad):
+    """
+    Count one paid view of `ad`. Returns an error message, with nothing
+    counted, if it would pass max_show or today's budget.
+    """
+    if not enabled():
+        return None
+    day = today()
+    seed = lambda: counters([ad.pk], day)  # noqa: E731
+    amount = units(ad.amount)
+    shows = _incr(_shows_key(ad.pk), 1, seed)
+    spend = _incr(_spend_key(ad.pk, day), amount, seed)
+    if not has_room(ad, shows - 1, spend - amount):
+        release(ad, day)
+        return EXHAUSTED_MESSAGE
+    return None
+
+
+def release(ad, day=None):
+    """Take back a view counted by reserve() that was not paid after all."""
+    if not enabled():
+        return
+    day = day or today()
+    cache = _cache()
+    for key, delta in ((_shows_key(ad.pk), 1), (_spend_key(ad.pk, day), units(ad.amount))):
+        try:
+            cache.decr(key, delta)
+        except ValueError:
+            pass
+
+
+def reconcile(ads=None):
+    """
+    Reset the counters of `ads` (default: every active ad) to the database
+    totals. Returns the ads whose counters had drifted and whether any ad's
+    exhausted state changed.
+    """
+    day = today()
+    ads = list(ads if ads is not None else Ad.objects.filter(status="active"))
+    cached = counters([ad.pk for ad in ads], day)
+    actual = database_totals([ad.pk for ad in ads], day)
+    cache = _cache()
+    drifted, changed = [], False
+    for ad in ads:
+        if cached[ad.pk] == actual[ad.pk]:
+            continue
+        drifted.append(ad)
+        shows, spend = actual[ad.pk]
+        cache.set(_shows_key(ad.pk), shows, None)
+        cache.set(_spend_key(ad.pk, day), spend, SPEND_TIMEOUT)
+        changed = changed or has_room(ad, *cached[ad.pk]) != has_room(ad, shows, spend)
+    return drifted, changed
@@ -1,13 +1,30 @@
 # serializers.py (No changes needed)
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import *
 from accounts.models import *
 
 class AdSerializer(serializers.ModelSerializer):
+      image_variants = serializers.SerializerMethodField()
+
       class Meta:
             model = Ad
             fields = "__all__"
 
+      def get_image_variants(self, obj):
+            """Resized banners by format, smallest first; empty until the worker has rendered them."""
+            request = self.context.get("request")
+            variants = []
+            for rendition in obj.image_variants.get("renditions", []):
+                  url = default_storage.url(rendition["name"])
+                  variants.append({
+                        "width": rendition["width"],
+                        "height": rendition["height"],
+                        "format": rendition["format"],
+                        "url": request.build_absolute_uri(url) if request else url,
+                  })
+            return sorted(variants, key=lambda variant: (variant["format"], variant["width"]))
+
 class AdViewSerializer(serializers.ModelSerializer):
       ad = AdSerializer(read_only = True)
 
@@ -29,10 +46,17 @@ class UserListSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'today_earned', 'total_earned']
 
+    # Views select_related("userearning"), so these read the joined row
+    def _earning(self, obj):
+        try:
+            return obj.userearning
+        except UserEarning.DoesNotExist:
+            return None
+
     def get_today_earned(self, obj):
-        earning = UserEarning.objects.filter(user=obj).first()
+        earning = self._earning(obj)
         return earning.today_earned if earning else 0.0
 
     def get_total_earned(self, obj):
-        earning = UserEarning.objects.filter(user=obj).first()
+        earning = self._earning(obj)
         return earning.total_earned if earning else 0.0
\ No newline at end of file
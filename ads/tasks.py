@@ -0,0 +1,62 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from api import imaging
+from api.tasks import task
+from .models import Ad, UserEarning
+from . import feed, pacing, variants
+
+logger = logging.getLogger(__name__)
+
+
+@task("ads.credit_earnings", batch=True)
+def credit_earnings(payloads):
+    """Apply queued ad earnings, one UserEarning write per user per batch."""
+    totals = defaultdict(Decimal)
+    for payload in payloads:
+        totals[payload["user_id"]] += Decimal(payload["amount"])
+
+    for user_id, amount in totals.items():
+        earning, _ = UserEarning.objects.select_for_update().get_or_create(user_id=user_id)
+        earning.add_earning(amount)
+
+
+@task("ads.reconcile_pacing")
+def reconcile_pacing(payload):
+    drifted, changed = pacing.reconcile()
+    if changed:
+        feed.invalidate({ad.category for ad in drifted})
+
+
+@task("ads.render_image_variants", batch=True)
+def render_image_variants(payloads):
+    """Render the responsive banner renditions for ads whose image changed."""
+    ads = list(Ad.objects.filter(pk__in={payload["ad_id"] for payload in payloads}))
+    # The feed embeds the variant URLs, and update() sends no post_save
+    feed.invalidate_on_commit({ad.category for ad in ads})
+    jobs, pending = [], []
+    for ad in ads:
+        name = ad.ad_input_image.name if ad.ad_input_image else ""
+        if name == ad.image_variants.get("source_name", ""):
+            continue
+        if not name:
+            Ad.objects.filter(pk=ad.pk, ad_input_image=ad.ad_input_image).update(image_variants={})
+            continue
+        digest = variants.source_digest(ad.ad_input_image)
+        # Another ad already uses this exact banner: reuse its renditions
+        twin = Ad.objects.filter(image_variants__source=digest).values_list("image_variants", flat=True).first()
+        if twin:
+            Ad.objects.filter(pk=ad.pk, ad_input_image=name).update(image_variants=dict(twin, source_name=name))
+            continue
+        jobs.append(variants.render_job(ad.ad_input_image, digest))
+        pending.append((ad, name, digest))
+
+    for (ad, name, digest), result in zip(pending, imaging.run_many(imaging.render_widths, jobs)):
+        if isinstance(result, Exception):
+            logger.warning("Image variants for ad %s failed: %s", ad.pk, result)
+            continue
+        # Skip the write if the image was replaced while we rendered; its own task follows
+        Ad.objects.filter(pk=ad.pk, ad_input_image=name).update(
+            image_variants=variants.describe(name, digest, result)
+        )
@@ -1,3 +1,322 @@
-from django.test import TestCase
+import importlib
+import io
+import tempfile
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from api.models import BackgroundTask
+from . import credits, pacing, ranking
+from .models import Ad, AdSession, AdView
+from .serializers import AdSerializer
+from .tasks import render_image_variants
+
+
+def banner(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "blue").save(buffer, "PNG")
+    return SimpleUploadedFile("banner.png", buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    IMAGING={"PROCESSES": 0},
+    AD_IMAGE_VARIANTS={"WIDTHS": [320, 640, 1080], "FORMATS": ["jpeg"]},
+)
+class ImageVariantTests(TestCase):
+    def create_ad(self, image):
+        return Ad.objects.create(
+            title="Banner", category="visit", amount="0.0100", duration=10,
+            status="active", ad_type="banner", ad_input_image=image,
+        )
+
+    def run_tasks(self):
+        render_image_variants([task.payload for task in BackgroundTask.objects.filter(name="ads.render_image_variants")])
+
+    def test_renditions_are_never_upscaled_and_shared_by_content(self):
+        first = self.create_ad(banner(800, 200))
+        second = self.create_ad(banner(800, 200))
+        self.run_tasks()
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        widths = [variant["width"] for variant in AdSerializer(first).data["image_variants"]]
+        self.assertEqual(widths, [320, 640, 800])
+        self.assertEqual(first.image_variants["renditions"], second.image_variants["renditions"])
+        self.assertIn(first.image_variants["source"], first.image_variants["renditions"][0]["name"])
+
+
+@override_settings(COMPRESSION={"MIN_SIZE": 0, "CONTENT_TYPES": ["application/json"]})
+class FeedSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ads = [
+            Ad.objects.create(
+                title=f"Ad {i}", category="visit", amount="0.0100", duration=10, max_show=0, status="active"
+            )
+            for i in range(2)
+        ]
+        self.user = User.objects.create_user("viewer@example.com", "viewer", "user", None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def category_ids(self, category):
+        return [ad["id"] for ad in self.client.get(f"/api/ads/user_ads/?category={category}").json()["data"]]
+
+    def test_feed_is_served_precompressed_until_an_ad_changes(self):
+        self.client.get("/api/ads/user_ads/")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/ads/user_ads/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ads[1].title = "Renamed"
+            self.ads[1].save()
+        titles = [ad["title"] for ad in self.client.get("/api/ads/user_ads/").json()["data"]]
+        self.assertIn("Renamed", titles)
+
+    def test_recently_viewed_ads_are_filtered_out_of_the_snapshot(self):
+        AdView.objects.create(user=self.user, ad=self.ads[0], earned_amount="0.0100")
+        data = self.client.get("/api/ads/user_ads/").json()["data"]
+        self.assertEqual([ad["id"] for ad in data], [self.ads[1].pk])
+
+    def test_category_shards_are_invalidated_independently(self):
+        video = Ad.objects.create(
+            title="Clip", category="video", amount="0.0100", duration=10, max_show=0, status="active"
+        )
+        self.assertEqual(self.category_ids("video"), [video.pk])
+        self.assertEqual(sorted(self.category_ids("visit")), sorted(ad.pk for ad in self.ads))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            video.title = "Renamed"
+            video.save()
+        # Only the recent views query: the visit shard is still cached
+        with self.assertNumQueries(1):
+            self.client.get("/api/ads/user_ads/?category=visit")
+        data = self.client.get("/api/ads/user_ads/?category=video").json()["data"]
+        self.assertEqual([ad["title"] for ad in data], ["Renamed"])
+
+        self.assertEqual(self.client.get("/api/ads/user_ads/?category=bogus").status_code, 400)
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create_ad(self, category="visit", amount="0.0100", **kwargs):
+        return Ad.objects.create(
+            title="Ranked", category=category, amount=amount, duration=5, status="active", ad_type="url", **kwargs
+        )
+
+    def test_ads_are_ranked_by_payout_room_and_category(self):
+        cheap, rich = self.create_ad(amount="0.0010"), self.create_ad(amount="0.0500")
+        self.assertEqual(ranking.rank([cheap, rich]), [rich, cheap])
+
+        # Same payout: the ad with more of its max_show left goes first
+        spent, fresh = self.create_ad(max_show=10), self.create_ad(max_show=10)
+        counts = {spent.pk: (9, 0), fresh.pk: (0, 0)}
+        self.assertEqual(ranking.rank([fresh, spent], counts), [fresh, spent])
+
+        with override_settings(RANKING={"CATEGORY_WEIGHTS": {"video": 5.0}}):
+            video = self.create_ad(category="video", amount="0.0010")
+            self.assertEqual(ranking.rank([rich, video])[0], video)
+
+    def test_feed_follows_the_ranking(self):
+        low, high = self.create_ad(amount="0.0010"), self.create_ad(amount="0.0500")
+        data = APIClient().get("/api/ads/user_ads/").json()["data"]
+        self.assertEqual([ad["id"] for ad in data], [high.pk, low.pk])
+
+
+class AsyncWatchViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("async@example.com", "async", "user", "secret")
+        self.token = Token.objects.create(user=self.user)
+        self.ad = Ad.objects.create(
+            title="Async", category="visit", amount="0.0100", duration=5, max_show=0, status="active", ad_type="url",
+        )
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+
+    def post(self, endpoint, pk=None, client=None, **kwargs):
+        return (client or self.client).post(f"/api/async/watch/{pk or self.ad.pk}/{endpoint}/", **kwargs)
+
+    def test_requests_need_valid_credentials(self):
+        self.assertEqual(self.post("start_view").status_code, 401)
+        self.assertEqual(self.post("start_view", HTTP_AUTHORIZATION="Token nope").status_code, 401)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.post("start_view", **self.auth).status_code, 401)
+
+    def test_session_auth_is_csrf_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self.post("start_view", client=client)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF Failed", response.json()["detail"])
+        # api_complete takes tokens only
+        self.assertEqual(self.post("api_complete", client=client).status_code, 401)
+
+    def test_missing_ads_and_incomplete_views_are_refused(self):
+        self.assertEqual(self.post("start_view", pk=self.ad.pk + 100, **self.auth).status_code, 404)
+        response = self.post("complete_view", **self.auth)
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "You must start viewing first"))
+
+        self.post("start_view", **self.auth)
+        response = self.post("complete_view", **self.auth)
+        self.assertEqual(response.json()["error"], "You must view the full duration")
+        self.assertEqual(self.post("api_complete", **self.auth).status_code, 400)
+        response = self.post("api_complete", data={"started_at": "yesterday"}, **self.auth)
+        self.assertEqual(response.json()["error"], "Invalid started_at format. Use ISO format.")
+
+    def test_completed_view_pays_once_and_cools_down(self):
+        self.assertEqual(self.post("start_view", **self.auth).status_code, 200)
+        AdSession.objects.filter(user=self.user).update(started_at=timezone.now() - timedelta(seconds=10))
+        self.assertEqual(self.post("complete_view", **self.auth).json()["success"], "true")
+
+        response = self.post("start_view", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], credits.cooldown_error(self.user, self.ad))
+        self.assertEqual(AdView.objects.filter(user=self.user).count(), 1)
+
+
+class ConcurrentCompletionTests(TransactionTestCase):
+    """One user completing the same ad from many requests at once."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("u@example.com", "u", "user", None)
+        self.ad = Ad.objects.create(
+            title="Visit", category="visit", amount="0.0100", duration=5, status="active", ad_type="url",
+        )
+
+    def race(self, path, data=None, requests=8):
+        results = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                results.append(client.post(path, data, format="json").status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_session_pays_out_once(self):
+        session = AdSession.objects.create(user=self.user, ad=self.ad)
+        AdSession.objects.filter(pk=session.pk).update(started_at=timezone.now() - timedelta(minutes=1))
+
+        results = self.race(f"/api/watch/{self.ad.pk}/complete_view/")
+
+        self.assertEqual(results.count(200), 1)
+        self.assertEqual(AdView.objects.filter(user=self.user).count(), 1)
+
+    def test_api_complete_credits_once_per_cooldown(self):
+        started_at = (timezone.now() - timedelta(minutes=1)).isoformat()
+
+        results = self.race(f"/api/view/{self.ad.pk}/api_complete/", {"started_at": started_at})
+        results += self.race(f"/api/watch/{self.ad.pk}/api_complete/", {"started_at": started_at})
+
+        self.assertEqual(results.count(200), 1)
+        self.assertEqual(AdView.objects.filter(user=self.user).count(), 1)
+
+    def test_max_show_holds_under_concurrent_users(self):
+        self.ad.max_show = 3
+        self.ad.save()
+        users = [User.objects.create_user(f"r{i}@example.com", f"r{i}", "user", None) for i in range(8)]
+        started_at = (timezone.now() - timedelta(minutes=1)).isoformat()
+        barrier = threading.Barrier(len(users))
+
+        def post(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                client.post(f"/api/watch/{self.ad.pk}/api_complete/", {"started_at": started_at}, format="json")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(AdView.objects.filter(ad=self.ad).count(), 3)
+
+
+class PacingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(f"p{i}@example.com", f"p{i}", "user", None) for i in range(3)]
+        self.client = APIClient()
+
+    def create_ad(self, **kwargs):
+        return Ad.objects.create(
+            title="Paced", category="visit", amount="0.0100", duration=5, status="active", ad_type="url", **kwargs
+        )
+
+    def test_max_show_is_enforced_from_the_counters(self):
+        ad = self.create_ad(max_show=2)
+        self.assertIsNone(credits.credit(self.users[0], ad))
+        with self.assertNumQueries(0):
+            self.assertFalse(pacing.is_exhausted(ad))
+        self.assertIsNone(credits.credit(self.users[1], ad))
+
+        self.assertEqual(credits.credit(self.users[2], ad), pacing.EXHAUSTED_MESSAGE)
+        self.client.force_authenticate(self.users[2])
+        response = self.client.post(f"/api/watch/{ad.pk}/start_view/")
+        self.assertEqual(response.json()["error"], pacing.EXHAUSTED_MESSAGE)
+        self.assertEqual(self.client.get("/api/ads/user_ads/").json()["data"], [])
+
+    def test_new_ads_are_uncapped_by_default(self):
+        ad = Ad.objects.create(title="Fresh", category="visit", amount="0.0100", duration=5, status="active", ad_type="url")
+        self.assertEqual(ad.max_show, 0)
+        self.assertEqual([credits.credit(user, ad) for user in self.users], [None, None, None])
+        self.assertFalse(pacing.is_exhausted(ad))
+
+    def test_existing_display_counts_are_kept_and_restorable(self):
+        ad = self.create_ad(max_show=5)
+        state = MigrationExecutor(connection).loader.project_state(("ads", "0010_uncap_max_show"))
+        migration = importlib.import_module("ads.migrations.0010_uncap_max_show")
+
+        migration.uncap_existing_ads(state.apps, None)
+        ad.refresh_from_db()
+        self.assertEqual((ad.max_show, ad.max_show_per_user), (0, 5))
+
+        migration.restore_max_show(state.apps, None)
+        ad.refresh_from_db()
+        self.assertEqual(ad.max_show, 5)
+
+    def test_daily_budget_caps_spend(self):
+        ad = self.create_ad(max_show=0, daily_budget="0.0250")
+        results = [credits.credit(user, ad) for user in self.users]
+
+        self.assertEqual(results, [None, None, pacing.EXHAUSTED_MESSAGE])
+        self.assertEqual(AdView.objects.filter(ad=ad).count(), 2)
+
+    def test_reconcile_resets_drifted_counters(self):
+        ad = self.create_ad(max_show=1)
+        # A view counted whose AdView never committed
+        pacing.reserve(ad)
+        self.assertTrue(pacing.is_exhausted(ad))
+
+        drifted, changed = pacing.reconcile()
+
+        self.assertEqual((drifted, changed), ([ad], True))
+        self.assertFalse(pacing.is_exhausted(ad))
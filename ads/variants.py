@@ -0,0 +1,65 @@
+"""
+Responsive renditions of banner ad images.
+
+When an ad's image changes, the ads.render_image_variants task renders it at
+each AD_IMAGE_VARIANTS width in each format using the shared imaging pool.
+Files are named after the SHA-256 of the source image, so their URLs can be
+cached forever and ads sharing a banner share its renditions.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import features
+
+
+def _setting(key, default):
+    return getattr(settings, "AD_IMAGE_VARIANTS", {}).get(key, default)
+
+
+def formats():
+    wanted = _setting("FORMATS", ["webp", "jpeg"])
+    # Pillow builds without libwebp still get the JPEG renditions
+    return [name for name in wanted if name != "webp" or features.check("webp")]
+
+
+def source_digest(field_file):
+    hasher = hashlib.sha256()
+    with field_file.open("rb") as source:
+        for chunk in source.chunks():
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def base_name(digest):
+    return f"ads/variants/{digest[:2]}/{digest}"
+
+
+def render_job(field_file, digest):
+    """Arguments for imaging.render_widths."""
+    return (
+        default_storage.path(field_file.name),
+        default_storage.path(base_name(digest)),
+        _setting("WIDTHS", [320, 640, 1080]),
+        formats(),
+        _setting("QUALITY", 80),
+    )
+
+
+def describe(source_name, digest, renditions):
+    """The Ad.image_variants value for a finished render."""
+    return {
+        "source_name": source_name,
+        "source": digest,
+        "renditions": [
+            {
+                "width": rendition["width"],
+                "height": rendition["height"],
+                "format": rendition["format"],
+                "name": f"{base_name(digest)}-{rendition['width']}{os.path.splitext(rendition['path'])[1]}",
+                "bytes": rendition["bytes"],
+            }
+            for rendition in renditions
+        ],
+    }
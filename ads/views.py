@@ -13,6 +13,8 @@ from .models import *
 from .serializers import *
 from accounts.permissions import IsAdmin, IsUser
 from rest_framework.authentication import TokenAuthentication
+from . import credits, feed, pacing
+from api.throttling import RateLimitHeadersMixin, ThirdPartyRateThrottle
 
 
 class AdViewSet(viewsets.ModelViewSet):
@@ -26,25 +28,34 @@ class AdViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[AllowAny])
     def user_ads(self, request):
-        # ← CHANGED: Filter out ads that user has viewed in the last 24 hours
-        # Get all active ads
-        ads = Ad.objects.filter(status="active")
+        category = request.query_params.get("category") or None
+        if category is not None and category not in feed.CATEGORIES:
+            return Response({"success": "false", "error": "Invalid category"}, status=400)
 
+        # ← CHANGED: Filter out ads that user has viewed in the last 24 hours
         # Get ads that the user viewed within the last 24 hours
         twenty_four_hours_ago = timezone.now() - timedelta(hours=24)
-        recently_viewed_ad_ids = AdView.objects.filter(
-            user=request.user, viewed_at__gte=twenty_four_hours_ago
-        ).values_list("ad_id", flat=True)
-
-        # Exclude recently viewed ads from the response
-        ads = ads.exclude(id__in=recently_viewed_ad_ids)
-
-        serializer = self.get_serializer(ads, many=True)
-        return Response({
-            "status": "success",
-            "message": "User Ads fetched successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        recently_viewed_ad_ids = set()
+        if request.user.is_authenticated:
+            recently_viewed_ad_ids = set(AdView.objects.filter(
+                user=request.user, viewed_at__gte=twenty_four_hours_ago
+            ).values_list("ad_id", flat=True))
+
+        if not feed.snapshot.enabled or request.accepted_renderer.format != "json":
+            # Get all eligible ads, excluding recently viewed ones (ranked as in the shared feed)
+            ads = Ad.objects.filter(status="active")
+            if category:
+                ads = ads.filter(category=category)
+            ads = [ad for ad in feed.eligible_ads(ads) if ad.pk not in recently_viewed_ad_ids]
+            serializer = self.get_serializer(ads, many=True)
+            return Response({
+                "status": "success",
+                "message": "User Ads fetched successfully",
+                "data": serializer.data
+            }, status=status.HTTP_200_OK)
+
+        # The rendered catalog is shared; recently viewed ads are cut out of its bytes
+        return feed.snapshot.response(feed.catalog(request, category), exclude=recently_viewed_ad_ids)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAdmin])
     def admin_stats(self, request):
@@ -75,53 +86,10 @@ class AdWatchingViewSet(viewsets.ViewSet):
                 {"success": "false", "error": "Ad not found or inactive"}, status=404
             )
 
-        # ← CHANGED: Check if user has viewed this ad in the last 24 hours
-        twenty_four_hours_ago = timezone.now() - timedelta(hours=24)
-        recent_view = AdView.objects.filter(
-            user=request.user, ad=ad, viewed_at__gte=twenty_four_hours_ago
-        ).first()
-
-        if recent_view:
-            can_view_at = recent_view.viewed_at + timedelta(hours=24)
-            remaining_seconds = (can_view_at - timezone.now()).total_seconds()
-            remaining_hours = int(remaining_seconds // 3600)
-            remaining_minutes = int((remaining_seconds % 3600) // 60)
-            return Response(
-                {
-                    "success": "false",
-                    "error": f"You can view this ad again after {remaining_hours}h {remaining_minutes}m.",
-                },
-                status=400,
-            )
-
-        # Check 30-minute rate limit (10 ads per 30 minutes)
-        thirty_minutes_ago = timezone.now() - timedelta(minutes=30)
-        recent_views = AdView.objects.filter(
-            user=request.user, viewed_at__gte=thirty_minutes_ago
-        ).count()
-
-        if recent_views >= 10:
-            oldest_recent = (
-                AdView.objects.filter(
-                    user=request.user, viewed_at__gte=thirty_minutes_ago
-                )
-                .order_by("viewed_at")
-                .first()
-            )
-            if oldest_recent:
-                next_available_time = oldest_recent.viewed_at + timedelta(minutes=30)
-                remaining_seconds = (
-                    next_available_time - timezone.now()
-                ).total_seconds()
-                remaining_minutes = int(remaining_seconds // 60)
-                remaining_secs = int(remaining_seconds % 60)
-                return Response(
-                    {
-                        "success": "false",
-                        "error": f"You can watch more ads after {remaining_minutes}m {remaining_secs}s.",
-                    },
-                    status=400,
-                )
+        # ← CHANGED: Check the 24 hour cooldown and the 10 ads per 30 minutes limit
+        error = credits.cooldown_error(request.user, ad) or pacing.availability_error(ad)
+        if error:
+            return Response({"success": "false", "error": error}, status=400)
 
         # ← CHANGED: Delete any incomplete sessions for this user and ad
         AdSession.objects.filter(
@@ -156,13 +124,13 @@ class AdWatchingViewSet(viewsets.ViewSet):
             )
 
         # ← CHANGED: Get session from database instead of Django session
-        try:
-            ad_session = AdSession.objects.get(
-                user=request.user,
-                ad=ad,
-                is_completed=False
-            )
-        except AdSession.DoesNotExist:
+        # Latest open session; concurrent start_view calls can leave more than one
+        ad_session = AdSession.objects.filter(
+            user=request.user,
+            ad=ad,
+            is_completed=False
+        ).order_by("-started_at").first()
+        if ad_session is None:
             return Response(
                 {"success": "false", "error": "You must start viewing first"},
                 status=400,
@@ -177,17 +145,11 @@ class AdWatchingViewSet(viewsets.ViewSet):
                 status=400,
             )
 
-        # Mark session as completed
-        ad_session.is_completed = True
-        ad_session.save()
-
-        # Create AdView record (this automatically hides the ad for 24 hours)
-        ad_view = AdView.objects.create(
-            user=request.user, ad=ad, earned_amount=ad.amount
-        )
-
-        earning, _ = UserEarning.objects.get_or_create(user=request.user)
-        earning.add_earning(ad.amount)
+        # Completes the session and creates the AdView (hiding the ad for 24 hours)
+        # unless a concurrent request completed it first
+        error = credits.credit(request.user, ad, session=ad_session)
+        if error:
+            return Response({"success": "false", "error": error}, status=400)
 
         return Response(
             {
@@ -252,64 +214,11 @@ class AdWatchingViewSet(viewsets.ViewSet):
                 status=400
             )
 
-        twenty_four_hours_ago = timezone.now() - timedelta(hours=24)
-        recent_view = AdView.objects.filter(
-            user=request.user,
-            ad=ad,
-            viewed_at__gte=twenty_four_hours_ago
-        ).first()
-
-        if recent_view:
-            can_view_at = recent_view.viewed_at + timedelta(hours=24)
-            remaining_seconds = (can_view_at - timezone.now()).total_seconds()
-            remaining_hours = int(remaining_seconds // 3600)
-            remaining_minutes = int((remaining_seconds % 3600) // 60)
-            return Response(
-                {
-                    "success": "false",
-                    "error": f"You can view this ad again after {remaining_hours}h {remaining_minutes}m.",
-                },
-                status=400,
-            )
-
-        thirty_minutes_ago = timezone.now() - timedelta(minutes=30)
-        recent_views = AdView.objects.filter(
-            user=request.user,
-            viewed_at__gte=thirty_minutes_ago
-        ).count()
-
-        if recent_views >= 10:
-            oldest_recent = (
-                AdView.objects.filter(
-                    user=request.user,
-                    viewed_at__gte=thirty_minutes_ago
-                )
-                .order_by("viewed_at")
-                .first()
-            )
-            if oldest_recent:
-                next_available_time = oldest_recent.viewed_at + timedelta(minutes=30)
-                remaining_seconds = (next_available_time - timezone.now()).total_seconds()
-                remaining_minutes = int(remaining_seconds // 60)
-                remaining_secs = int(remaining_seconds % 60)
-                return Response(
-                    {
-                        "success": "false",
-                        "error": f"You can watch more ads after {remaining_minutes}m {remaining_secs}s.",
-                    },
-                    status=400,
-                )
-
-        # All validations passed - Create AdView record
-        ad_view = AdView.objects.create(
-            user=request.user,
-            ad=ad,
-            earned_amount=ad.amount
-        )
-
-        # Credit user's earnings
-        earning, _ = UserEarning.objects.get_or_create(user=request.user)
-        earning.add_earning(ad.amount)
+        # All validations passed - record the view unless a limit applies,
+        # checked under a lock so concurrent calls can't both be credited
+        error = credits.credit(request.user, ad)
+        if error:
+            return Response({"success": "false", "error": error}, status=400)
 
         return Response({
             "success": "true",
@@ -325,11 +234,13 @@ class UserEarningViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsUser]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UserEarning.objects.none()
         return UserEarning.objects.filter(user=self.request.user)
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().order_by("id")
+    queryset = User.objects.select_related("userearning").order_by("id")
     serializer_class = UserListSerializer
     permission_classes = [IsAdmin]
 
@@ -343,8 +254,10 @@ class UserViewSet(viewsets.ModelViewSet):
 #===================================================================================
                                 # """ Third Party """
 #===================================================================================
-class ThirdPartyAdWatchingViewSet(viewsets.ViewSet):
+class ThirdPartyAdWatchingViewSet(RateLimitHeadersMixin, viewsets.ViewSet):
     permission_classes = [AllowAny]
+    throttle_classes = [ThirdPartyRateThrottle]
+    throttle_scope = "thirdparty.watch"
 
     @action(detail=True, methods=["post"])
     def start_view(self, request, pk=None):
@@ -355,6 +268,10 @@ class ThirdPartyAdWatchingViewSet(viewsets.ViewSet):
                 {"success": "false", "error": "Ad not found or inactive"}, status=404
             )
 
+        error = pacing.availability_error(ad)
+        if error:
+            return Response({"success": "false", "error": error}, status=400)
+
         # ← CHANGED: Delete any incomplete sessions for this user and ad
         AdSession.objects.filter(
             user=request.user,
@@ -378,6 +295,7 @@ class ThirdPartyAdWatchingViewSet(viewsets.ViewSet):
             }
         )
 
+    @action(detail=True, methods=["post"], url_path="api_complete", permission_classes=[IsAuthenticated])
     def api_complete(self, request, pk=None):
         """
         Complete ad view via API (for third-party platforms like Project 2)
@@ -424,16 +342,10 @@ class ThirdPartyAdWatchingViewSet(viewsets.ViewSet):
                 },
                 status=400
             )
-        
-        ad_view = AdView.objects.create(
-            user=request.user,
-            ad=ad,
-            earned_amount=ad.amount
-        )
 
-        # Credit user's earnings
-        earning, _ = UserEarning.objects.get_or_create(user=request.user)
-        earning.add_earning(ad.amount)
+        error = credits.credit(request.user, ad)
+        if error:
+            return Response({"success": "false", "error": error}, status=400)
 
         return Response({
             "success": "true",
@@ -444,9 +356,11 @@ class ThirdPartyAdWatchingViewSet(viewsets.ViewSet):
         })
 
 
-class ThirdPartyAdViewSet(viewsets.ModelViewSet):
+class ThirdPartyAdViewSet(RateLimitHeadersMixin, viewsets.ModelViewSet):
     queryset = Ad.objects.all()
     serializer_class = AdSerializer
+    throttle_classes = [ThirdPartyRateThrottle]
+    throttle_scope = "thirdparty.ads"
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -455,7 +369,16 @@ class ThirdPartyAdViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[AllowAny])
     def user_ads(self, request):
+        category = request.query_params.get("category") or None
+        if category is not None and category not in feed.CATEGORIES:
+            return Response({"success": "false", "error": "Invalid category"}, status=400)
+
+        if feed.snapshot.enabled and request.accepted_renderer.format == "json":
+            return feed.snapshot.response(feed.catalog(request, category))
         ads = Ad.objects.filter(status="active")
+        if category:
+            ads = ads.filter(category=category)
+        ads = feed.eligible_ads(ads)
 
         serializer = self.get_serializer(ads, many=True)
         return Response({
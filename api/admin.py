@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import BackgroundTask
 
-# Register your models here.
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'locked_by', 'locked_at', 'last_error')
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401
+
+        if getattr(settings, "REQUEST_METRICS", {}).get("ENABLED", False):
+            from . import metrics
+
+            connection_created.connect(metrics.install_query_wrapper, dispatch_uid="api_metrics_query_wrapper")
+            metrics.install_serializer_timer()
+
+        if getattr(settings, "QUERY_INSPECTOR", {}).get("ENABLED", False):
+            from . import querywatch
+
+            connection_created.connect(querywatch.install_query_wrapper, dispatch_uid="api_querywatch_wrapper")
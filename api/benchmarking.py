@@ -0,0 +1,379 @@
+"""
+End-to-end benchmark suite for the hot endpoints.
+
+seed_dataset() bulk-loads a background dataset (users, ads, ad views, jobs,
+submissions, ledger rows). prepare_scenarios() then creates fresh state for
+one run: every stateful scenario (complete_view, api_complete, approve) gets
+its own pool of users, sessions or pending submissions so each request takes
+the success path instead of tripping a cooldown or "already reviewed".
+
+run_scenario() drives a scenario through the Django test client, so requests
+go through the full middleware, authentication and serializer stack, and
+records latency and queries per request. cold_start() times fresh worker
+processes from interpreter start to their first response. Results are plain
+dicts, written as JSON by the `benchmark` command and compared between
+commits.
+"""
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from ads import pacing
+from ads.models import Ad, AdSession, AdView, UserEarning
+from gigs.models import Job, JobCategory, JobSubmission, Transaction
+
+BATCH_SIZE = 5000
+
+DEFAULT_VOLUMES = {
+    "users": 2000,
+    "ads": 200,
+    "ad_views": 20000,
+    "jobs": 500,
+    "submissions": 5000,
+    "transactions": 20000,
+}
+
+SCENARIOS = (
+    "user_ads", "start_view", "complete_view", "api_complete",
+    "user_list", "admin_stats", "job_list", "approve",
+)
+
+
+def _bulk(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        model.objects.bulk_create(rows[start:start + BATCH_SIZE])
+
+
+def _make_users(prefix, count, role="user"):
+    # Hashing once instead of per user keeps seeding fast
+    password = make_password(None)
+    _bulk(User, [
+        User(email=f"{prefix}{i}@bench.local", username=f"{prefix}{i}", role=role, password=password)
+        for i in range(count)
+    ])
+    users = list(User.objects.filter(username__startswith=prefix).order_by("id"))
+    _bulk(Token, [Token(user=user, key=Token.generate_key()) for user in users])
+    return users
+
+
+def _token(user):
+    return Token.objects.filter(user=user).values_list("key", flat=True).get()
+
+
+def seed_dataset(volumes, rng=None):
+    """Bulk-load the background dataset. Returns the admin user."""
+    rng = rng or random.Random(0)
+    now = timezone.now()
+
+    admin = User.objects.create_superuser("admin@bench.local", "bench-admin", None)
+    Token.objects.create(user=admin)
+    users = _make_users("bench-user-", volumes["users"])
+
+    _bulk(Ad, [
+        Ad(
+            title=f"Ad {i}",
+            category=rng.choice(Ad.CATEGORY_CHOICES)[0],
+            amount=Decimal(rng.randint(1, 500)) / 10000,
+            duration=rng.randint(5, 60),
+            max_show=rng.randint(1, 1000),
+            status="active" if rng.random() < 0.9 else "inactive",
+            ad_type="url",
+            ad_input_url=f"https://example.com/ads/{i}",
+        )
+        for i in range(volumes["ads"])
+    ])
+    ads = list(Ad.objects.order_by("id"))
+
+    if users and ads:
+        _bulk(AdView, [
+            AdView(user=rng.choice(users), ad=(ad := rng.choice(ads)), earned_amount=ad.amount)
+            for _ in range(volumes["ad_views"])
+        ])
+        # viewed_at is auto_now_add; age nine in ten views past the 24h cooldown
+        aged = volumes["ad_views"] * 9 // 10
+        if aged:
+            cutoff = AdView.objects.order_by("id").values_list("id", flat=True)[aged - 1]
+            AdView.objects.filter(id__lte=cutoff).update(viewed_at=now - timedelta(days=2))
+        viewers = AdView.objects.values_list("user_id", flat=True).distinct()
+        _bulk(UserEarning, [
+            UserEarning(user_id=user_id, total_earned=Decimal("1.0000"), today_earned=Decimal("0.1000"))
+            for user_id in viewers
+        ])
+
+    categories = JobCategory.objects.bulk_create([
+        JobCategory(name=f"Category {i}", slug=f"bench-category-{i}") for i in range(10)
+    ])
+    body = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "</p>"
+    _bulk(Job, [
+        Job(
+            category=rng.choice(categories),
+            title=f"Job {i}",
+            task_description=body,
+            freelancers_needed=rng.randint(10, 500),
+            earning_per_task=Decimal("0.50"),
+            status=rng.choice(("active", "active", "active", "paused", "completed")),
+            created_by=admin,
+        )
+        for i in range(volumes["jobs"])
+    ])
+    jobs = list(Job.objects.order_by("created_at", "id"))
+
+    if users and jobs:
+        # (job, freelancer) is unique; walk the pairs instead of sampling them
+        count = min(volumes["submissions"], len(users) * len(jobs))
+        _bulk(JobSubmission, [
+            JobSubmission(
+                job=jobs[i % len(jobs)],
+                freelancer=users[(i // len(jobs)) % len(users)],
+                status=rng.choice(("pending", "approved", "approved", "rejected")),
+                freelancer_earning=Decimal("0.50"),
+            )
+            for i in range(count)
+        ])
+
+    if users:
+        rows = [
+            Transaction(
+                user=rng.choice(users),
+                transaction_type="earning" if rng.random() < 0.9 else "commission",
+                amount=Decimal("0.50"),
+                description="Seeded earning",
+            )
+            for _ in range(volumes["transactions"])
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            Transaction.objects.record_many(rows[start:start + BATCH_SIZE])
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return admin
+
+
+def prepare_scenarios(count, run_tag):
+    """
+    Per-run state for `count` requests of each scenario. Returns
+    name -> list of (method, path, data, token), one entry per request.
+    """
+    admin_token = _token(User.objects.get(username="bench-admin"))
+    ads = list(Ad.objects.filter(status="active").order_by("id"))
+    # Keep to ads whose pacing caps leave room for every paid view of the run
+    paid = pacing.database_totals([ad.pk for ad in ads], pacing.today())
+    ads = [
+        ad for ad in ads
+        if ad.daily_budget is None and (not ad.max_show or ad.max_show - paid[ad.pk][0] >= 2 * count)
+    ]
+    if not ads:
+        raise ValueError("The benchmark needs at least one active ad with room under its pacing caps.")
+    background = list(Token.objects.filter(user__username__startswith="bench-user-").values_list("key", flat=True)[:500])
+    background = background or [admin_token]
+
+    def pool(name):
+        return _make_users(f"bench-{run_tag}-{name}-", count)
+
+    # Distinct users per request, so neither the 24h cooldown nor the
+    # 10-per-30-minutes limit ever applies
+    starters = pool("start")
+    completers = pool("complete")
+    AdSession.objects.bulk_create([
+        AdSession(user=user, ad=ads[i % len(ads)]) for i, user in enumerate(completers)
+    ])
+    # started_at is auto_now_add; backdate the sessions past every ad's duration
+    AdSession.objects.filter(user__in=completers).update(started_at=timezone.now() - timedelta(hours=1))
+    api_users = pool("api")
+
+    category = JobCategory.objects.order_by("id").first()
+    approval_job = Job.objects.create(
+        category=category, title=f"Benchmark approvals {run_tag}", freelancers_needed=count + 1,
+        earning_per_task=Decimal("0.50"), created_by=User.objects.get(username="bench-admin"),
+    )
+    freelancers = pool("approve")
+    JobSubmission.objects.bulk_create([
+        JobSubmission(job=approval_job, freelancer=user, freelancer_earning=Decimal("0.50"))
+        for user in freelancers
+    ])
+    pending = list(
+        JobSubmission.objects.filter(job=approval_job).order_by("freelancer_id").values_list("id", flat=True)
+    )
+
+    tokens = {user.pk: key for user, key in _tokens(starters + completers + api_users)}
+    started_at = (timezone.now() - timedelta(hours=1)).isoformat()
+    return {
+        "user_ads": [("get", "/api/ads/user_ads/", None, background[i % len(background)]) for i in range(count)],
+        "start_view": [
+            ("post", f"/api/watch/{ads[i % len(ads)].pk}/start_view/", None, tokens[user.pk])
+            for i, user in enumerate(starters)
+        ],
+        "complete_view": [
+            ("post", f"/api/watch/{ads[i % len(ads)].pk}/complete_view/", None, tokens[user.pk])
+            for i, user in enumerate(completers)
+        ],
+        "api_complete": [
+            ("post", f"/api/watch/{ads[i % len(ads)].pk}/api_complete/", {"started_at": started_at}, tokens[user.pk])
+            for i, user in enumerate(api_users)
+        ],
+        "user_list": [("get", "/api/users/user-list/", None, admin_token)] * count,
+        "admin_stats": [("get", "/api/ads/admin_stats/", None, admin_token)] * count,
+        "job_list": [("get", "/api/gigs/jobs/", None, background[i % len(background)]) for i in range(count)],
+        "approve": [("post", f"/api/gigs/submissions/{pk}/approve/", None, admin_token) for pk in pending],
+    }
+
+
+def _tokens(users):
+    keys = dict(Token.objects.filter(user__in=users).values_list("user_id", "key"))
+    return [(user, keys[user.pk]) for user in users]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+def run_scenario(requests, warmup=0):
+    """Send the requests in order; the first `warmup` are not measured."""
+    client = Client()
+    latencies, queries, statuses = [], [], Counter()
+
+    def send(method, path, data, token):
+        headers = {"authorization": f"Token {token}"}
+        if method == "get":
+            return client.get(path, headers=headers)
+        return client.post(path, data or {}, content_type="application/json", headers=headers)
+
+    for request in requests[:warmup]:
+        send(*request)
+
+    measured = requests[warmup:]
+    started = time.perf_counter()
+    for request in measured:
+        with CaptureQueriesContext(connection) as captured:
+            began = time.perf_counter()
+            response = send(*request)
+            latencies.append((time.perf_counter() - began) * 1000)
+        queries.append(len(captured))
+        statuses[response.status_code] += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(measured),
+        "throughput_rps": round(len(measured) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+        "max_queries": max(queries, default=0),
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+# Boots the project through its WSGI entry point, as a server worker would,
+# and sends one request straight to the WSGI application
+COLD_START_SCRIPT = """
+import io, json, os, sys, time
+started = time.perf_counter()
+from django.conf import settings
+settings.DATABASES["default"]["NAME"] = os.environ["BENCHMARK_DATABASE"]
+from app.wsgi import application
+booted = time.perf_counter()
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+    "wsgi.input": io.BytesIO(), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+}
+statuses = []
+body = b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({"boot_ms": (booted - started) * 1000, "first_request_ms": (done - booted) * 1000,
+                  "status": int(statuses[0].split()[0])}))
+"""
+
+
+def cold_start(path="/api/ads/user_ads/", runs=3, database=None):
+    """
+    Start `runs` fresh interpreters against `database` (default: the current
+    connection's) and time each one's way to its first response for `path`:
+    process_ms from spawning the interpreter, boot_ms for importing
+    app.wsgi, first_request_ms for the request itself. Medians across runs.
+    """
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings"),
+        BENCHMARK_DATABASE=str(database or connection.settings_dict["NAME"]),
+    )
+    samples = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, path],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        elapsed = (time.perf_counter() - began) * 1000
+        if result.returncode:
+            raise RuntimeError(f"Cold start of {path} failed:\n{result.stderr[-2000:]}")
+        samples.append(dict(json.loads(result.stdout.splitlines()[-1]), process_ms=elapsed))
+
+    return {
+        "path": path,
+        "runs": runs,
+        "status": samples[-1]["status"],
+        **{
+            metric: round(statistics.median(sample[metric] for sample in samples), 1)
+            for metric in ("process_ms", "boot_ms", "first_request_ms")
+        },
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Rows of (scenario, metric, before, after, change %, regressed) for the
+    scenarios in both results. p95 latency regresses past `threshold`
+    percent, throughput below it, and any increase in queries per request
+    is a regression. Cold start is compared too; its total process time
+    regresses past `threshold` percent.
+    """
+    rows = []
+    for name, after in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, worse in (
+            ("p50_ms", None),
+            ("p95_ms", lambda change: change > threshold),
+            ("throughput_rps", lambda change: change < -threshold),
+            ("queries_per_request", lambda change: change > 0),
+        ):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else (0.0 if new == old else math.inf)
+            rows.append((name, metric, old, new, change, bool(worse and worse(change))))
+
+    before, after = baseline.get("cold_start"), current.get("cold_start")
+    if before and after:
+        for metric in ("process_ms", "boot_ms", "first_request_ms"):
+            old, new = before.get(metric), after.get(metric)
+            if old and new is not None:
+                change = (new - old) / old * 100
+                rows.append(("cold_start", metric, old, new, change, metric == "process_ms" and change > threshold))
+    return rows
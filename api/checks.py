@@ -0,0 +1,41 @@
+"""
+System checks for settings that only work on a cache shared between workers.
+
+The ad pacing counters (ads.pacing) and the snapshot versions
+(api.snapshots) move by atomic incr in the cache. On a per-process
+LocMemCache every worker keeps its own counts, so max_show and
+daily_budget are overshot by the number of workers and an invalidation only
+reaches the worker that made it.
+"""
+from django.conf import settings
+from django.core import checks
+
+LOCAL_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+
+def _users():
+    """(setting name, cache alias) for each enabled feature that needs a shared cache."""
+    pacing = getattr(settings, "AD_PACING", {})
+    if pacing.get("ENABLED", True):
+        yield "AD_PACING", pacing.get("CACHE_ALIAS", "default")
+    if getattr(settings, "RESPONSE_SNAPSHOTS", {}).get("ENABLED", True):
+        yield "RESPONSE_SNAPSHOTS", "default"
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    for name, alias in _users():
+        backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+        if backend != LOCAL_BACKEND:
+            continue
+        level = checks.Warning if settings.DEBUG else checks.Error
+        errors.append(
+            level(
+                f"{name} is enabled on the per-process cache {alias!r} ({backend}).",
+                hint="Set REDIS_URL or point CACHES at another shared backend, or disable "
+                     f"{name}. A single-process deployment can silence this check.",
+                id="api.W001" if settings.DEBUG else "api.E001",
+            )
+        )
+    return errors
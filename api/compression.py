@@ -0,0 +1,113 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses responses whose content type is listed in
+COMPRESSION["CONTENT_TYPES"] and whose body is at least MIN_SIZE bytes. It
+uses brotli when the client accepts it and the optional `brotli` package is
+installed, and gzip otherwise. Smaller bodies are sent as they are: for
+them the headers cost more than compression saves.
+
+A response can carry ready-made bodies in a `precompressed` attribute
+({"br": ..., "gzip": ...}, built with precompress()). The middleware then
+serves the matching one instead of compressing again, which is how
+snapshot responses (api.snapshots) are compressed once and not per request.
+
+Dynamically compressed gzip bodies get Django's random-length filename
+padding against BREACH-style length attacks. Brotli has no equivalent, so
+set BROTLI_DYNAMIC to False to keep it to precompressed, secret-free bodies.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Server preference when the client weighs encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _setting(key, default):
+    return getattr(settings, "COMPRESSION", {}).get(key, default)
+
+
+def negotiate(accept_encoding, available=ENCODINGS):
+    """The encoding in `available` to use for an Accept-Encoding header, or None."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=_setting("BROTLI_QUALITY", 5))
+    # mtime=0 keeps the output stable, so equal bodies compress to equal bytes
+    return gzip.compress(body, compresslevel=_setting("GZIP_LEVEL", 6), mtime=0)
+
+
+def precompress(body):
+    """Every supported encoding of `body`; empty when it is below MIN_SIZE."""
+    if len(body) < _setting("MIN_SIZE", 1024):
+        return {}
+    return {encoding: compress(body, encoding) for encoding in ENCODINGS}
+
+
+def compressible(response):
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    return content_type in _setting("CONTENT_TYPES", ("application/json",))
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding") or not compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        precompressed = getattr(response, "precompressed", None) or {}
+        available = ENCODINGS
+        if "br" not in precompressed and not _setting("BROTLI_DYNAMIC", True):
+            available = ("gzip",)
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), available)
+        if encoding is None:
+            return response
+
+        body = precompressed.get(encoding)
+        if body is None:
+            if len(response.content) < _setting("MIN_SIZE", 1024):
+                return response
+            if encoding == "gzip":
+                body = compress_string(response.content, max_random_bytes=_setting("GZIP_RANDOM_BYTES", 100))
+            else:
+                body = compress(response.content, encoding)
+            if len(body) >= len(response.content):
+                return response
+
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = encoding
+        # The compressed bytes differ from the identity ones, so a strong ETag no longer holds
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,195 @@
+"""
+Concurrency correctness harness for the watch and approval paths.
+
+Double credits and overbooked jobs only show up when requests race, so each
+scenario gives every simulated user one request per worker and releases the
+workers together: `workers` identical requests hit complete_view,
+api_complete (ads and third-party) or approve for the same user, ad or
+submission at the same moment. Workers are threads or forked processes with
+their own database connections, so this needs a file-backed database.
+
+Afterwards the queued earnings are applied and check_invariants() verifies
+that no race got through: earnings equal the AdViews behind them, a user
+earns from an ad at most once per cooldown, no job completes more
+freelancers than it needs and no submission is paid twice.
+"""
+import multiprocessing
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Count, Sum
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from ads.credits import COOLDOWN
+from ads.models import Ad, AdSession, AdView, UserEarning
+from gigs.models import Job, JobCategory, JobSubmission, Transaction
+from .benchmarking import _make_users
+
+SCENARIOS = ("complete_view", "api_complete", "thirdparty_api_complete", "approve")
+
+
+def setup(users, tag):
+    """
+    Fresh fixtures for one run. Returns scenario -> list of request groups;
+    a group holds one user's (method, path, data, token) and is sent once
+    by every worker.
+    """
+    admin = User.objects.create_superuser(f"race-admin-{tag}@bench.local", f"race-admin-{tag}", None)
+    admin_token = Token.objects.create(user=admin).key
+
+    ad = Ad.objects.create(
+        title=f"Race {tag}", category="visit", amount=Decimal("0.0100"), duration=5, max_show=0,
+        status="active", ad_type="url", ad_input_url="https://example.com/race",
+    )
+    started_at = (timezone.now() - timedelta(minutes=5)).isoformat()
+
+    completers = _make_users(f"race-{tag}-complete-", users)
+    AdSession.objects.bulk_create([AdSession(user=user, ad=ad) for user in completers])
+    # started_at is auto_now_add; backdate the sessions past the ad's duration
+    AdSession.objects.filter(user__in=completers).update(started_at=timezone.now() - timedelta(minutes=5))
+    api_users = _make_users(f"race-{tag}-api-", users)
+    partner_users = _make_users(f"race-{tag}-thirdparty-", users)
+
+    # Half as many slots as submissions, so approvals also race for the last slots
+    category, _ = JobCategory.objects.get_or_create(slug="race", defaults={"name": "Race"})
+    job = Job.objects.create(
+        category=category, title=f"Race {tag}", freelancers_needed=max(1, users // 2),
+        earning_per_task=Decimal("1.00"), created_by=admin,
+    )
+    freelancers = _make_users(f"race-{tag}-approve-", users)
+    JobSubmission.objects.bulk_create([
+        JobSubmission(job=job, freelancer=user, freelancer_earning=Decimal("1.00")) for user in freelancers
+    ])
+
+    tokens = dict(
+        User.objects.filter(username__startswith=f"race-{tag}-").values_list("pk", "auth_token__key")
+    )
+    return {
+        "complete_view": [
+            ("post", f"/api/watch/{ad.pk}/complete_view/", None, tokens[user.pk]) for user in completers
+        ],
+        "api_complete": [
+            ("post", f"/api/watch/{ad.pk}/api_complete/", {"started_at": started_at}, tokens[user.pk])
+            for user in api_users
+        ],
+        "thirdparty_api_complete": [
+            ("post", f"/api/view/{ad.pk}/api_complete/", {"started_at": started_at}, tokens[user.pk])
+            for user in partner_users
+        ],
+        "approve": [
+            ("post", f"/api/gigs/submissions/{pk}/approve/", None, admin_token)
+            for pk in JobSubmission.objects.filter(job=job).values_list("pk", flat=True)
+        ],
+    }
+
+
+def _send_all(requests, barrier):
+    """One worker: wait for the others, then send its requests in order."""
+    client = Client()
+    results = []
+    try:
+        barrier.wait()
+        for method, path, data, token in requests:
+            headers = {"authorization": f"Token {token}"}
+            started = time.perf_counter()
+            if method == "get":
+                response = client.get(path, headers=headers)
+            else:
+                response = client.post(path, data or {}, content_type="application/json", headers=headers)
+            results.append((response.status_code, time.perf_counter() - started))
+    finally:
+        connections.close_all()
+    return results
+
+
+def _process_worker(requests, barrier, queue):
+    queue.put(_send_all(requests, barrier))
+
+
+def race(groups, workers, mode="threads"):
+    """
+    Send every group from `workers` parallel clients at once. Returns
+    (status counts, latencies, elapsed seconds).
+    """
+    chunks = [list(groups) for _ in range(workers)]
+    started = time.perf_counter()
+    if mode == "threads":
+        barrier = threading.Barrier(workers)
+        outcomes = [None] * workers
+
+        def run(index):
+            outcomes[index] = _send_all(chunks[index], barrier)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        # Forked children must not share the parent's open connection
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        barrier, queue = context.Barrier(workers), context.Queue()
+        processes = [
+            context.Process(target=_process_worker, args=(chunk, barrier, queue)) for chunk in chunks
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for outcome in outcomes for status, _ in outcome)
+    latencies = sorted(latency for outcome in outcomes for _, latency in outcome)
+    return statuses, latencies, elapsed
+
+
+def check_invariants():
+    """(name, violations) for every invariant; an empty list means it holds."""
+    results = []
+
+    viewed = dict(
+        AdView.objects.values("user_id").annotate(total=Sum("earned_amount")).values_list("user_id", "total")
+    )
+    earned = dict(UserEarning.objects.values_list("user_id", "total_earned"))
+    results.append(("earnings equal the sum of AdView.earned_amount", [
+        f"user {user_id}: earned {earned.get(user_id, 0)}, views add up to {total}"
+        for user_id, total in sorted(viewed.items())
+        if earned.get(user_id, Decimal(0)) != total
+    ]))
+
+    views = defaultdict(list)
+    for user_id, ad_id, viewed_at in AdView.objects.values_list("user_id", "ad_id", "viewed_at"):
+        views[(user_id, ad_id)].append(viewed_at)
+    results.append(("at most one credit per ad per cooldown", [
+        f"user {user_id} earned twice from ad {ad_id} within {COOLDOWN}"
+        for (user_id, ad_id), times in sorted(views.items())
+        if any(later - earlier < COOLDOWN for earlier, later in zip(sorted(times), sorted(times)[1:]))
+    ]))
+
+    approved = dict(
+        JobSubmission.objects.filter(status="approved").values("job_id")
+        .annotate(n=Count("id")).values_list("job_id", "n")
+    )
+    results.append(("freelancers_completed <= freelancers_needed", [
+        f"job {job.pk}: {job.freelancers_completed} completed of {job.freelancers_needed} needed"
+        f" ({approved.get(job.pk, 0)} approved submissions)"
+        for job in Job.objects.only("freelancers_completed", "freelancers_needed")
+        if job.freelancers_completed > job.freelancers_needed
+        or job.freelancers_completed != approved.get(job.pk, 0)
+    ]))
+
+    results.append(("each approved submission is paid once", [
+        f"submission {row['job_submission_id']}: {row['n']} {row['transaction_type']} rows"
+        for row in Transaction.objects.filter(job_submission__isnull=False)
+        .values("job_submission_id", "transaction_type").annotate(n=Count("id")).filter(n__gt=1)
+    ]))
+    return results
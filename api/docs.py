@@ -0,0 +1,32 @@
+"""
+API documentation views: the Swagger UI and ReDoc pages, and the prebuilt
+schema documents they load (api.schema). The URLconf reaches them through
+api.lazy, so drf_yasg is only imported once the docs are requested.
+"""
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+from . import schema as api_schema
+
+# The UIs load the prebuilt documents below (SWAGGER_SETTINGS["SPEC_URL"])
+schema_view = get_schema_view(
+   api_schema.INFO,
+   public=True,
+   permission_classes=(permissions.AllowAny,),
+)
+
+swagger_ui = schema_view.with_ui('swagger', cache_timeout=0)
+redoc_ui = schema_view.with_ui('redoc', cache_timeout=0)
+
+
+@condition(etag_func=lambda request, format: api_schema.load()["documents"][format]["etag"])
+def schema(request, format):
+    """The prebuilt OpenAPI document (api.schema), revalidated through its ETag."""
+    document = api_schema.load()["documents"][format]
+    response = HttpResponse(document["body"], content_type=document["content_type"])
+    response.precompressed = document["encodings"]
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
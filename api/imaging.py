@@ -0,0 +1,122 @@
+"""
+Shared process pool for CPU-bound Pillow work (proof thumbnails, ad banner
+variants).
+
+Resizing holds the GIL, so task handlers that generate thumbnails or image
+variants hand the work to a pool of worker processes instead of doing it
+inline. The pool is created lazily, once per process, and sized by
+settings.IMAGING["PROCESSES"]; 0 runs everything inline (useful in tests).
+
+Worker functions must be module-level so they can be pickled, and only take
+file paths: they never touch the ORM or Django settings.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _processes():
+    return getattr(settings, "IMAGING", {}).get("PROCESSES", 2)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process with open DB connections and threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=_processes(), mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def run_many(func, jobs):
+    """
+    Run func(*args) for every args tuple in jobs. Returns results in order;
+    a job that raised yields its exception instead, so one bad image never
+    fails the batch.
+    """
+    if not jobs:
+        return []
+    if _processes() == 0:
+        results = []
+        for args in jobs:
+            try:
+                results.append(func(*args))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    futures = [get_pool().submit(func, *args) for args in jobs]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def resize(src, dest, max_size, quality=80, image_format="JPEG"):
+    """Write a copy of src scaled to fit in max_size x max_size. Returns its size in bytes."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        # JPEG can decode straight to a reduced scale, which is most of the speedup
+        image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size))
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        image.save(tmp, image_format, quality=quality, optimize=True)
+        os.replace(tmp, dest)
+    return os.path.getsize(dest)
+
+
+def render_widths(src, dest_base, widths, formats, quality=80):
+    """
+    Write src at each width (never upscaled) in each format, to
+    "{dest_base}-{width}.{ext}". The source is decoded once. Returns a list
+    of {"width", "height", "format", "path", "bytes"} dicts.
+    """
+    from PIL import Image, ImageOps
+
+    extensions = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+    renditions = []
+    with Image.open(src) as original:
+        original.draft("RGB", (max(widths), max(widths) * 4))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+
+        targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+        os.makedirs(os.path.dirname(dest_base), exist_ok=True)
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            # Each step scales down the previous rendition, which is cheaper than the original
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for image_format in formats:
+                image_format = image_format.upper()
+                frame = image
+                if image_format == "JPEG" and frame.mode not in ("RGB", "L"):
+                    frame = frame.convert("RGB")
+                path = f"{dest_base}-{width}.{extensions[image_format]}"
+                tmp = f"{path}.{os.getpid()}.tmp"
+                frame.save(tmp, image_format, quality=quality, optimize=True)
+                os.replace(tmp, path)
+                renditions.append({
+                    "width": width, "height": height, "format": image_format.lower(),
+                    "path": path, "bytes": os.path.getsize(path),
+                })
+    return renditions
@@ -0,0 +1,34 @@
+"""
+Views imported on first use.
+
+Docs and admin-only routes pull in heavy modules (drf_yasg, the CKEditor
+upload handling) that the API itself never needs. Routing them through
+lazy_view() keeps those imports out of URLconf loading, and so out of
+worker boot, until the first request for one of them.
+
+The wrapper is not csrf_exempt, so use it for GET-only views or views that
+expect CSRF protection anyway.
+"""
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    def __init__(self, path):
+        self.path = path
+        self.view = None
+
+    def resolve(self):
+        if self.view is None:
+            self.view = import_string(self.path)
+        return self.view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.resolve()(request, *args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyView {self.path}>"
+
+
+def lazy_view(path):
+    """A view for the URLconf that imports `path` (dotted) on its first request."""
+    return LazyView(path)
@@ -0,0 +1,107 @@
+import io
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from ads.models import Ad
+from ads.serializers import AdSerializer, UserListSerializer
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from gigs.models import Job, JobCategory, ProofRequirement
+from gigs.serializers import JobSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSONRenderer/JSONParser against api.renderers on JobSerializer, "
+        "AdSerializer and UserListSerializer payloads from a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=500)
+        parser.add_argument("--ads", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; the fast classes use the stdlib."))
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            payloads = self.payloads(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        stock, fast = JSONRenderer(), FastJSONRenderer()
+        self.stdout.write(
+            f"\n{'payload':<26}{'size':>10}{'render ms':>11}{'fast ms':>10}{'x':>6}"
+            f"{'parse ms':>10}{'fast ms':>10}{'x':>6}"
+        )
+        for name, data in payloads.items():
+            stock_body, fast_body = stock.render(data), fast.render(data)
+            if json.loads(stock_body) != json.loads(fast_body):
+                raise CommandError(f"{name}: the renderers disagree.")
+
+            render = self.time(lambda: stock.render(data), options["repeat"])
+            fast_render = self.time(lambda: fast.render(data), options["repeat"])
+            parse = self.time(lambda: self.parse(JSONParser(), stock_body), options["repeat"])
+            fast_parse = self.time(lambda: self.parse(FastJSONParser(), stock_body), options["repeat"])
+            self.stdout.write(
+                f"{name:<26}{len(stock_body) / 1024:>8.0f}kB{render:>11.2f}{fast_render:>10.2f}"
+                f"{render / fast_render:>6.1f}{parse:>10.2f}{fast_parse:>10.2f}{parse / fast_parse:>6.1f}"
+            )
+
+    @staticmethod
+    def parse(parser, body):
+        return parser.parse(io.BytesIO(body), "application/json", {})
+
+    @staticmethod
+    def time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def payloads(self, options):
+        admin = User.objects.create_superuser("bench@example.com", "bench", None)
+        category = JobCategory.objects.create(name="General", slug="general")
+        body = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "</p>"
+        Job.objects.bulk_create([
+            Job(
+                category=category, title=f"Job {i}", task_description=body, freelancers_needed=50,
+                earning_per_task=Decimal("0.50"), created_by=admin,
+            )
+            for i in range(options["jobs"])
+        ])
+        ProofRequirement.objects.bulk_create([
+            ProofRequirement(job=job, title=f"Proof {n}", proof_type="text", order=n)
+            for job in Job.objects.all() for n in range(2)
+        ])
+        Ad.objects.bulk_create([
+            Ad(
+                title=f"Ad {i}", category="visit", amount=Decimal("0.0125"), duration=30,
+                status="active", ad_type="url", ad_input_url=f"https://example.com/ads/{i}",
+            )
+            for i in range(options["ads"])
+        ])
+        User.objects.bulk_create([
+            User(email=f"u{i}@example.com", username=f"u{i}", password="!") for i in range(options["users"])
+        ])
+
+        jobs = Job.objects.select_related("category").prefetch_related("proof_requirements")
+        users = User.objects.select_related("userearning")
+        # Serializer output is computed once; only rendering and parsing are timed
+        return {
+            "JobSerializer (detail)": JobSerializer(jobs, many=True).data,
+            "AdSerializer": AdSerializer(Ad.objects.all(), many=True).data,
+            "UserListSerializer": UserListSerializer(users, many=True).data,
+        }
@@ -0,0 +1,83 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import PartnerAPIKey, User
+from api.throttling import PartnerRateThrottle, TokenBucketStore, store
+
+
+class _View:
+    throttle_scope = "bench"
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of PartnerRateThrottle (no database needed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100000, help="Throttle checks per thread.")
+        parser.add_argument("--threads", type=int, default=1)
+        parser.add_argument("--keys", type=int, default=100, help="Distinct partner keys to spread requests over.")
+        parser.add_argument("--budget-us", type=float, default=100.0, help="Fail if the mean exceeds this.")
+
+    def handle(self, *args, **options):
+        n, threads = options["requests"], options["threads"]
+        factory = APIRequestFactory()
+        view = _View()
+        partner = User(pk=1, email="bench@example.com", role="partner")
+        # In-memory keys with quotas high enough that every request is allowed
+        keys = [
+            PartnerAPIKey(pk=i + 1, user=partner, quotas={"*": f"{10 ** 9}/s"})
+            for i in range(options["keys"])
+        ]
+
+        def make_request(api_key):
+            request = Request(factory.get("/api/view/1/start_view/"))
+            request.user, request.auth = partner, api_key
+            return request
+
+        store.reset()
+        results = []
+
+        def run():
+            throttle = PartnerRateThrottle()
+            requests = [make_request(keys[i % len(keys)]) for i in range(min(n, 1000))]
+            timings = []
+            for i in range(n):
+                request = requests[i % len(requests)]
+                started = time.perf_counter()
+                throttle.allow_request(request, view)
+                timings.append(time.perf_counter() - started)
+            results.append(timings)
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for timing in results for t in timing)
+        mean_us = statistics.fmean(timings) * 1e6
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1e6
+
+        self.stdout.write(f"{len(timings)} checks across {threads} thread(s), {options['keys']} key(s)")
+        self.stdout.write(f"throughput: {len(timings) / elapsed:,.0f} checks/s")
+        self.stdout.write(f"mean {mean_us:.1f}us  p50 {pct(0.5):.1f}us  p95 {pct(0.95):.1f}us  p99 {pct(0.99):.1f}us")
+
+        # Leasing cost on its own: one shared-cache round trip per LEASE_SIZE requests
+        bucket_store = TokenBucketStore(lease_size=1)
+        started = time.perf_counter()
+        for i in range(10000):
+            bucket_store.consume(f"bench-lease:{i % 100}", 10 ** 9, 1)
+        self.stdout.write(f"worst case (lease every request): {(time.perf_counter() - started) * 100:.1f}us")
+
+        if mean_us > options["budget_us"]:
+            raise CommandError(f"Mean {mean_us:.1f}us exceeds the {options['budget_us']}us budget")
+        self.stdout.write(self.style.SUCCESS(f"Within the {options['budget_us']}us budget."))
@@ -0,0 +1,148 @@
+import json
+import platform
+import subprocess
+import uuid
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import User
+from api import benchmarking
+from api.renderers import renderer_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and drive the hot endpoints (ad feed and watch flow, "
+        "admin listings, job listing, submission approval) through the full request "
+        "stack. Reports throughput, latency percentiles and queries per request, "
+        "optionally writes them as JSON and compares them with an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmarking.DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first.")
+        parser.add_argument(
+            "--only", nargs="+", choices=benchmarking.SCENARIOS, help="Run just these scenarios."
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="JSON results of an earlier run to compare against.")
+        parser.add_argument(
+            "--threshold", type=float, default=10.0,
+            help="Percent change in p95 latency or throughput counted as a regression.",
+        )
+        parser.add_argument(
+            "--fail-on-regression", action="store_true", help="Exit non-zero when --compare finds a regression."
+        )
+        parser.add_argument(
+            "--cold-starts", type=int, default=3,
+            help="Fresh worker processes to time from start to first response (0 skips).",
+        )
+        parser.add_argument("--cold-start-path", default="/api/ads/user_ads/", help="Request the cold starts send.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded scratch database between runs.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                baseline = json.load(fh)
+
+        volumes = {name: options[name] for name in benchmarking.DEFAULT_VOLUMES}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            if not User.objects.filter(username="bench-admin").exists():
+                self.stdout.write("Seeding {}...".format(", ".join(f"{n} {k}" for k, n in volumes.items())))
+                benchmarking.seed_dataset(volumes)
+            results = self.run(options, volumes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self.report_comparison(baseline, results, options)
+
+    def run(self, options, volumes):
+        names = options["only"] or benchmarking.SCENARIOS
+        count = options["warmup"] + options["requests"]
+        # A fresh tag per run keeps the per-request pools apart when --keepdb reuses the data
+        requests = benchmarking.prepare_scenarios(count, uuid.uuid4().hex[:8])
+
+        scenarios = {}
+        for name in names:
+            self.stdout.write(f"Running {name}...")
+            scenarios[name] = benchmarking.run_scenario(requests[name], warmup=options["warmup"])
+
+        cold_start = None
+        if options["cold_starts"]:
+            if connection.vendor == "sqlite" and connection.is_in_memory_db():
+                self.stderr.write("Skipping cold starts: other processes cannot open an in-memory database.")
+            else:
+                self.stdout.write("Timing cold starts...")
+                cold_start = benchmarking.cold_start(options["cold_start_path"], runs=options["cold_starts"])
+        return {
+            "meta": {
+                "commit": self.git_commit(),
+                "timestamp": timezone.now().isoformat(),
+                "volumes": volumes,
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "database": connection.vendor,
+                "debug": settings.DEBUG,
+                "json": renderer_backend(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+            },
+            "scenarios": scenarios,
+            "cold_start": cold_start,
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results):
+        self.stdout.write(
+            f"\n{'scenario':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}  statuses"
+        )
+        for name, row in results["scenarios"].items():
+            statuses = " ".join(f"{code}x{n}" for code, n in row["statuses"].items())
+            self.stdout.write(
+                f"{name:<16}{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['queries_per_request']:>10.2f}  {statuses}"
+            )
+        cold_start = results.get("cold_start")
+        if cold_start:
+            self.stdout.write(
+                f"\nCold start to first response ({cold_start['path']}, median of {cold_start['runs']}): "
+                f"{cold_start['process_ms']:.0f} ms total, {cold_start['boot_ms']:.0f} ms boot, "
+                f"{cold_start['first_request_ms']:.0f} ms first request"
+            )
+
+    def report_comparison(self, baseline, results, options):
+        rows = benchmarking.compare(baseline, results, options["threshold"])
+        self.stdout.write(
+            f"\nAgainst {baseline.get('meta', {}).get('commit') or options['compare']}:\n"
+            f"{'scenario':<16}{'metric':<22}{'before':>10}{'after':>10}{'change':>10}"
+        )
+        for name, metric, before, after, change, regressed in rows:
+            line = f"{name:<16}{metric:<22}{before:>10.2f}{after:>10.2f}{change:>+9.1f}%"
+            self.stdout.write(self.style.ERROR(line + "  REGRESSION") if regressed else line)
+
+        regressions = [row for row in rows if row[-1]]
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}.")
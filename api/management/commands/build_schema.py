@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema once and store it, with its precompressed "
+        "encodings and ETags, where /api/swagger.json and /api/swagger.yaml serve it from."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only report whether the stored schema matches the current sources; exit non-zero if stale.",
+        )
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the stored schema is current.")
+
+    def handle(self, *args, **options):
+        current = schema.fingerprint()
+        stored = schema.read(current)
+        if options["check"]:
+            if stored is None:
+                raise CommandError("The stored schema is missing or stale; run build_schema.")
+            self.stdout.write("The stored schema is current.")
+            return
+        if stored is not None and not options["force"]:
+            self.stdout.write(f"The stored schema is current ({current[:12]}).")
+            return
+
+        built = schema.build(current)
+        directory = schema.write(built)
+        for name, document in built["documents"].items():
+            sizes = ", ".join(f"{encoding} {len(body)}" for encoding, body in document["encodings"].items())
+            self.stdout.write(f"openapi.{name}: {len(document['body'])} bytes ({sizes or 'uncompressed'})")
+        self.stdout.write(self.style.SUCCESS(f"Schema {current[:12]} written to {directory}"))
@@ -0,0 +1,64 @@
+import logging
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import concurrency
+from api.benchmarking import percentile
+from api.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Race parallel clients (threads or processes) at complete_view, api_complete, "
+        "the third-party api_complete and approve on a scratch file database, then "
+        "check that no earning was paid twice and no job was overbooked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Parallel clients; each sends every request.")
+        parser.add_argument("--users", type=int, default=20, help="Users (or submissions) raced per scenario.")
+        parser.add_argument("--mode", choices=["threads", "processes", "both"], default="both")
+        parser.add_argument("--only", nargs="+", choices=concurrency.SCENARIOS, help="Run just these scenarios.")
+
+    def handle(self, *args, **options):
+        test_name = connection.settings_dict["TEST"]["NAME"]
+        if connection.vendor == "sqlite" and (not test_name or connection.creation.is_in_memory_db(test_name)):
+            raise CommandError("Workers need a file-backed database; set DATABASES TEST NAME to a file.")
+
+        modes = ["threads", "processes"] if options["mode"] == "both" else [options["mode"]]
+        # Losing a race is a 4xx by design; don't log every one of them
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(
+                f"\n{'mode':<11}{'scenario':<26}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}  statuses"
+            )
+            for mode in modes:
+                groups = concurrency.setup(options["users"], uuid.uuid4().hex[:8])
+                for name in options["only"] or concurrency.SCENARIOS:
+                    statuses, latencies, elapsed = concurrency.race(groups[name], options["workers"], mode)
+                    total = sum(statuses.values())
+                    self.stdout.write(
+                        f"{mode:<11}{name:<26}{total / elapsed:>9.1f}"
+                        f"{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 99) * 1000:>9.2f}  "
+                        + " ".join(f"{code}x{n}" for code, n in sorted(statuses.items()))
+                    )
+
+            run_pending()
+            failed = 0
+            self.stdout.write("")
+            for name, violations in concurrency.check_invariants():
+                if not violations:
+                    self.stdout.write(self.style.SUCCESS(f"OK    {name}"))
+                    continue
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"FAIL  {name} ({len(violations)})"))
+                for violation in violations[:10]:
+                    self.stdout.write(f"      {violation}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if failed:
+            raise CommandError(f"{failed} invariant(s) violated.")
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: this process has already imported everything
+SCRIPT = """
+import django
+django.setup()
+if {urls!r}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+"""
+
+
+def parse_importtime(output):
+    """(module, self µs, cumulative µs, depth) rows from `python -X importtime` stderr."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile the imports done while Django starts (django.setup() and, by default, "
+        "loading the URLconf) with `python -X importtime`, and report the slowest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=25, help="Rows to show.")
+        parser.add_argument(
+            "--sort", choices=("cumulative", "self"), default="cumulative",
+            help="Rank modules by time including (cumulative) or excluding (self) their own imports.",
+        )
+        parser.add_argument(
+            "--packages", action="store_true", help="Sum self time per top-level package instead of per module."
+        )
+        parser.add_argument("--no-urls", action="store_true", help="Stop after django.setup().")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings"))
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", SCRIPT.format(urls=not options["no_urls"])],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        rows = parse_importtime(result.stderr)
+        if result.returncode:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+            raise CommandError("Django failed to start:\n" + "\n".join(errors[-20:]))
+
+        total = sum(self_us for _, self_us, _, _ in rows)
+        self.stdout.write(f"{len(rows)} modules imported in {total / 1000:.1f} ms\n")
+        if options["packages"]:
+            packages = defaultdict(lambda: [0, 0])
+            for name, self_us, _, _ in rows:
+                package = packages[name.split(".")[0]]
+                package[0] += self_us
+                package[1] += 1
+            ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+            self.stdout.write(f"{'self ms':>10}{'share':>8}{'modules':>9}  package")
+            for name, (self_us, count) in ranked[:options["limit"]]:
+                self.stdout.write(f"{self_us / 1000:>10.1f}{self_us / total:>8.1%}{count:>9}  {name}")
+            return
+
+        key = 2 if options["sort"] == "cumulative" else 1
+        # Top-level rows only when ranking cumulatively, or parents would repeat their children
+        candidates = [row for row in rows if row[3] == 0] if key == 2 else rows
+        self.stdout.write(f"{'cumul ms':>10}{'self ms':>10}  module")
+        for name, self_us, cumulative_us, _ in sorted(candidates, key=lambda row: row[key], reverse=True)[:options["limit"]]:
+            self.stdout.write(f"{cumulative_us / 1000:>10.1f}{self_us / 1000:>10.1f}  {name}")
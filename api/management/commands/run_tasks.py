@@ -0,0 +1,60 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from api import tasks
+
+
+class Command(BaseCommand):
+    help = "Run background task workers against the database-backed queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Tasks claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain due tasks and exit.")
+
+    def handle(self, *args, **options):
+        tasks.requeue_stale()
+
+        if options["once"]:
+            count = tasks.run_pending(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Processed {count} task(s)."))
+            return
+
+        if options["processes"] <= 1:
+            self.work(options["batch_size"], options["sleep"])
+            return
+
+        # Children must not inherit the parent's database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=(options["batch_size"], options["sleep"]))
+            for _ in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} worker process(es).")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+    def work(self, batch_size, sleep):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        worker = tasks.worker_id()
+
+        while not stopping:
+            close_old_connections()
+            claimed = tasks.claim(batch_size, worker)
+            if not claimed:
+                time.sleep(sleep)
+                continue
+            succeeded, failed = tasks.process(claimed)
+            self.stdout.write(f"[{worker}] done: {succeeded}, failed: {failed}")
@@ -0,0 +1,206 @@
+"""
+Per-request query and latency metrics.
+
+MetricsMiddleware samples REQUEST_METRICS["SAMPLE_RATE"] of requests and
+records, per view: latency, query count, SQL time, serializer time and
+response size. Queries are counted by a database execute_wrapper installed
+on every connection, and serializer time by wrapping BaseSerializer.data;
+both are no-ops outside a sampled request. Results go into in-process
+histograms served in Prometheus text format by api.views.metrics.
+
+Histograms are per process: scrape each worker, or sum them downstream.
+REQUEST_METRICS["ENABLED"] = False takes the middleware out of the stack
+and leaves the query wrapper and serializer timer uninstalled (api.apps).
+"""
+import contextvars
+import random
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _setting(key, default):
+    return getattr(settings, "REQUEST_METRICS", {}).get(key, default)
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "serializer_seconds", "serializing")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label value (the view name)."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                # One count per bucket plus +Inf, then sum
+                series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(label, list(counts), total) for label, (counts, total) in self._series.items()]
+        for label, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+request_duration = Histogram("app_request_duration_seconds", "Request latency.", LATENCY_BUCKETS)
+request_queries = Histogram("app_request_queries", "Database queries per request.", QUERY_BUCKETS)
+request_sql = Histogram("app_request_sql_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS)
+request_serializer = Histogram(
+    "app_request_serializer_seconds", "Time spent producing serializer.data per request.", LATENCY_BUCKETS
+)
+response_bytes = Histogram("app_response_bytes", "Response body size.", BYTES_BUCKETS)
+HISTOGRAMS = (request_duration, request_queries, request_sql, request_serializer, response_bytes)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper: times queries made during a sampled request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver; wrappers live as long as the connection."""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def install_serializer_timer():
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, "timed", False):
+        return
+
+    def data(self):
+        stats = _current.get()
+        # Nested serializers and .data called from within .data are counted once
+        if stats is None or stats.serializing:
+            return original.fget(self)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - started
+            stats.serializing = False
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unresolved"
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = _setting("SAMPLE_RATE", 1.0)
+        self.exclude = tuple(_setting("EXCLUDE_PATHS", ()))
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self, request):
+        return random.random() < self.sample_rate and not request.path.startswith(self.exclude)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled(request):
+            return self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled(request):
+            return await self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, started)
+        return response
+
+    def _start(self):
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _record(self, request, response, stats, started):
+        label = _view_label(request)
+        request_duration.observe(label, time.perf_counter() - started)
+        request_queries.observe(label, stats.queries)
+        request_sql.observe(label, stats.sql_seconds)
+        request_serializer.observe(label, stats.serializer_seconds)
+        if not response.streaming:
+            response_bytes.observe(label, len(response.content))
@@ -0,0 +1,175 @@
+"""
+Slow-query log and N+1 detector.
+
+While QUERY_INSPECTOR["ENABLED"] is on, QueryInspectorMiddleware fingerprints
+every SQL statement a request runs (literals and IN-lists collapsed, so
+"the same query for another row" matches). A SELECT shape repeated more than
+N_PLUS_ONE_THRESHOLD times in one request is reported as an N+1, and any
+statement slower than SLOW_QUERY_MS is logged. Both reports name the view,
+the serializer field being rendered (if any) and the first project frame
+that issued the query.
+
+Reports go to the "api.querywatch" logger. With RAISE on (the default under
+`manage.py test`) an N+1 raises NPlusOneDetected instead, failing the test.
+Views can opt out with VIEWS_IGNORED.
+"""
+import contextvars
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("query_inspector", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:[^()]*)\)", re.IGNORECASE)
+
+# Frames from the instrumentation itself are never the origin
+_SKIP_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.py"),
+}
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def _setting(key, default):
+    return getattr(settings, "QUERY_INSPECTOR", {}).get(key, default)
+
+
+class NPlusOneDetected(Exception):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def query_origin(skip=2):
+    """(serializer field, project frame) for the query being executed."""
+    from rest_framework.fields import Field
+
+    base_dir = str(settings.BASE_DIR)
+    field = location = None
+    frame = sys._getframe(skip)
+    while frame is not None and (field is None or location is None):
+        if field is None:
+            owner = frame.f_locals.get("self")
+            if isinstance(owner, Field) and owner.field_name:
+                parent = type(owner.parent).__name__ if owner.parent is not None else ""
+                field = f"{parent}.{owner.field_name}"
+        if location is None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(base_dir) and "site-packages" not in filename and filename not in _SKIP_FILES:
+                location = f"{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return field, location
+
+
+class RequestQueries:
+    __slots__ = ("counts", "origins", "slow")
+
+    def __init__(self):
+        self.counts = Counter()
+        self.origins = {}
+        self.slow = []
+
+
+def inspect_query(execute, sql, params, many, context):
+    """execute_wrapper: fingerprints and times queries during an inspected request."""
+    queries = _current.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        shape = fingerprint(sql)
+        queries.counts[shape] += 1
+        # Origins are only looked up once per shape; walking the stack is not free
+        if shape not in queries.origins:
+            queries.origins[shape] = query_origin()
+        # BEGIN can wait on SQLite's write lock; that is contention, not a slow query
+        if elapsed_ms >= _setting("SLOW_QUERY_MS", 100) and not sql.startswith(_TRANSACTION_CONTROL):
+            queries.slow.append((elapsed_ms, sql, query_origin()))
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if inspect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspect_query)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else request.path
+
+
+class QueryInspectorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        queries = RequestQueries()
+        token = _current.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(_view_name(request), queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = RequestQueries()
+        token = _current.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(_view_name(request), queries)
+        return response
+
+    def report(self, view, queries):
+        for elapsed_ms, sql, (field, location) in queries.slow:
+            logger.warning(
+                "Slow query (%.0f ms) in %s, field %s, at %s: %s",
+                elapsed_ms, view, field or "-", location or "-", sql,
+            )
+
+        if view in _setting("VIEWS_IGNORED", ()):
+            return
+        threshold = _setting("N_PLUS_ONE_THRESHOLD", 5)
+        repeated = [
+            (shape, count) for shape, count in queries.counts.items()
+            if count > threshold and shape.lstrip().upper().startswith("SELECT")
+        ]
+        for shape, count in repeated:
+            field, location = queries.origins[shape]
+            message = (
+                f"N+1 in {view}: {count} queries of the same shape, "
+                f"field {field or '-'}, at {location or '-'}: {shape}"
+            )
+            if _setting("RAISE", False):
+                raise NPlusOneDetected(message)
+            logger.warning(message)
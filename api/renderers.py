@@ -0,0 +1,87 @@
+"""
+JSON rendering and parsing on orjson.
+
+FastJSONRenderer and FastJSONParser replace DRF's JSONRenderer and
+JSONParser in REST_FRAMEWORK. orjson encodes strings, numbers, dicts, lists
+and UUIDs in C. Decimal amounts (method fields and aggregates return them
+raw) take a one-line fast path. Datetimes, lazy strings and anything else
+go through DRF's own encoder, so clients see the same JSON as before.
+
+orjson is optional. Without it, and for output orjson can't produce
+(indented JSON for the browsable API, UNICODE_JSON off, integers beyond
+64 bits), both classes fall back to the stdlib implementation.
+"""
+import io
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # Datetimes go to _default so they keep DRF's format ("...Z", not "+00:00")
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ENCODE_ERROR = orjson.JSONEncodeError
+    DECODE_ERROR = orjson.JSONDecodeError
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        except ENCODE_ERROR:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-JavaScript-subset escaping as JSONRenderer
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except DECODE_ERROR:
+            # Let the stdlib parser decide, so errors read as they always have
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+def renderer_backend():
+    """Which JSON implementation the default renderer uses, for benchmarks and diagnostics."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]
+    if issubclass(renderer, FastJSONRenderer) and orjson is not None:
+        return f"orjson {orjson.__version__}"
+    return "json (stdlib)"
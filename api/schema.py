@@ -0,0 +1,203 @@
+"""
+Prebuilt OpenAPI schema.
+
+drf_yasg introspects every viewset to build the schema, which is too slow
+to repeat per request. Here it is generated once into JSON and YAML
+documents, stored with their precompressed encodings and ETags under
+SCHEMA_CACHE["DIR"], and served from there (api.docs.schema).
+
+The stored documents carry a fingerprint of the sources the schema comes
+from: every module of the project's apps and of the settings package, plus
+the schema settings. A process whose fingerprint differs from the
+stored one rebuilds and rewrites the documents on first use, so they only
+regenerate after those files change. `manage.py build_schema` prebuilds
+them at deploy time.
+
+The documents leave out `host` and `schemes`, so clients resolve the
+paths against whichever host served them.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import drf_yasg
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from rest_framework.request import Request
+
+from .compression import precompress
+
+logger = logging.getLogger(__name__)
+
+INFO = openapi.Info(
+    title="Job Portal - Opty IT",
+    default_version='v1',
+    description="This is the API documentation for our project",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="riyad.cse27@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+FORMATS = {
+    "json": (OpenAPICodecJson, "application/json"),
+    "yaml": (OpenAPICodecYaml, "application/yaml"),
+}
+
+# File suffix per content encoding
+SUFFIXES = {"gzip": "gz", "br": "br"}
+
+_loaded = None
+
+
+def _setting(key, default):
+    return getattr(settings, "SCHEMA_CACHE", {}).get(key, default)
+
+
+def _directory():
+    return Path(_setting("DIR", Path(settings.BASE_DIR) / "var" / "schema"))
+
+
+def source_files():
+    """
+    Every module of the project's own apps and of the package holding the
+    URLconf and settings. Pagination, throttling and authentication classes
+    shape the schema as much as the views do, so no module is left out;
+    only migrations, which the schema never reads, are skipped.
+    """
+    base = Path(settings.BASE_DIR).resolve()
+    roots = {Path(config.path).resolve() for config in apps.get_app_configs()}
+    roots.add(base / settings.ROOT_URLCONF.split(".")[0])
+    files = set()
+    for root in roots:
+        if base in root.parents:
+            files.update(path for path in root.rglob("*.py") if "migrations" not in path.relative_to(root).parts)
+    return sorted(files)
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    digest.update(drf_yasg.__version__.encode())
+    digest.update(repr(sorted(getattr(settings, "SWAGGER_SETTINGS", {}).items())).encode())
+    for path in source_files():
+        digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def generate():
+    """The schema as drf_yasg builds it for an anonymous request."""
+    request = HttpRequest()
+    request.method, request.path = "GET", "/api/swagger.json"
+    request.user = AnonymousUser()
+    # Any absolute url will do: host and schemes are dropped below
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(INFO, "", "http://localhost/", None, None)
+    schema = generator.get_schema(Request(request), public=True)
+    schema.pop("host", None)
+    schema.pop("schemes", None)
+    return schema
+
+
+def _document(body, content_type):
+    return {
+        "body": body,
+        "content_type": content_type,
+        "etag": '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        "encodings": precompress(body),
+    }
+
+
+def build(source_fingerprint=None):
+    schema = generate()
+    documents = {
+        name: _document(codec([]).encode(schema), content_type)
+        for name, (codec, content_type) in FORMATS.items()
+    }
+    return {"fingerprint": source_fingerprint or fingerprint(), "documents": documents}
+
+
+def _replace(path, data):
+    """Write `path` through a temporary file and a rename, so readers never see it half-written."""
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temporary)
+        raise
+
+
+def write(built):
+    """
+    Store `built` under SCHEMA_CACHE["DIR"]. Every file is swapped in whole
+    (workers starting together may be reading the previous copy), and the
+    manifest goes last, so an interrupted write is rebuilt, not served.
+    """
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {"fingerprint": built["fingerprint"], "documents": {}}
+    for name, document in built["documents"].items():
+        _replace(directory / f"openapi.{name}", document["body"])
+        for encoding, body in document["encodings"].items():
+            _replace(directory / f"openapi.{name}.{SUFFIXES[encoding]}", body)
+        manifest["documents"][name] = {
+            "content_type": document["content_type"],
+            "etag": document["etag"],
+            "encodings": sorted(document["encodings"]),
+        }
+    _replace(directory / "manifest.json", json.dumps(manifest, indent=2).encode())
+    return directory
+
+
+def read(expected_fingerprint):
+    """The stored build if it matches `expected_fingerprint`, else None."""
+    directory = _directory()
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text())
+        if manifest["fingerprint"] != expected_fingerprint:
+            return None
+        documents = {}
+        for name, meta in manifest["documents"].items():
+            documents[name] = {
+                "body": (directory / f"openapi.{name}").read_bytes(),
+                "content_type": meta["content_type"],
+                "etag": meta["etag"],
+                "encodings": {
+                    encoding: (directory / f"openapi.{name}.{SUFFIXES[encoding]}").read_bytes()
+                    for encoding in meta["encodings"]
+                },
+            }
+    except (OSError, ValueError, KeyError):
+        return None
+    return {"fingerprint": expected_fingerprint, "documents": documents}
+
+
+def load():
+    """The schema documents for this process, read from disk or built once."""
+    global _loaded
+    if _loaded is None:
+        current = fingerprint()
+        built = read(current)
+        if built is None:
+            built = build(current)
+            try:
+                write(built)
+            except OSError as exc:
+                logger.warning("Could not store the prebuilt schema: %s", exc)
+        _loaded = built
+    return _loaded
+
+
+def reset():
+    global _loaded
+    _loaded = None
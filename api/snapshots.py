@@ -0,0 +1,157 @@
+"""
+Pre-rendered response snapshots.
+
+A Snapshot caches a read endpoint's response: its rendered JSON body and
+the body's compressed encodings (api.compression.precompress). Hot
+requests are then served from stored bytes, with no queries, serialization
+or compression per request.
+
+Entries live under a version number kept in the cache. invalidate() bumps
+it, so the next request rebuilds and old entries simply expire. Call it
+from wherever the underlying rows change. With several worker processes
+the cache backend must be shared (Redis, Memcached), or an invalidation only
+reaches the worker that made it.
+
+A payload whose last entry is a list of rows with an "id" can be stored
+with get(..., rows=key). Each row is then rendered on its own and its place
+in the body recorded, so response(entry, exclude=ids) can cut rows out of
+the stored bytes per request. That needs no payload, no serializer and no
+re-rendering, so it costs a few slices however long the list is.
+
+RESPONSE_SNAPSHOTS["ENABLED"] turns every snapshot off, so requests build
+their responses directly.
+"""
+import hashlib
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .compression import precompress
+from .renderers import FastJSONRenderer
+
+
+def _setting(key, default):
+    return getattr(settings, "RESPONSE_SNAPSHOTS", {}).get(key, default)
+
+
+class Snapshot:
+    def __init__(self, name, timeout_setting, default_timeout):
+        self.name = name
+        self.timeout_setting = timeout_setting
+        self.default_timeout = default_timeout
+        self.version_key = f"snapshot-version:{name}"
+
+    @property
+    def enabled(self):
+        return _setting("ENABLED", True)
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from the clock, not 1: an evicted counter must never reuse old versions
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def invalidate(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), None)
+
+    def invalidate_on_commit(self):
+        transaction.on_commit(self.invalidate)
+
+    def get(self, parts, build, rows=None):
+        """
+        The entry for `parts` (values the response depends on, e.g. query
+        parameters), building it with build() -> payload on a miss. `rows`
+        names the payload's list of rows to index (see the module docstring).
+        """
+        digest = hashlib.md5(repr(tuple(parts)).encode(), usedforsecurity=False).hexdigest()
+        key = f"snapshot:{self.name}:{self.version()}:{digest}"
+        entry = cache.get(key)
+        if entry is None:
+            payload = build()
+            if rows is None:
+                body, index = FastJSONRenderer().render(payload), None
+            else:
+                body, index = _render_rows(payload, rows)
+            entry = {"body": body, "encodings": precompress(body), "rows": index}
+            cache.set(key, entry, _setting(self.timeout_setting, self.default_timeout))
+        return entry
+
+    @staticmethod
+    def response(entry, exclude=()):
+        """The entry as a response, less the indexed rows whose id is in `exclude`."""
+        body = without(entry, exclude) if exclude else entry["body"]
+        response = HttpResponse(body, content_type="application/json")
+        if body is entry["body"]:
+            response.precompressed = entry["encodings"]
+        return response
+
+
+def _render_rows(payload, key):
+    """Render `payload` row by row; returns the body and the rows' index."""
+    if list(payload)[-1] != key:
+        raise ValueError(f"{key!r} must be the payload's last entry.")
+    renderer = FastJSONRenderer()
+    envelope = renderer.render(dict(payload, **{key: []}))
+    # The rows go between the brackets of the final empty list
+    split = envelope.rindex(b"[]") + 1
+    rendered = [renderer.render(row) for row in payload[key]]
+
+    starts, ends, position = array("q"), array("q"), split
+    for chunk in rendered:
+        starts.append(position)
+        position += len(chunk)
+        ends.append(position)
+        position += 1  # the comma
+    ids = [row["id"] for row in payload[key]]
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    index = {
+        # Row ids sorted for bisection, with each one's position in the list
+        "ids": array("q", (ids[i] for i in order)),
+        "positions": array("q", order),
+        "starts": starts,
+        "ends": ends,
+    }
+    return envelope[:split] + b",".join(rendered) + envelope[split:], index
+
+
+def without(entry, ids):
+    """The entry's body with the rows whose id is in `ids` cut out."""
+    index, body = entry["rows"], entry["body"]
+    sorted_ids, positions = index["ids"], index["positions"]
+    removed = set()
+    for row_id in ids:
+        i = bisect_left(sorted_ids, row_id)
+        if i < len(sorted_ids) and sorted_ids[i] == row_id:
+            removed.add(positions[i])
+    if not removed:
+        return body
+
+    starts, ends = index["starts"], index["ends"]
+    last = len(starts) - 1
+    cuts = []
+    for i in removed:
+        if i < last:
+            # The row and the comma after it
+            cuts.append((starts[i], starts[i + 1]))
+        else:
+            # The last row goes with the comma before it, after the last row kept
+            kept = next((j for j in range(i - 1, -1, -1) if j not in removed), None)
+            cuts.append((starts[0] if kept is None else ends[kept], ends[i]))
+
+    pieces, position = [], 0
+    for start, end in sorted(cuts):
+        if start > position:
+            pieces.append(body[position:start])
+        position = max(position, end)
+    pieces.append(body[position:])
+    return b"".join(pieces)
@@ -0,0 +1,252 @@
+"""
+Small database-backed task queue for non-critical side effects.
+
+Handlers are registered with the ``@task`` decorator in an app's ``tasks.py``
+and queued with ``enqueue()``. Because tasks are plain rows, enqueueing inside
+the request's ``transaction.atomic()`` block commits (or rolls back) together
+with the critical write, and no external broker is needed.
+
+    @task("ads.credit_earnings", batch=True)
+    def credit_earnings(payloads):
+        ...
+
+    enqueue("ads.credit_earnings", {"user_id": 1, "amount": "0.0100"})
+
+Workers run with ``manage.py run_tasks``. Each claimed task runs in a
+transaction of its own, so one bad payload only fails (and retries) itself.
+A batch handler gets its claimed payloads in one transaction; if that
+raises, they are re-run one at a time to find the payloads that fail.
+A task's row is deleted in the same transaction as its handler's writes, so
+a task that committed is never requeued and run a second time.
+"""
+import logging
+import os
+import socket
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskHandler:
+    def __init__(self, name, func, batch=False):
+        self.name = name
+        self.func = func
+        self.batch = batch
+
+    def __call__(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(payload)
+
+    def run_each(self, payload):
+        self.func([payload] if self.batch else payload)
+
+
+def task(name, batch=False):
+    """
+    Register a handler. Batch handlers receive a list of payloads claimed
+    together so they can aggregate writes; others receive one payload.
+    """
+    def decorator(func):
+        _registry[name] = TaskHandler(name, func, batch=batch)
+        return func
+    return decorator
+
+
+def get_handler(name):
+    if name not in _registry:
+        autodiscover_modules("tasks")
+    return _registry[name]
+
+
+def _setting(key, default):
+    return getattr(settings, "BACKGROUND_TASKS", {}).get(key, default)
+
+
+def enqueue(name, payload=None, priority=BackgroundTask.PRIORITY_NORMAL, delay=0, max_attempts=5):
+    """Queue a task. In eager mode the handler runs once the transaction commits."""
+    payload = payload or {}
+    if _setting("EAGER", False):
+        transaction.on_commit(lambda: get_handler(name)([payload]))
+        return None
+
+    return BackgroundTask.objects.create(
+        name=name,
+        payload=payload,
+        priority=priority,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts,
+    )
+
+
+async def aenqueue(name, payload=None, priority=BackgroundTask.PRIORITY_NORMAL, delay=0, max_attempts=5):
+    """Async counterpart of enqueue for the ASGI views."""
+    payload = payload or {}
+    if _setting("EAGER", False):
+        # Through enqueue(), so the handler waits for the commit here too
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(enqueue)(name, payload, priority, delay, max_attempts)
+
+    return await BackgroundTask.objects.acreate(
+        name=name,
+        payload=payload,
+        priority=priority,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts,
+    )
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def requeue_stale(timeout=None):
+    """Put back tasks whose worker died while holding them."""
+    timeout = timeout or _setting("VISIBILITY_TIMEOUT", 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return BackgroundTask.objects.filter(status="running", locked_at__lt=cutoff).update(
+        status="pending", locked_by="", locked_at=None
+    )
+
+
+def claim(batch_size, worker):
+    """
+    Claim up to batch_size due tasks, highest priority first. The conditional
+    UPDATE makes the claim safe when several workers race for the same rows.
+    """
+    now = timezone.now()
+    ids = list(
+        BackgroundTask.objects.filter(status="pending", run_after__lte=now)
+        .order_by("-priority", "run_after", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    BackgroundTask.objects.filter(id__in=ids, status="pending").update(
+        status="running", locked_by=worker, locked_at=now, attempts=F("attempts") + 1
+    )
+    return list(
+        BackgroundTask.objects.filter(id__in=ids, status="running", locked_by=worker)
+        .order_by("-priority", "run_after", "id")
+    )
+
+
+def _fail(failures):
+    """Put back or dead-letter the failed tasks of (task, exception) pairs."""
+    base_delay = _setting("RETRY_BASE_DELAY", 5)
+    for bg_task, exc in failures:
+        if bg_task.attempts >= bg_task.max_attempts:
+            bg_task.status = "failed"
+        else:
+            bg_task.status = "pending"
+            bg_task.run_after = timezone.now() + timedelta(
+                seconds=min(base_delay * 2 ** (bg_task.attempts - 1), 3600)
+            )
+        bg_task.locked_by = ""
+        bg_task.locked_at = None
+        bg_task.last_error = "".join(traceback.format_exception(exc))
+    BackgroundTask.objects.bulk_update(
+        [bg_task for bg_task, _ in failures], ["status", "run_after", "locked_by", "locked_at", "last_error"]
+    )
+
+
+def _take(group):
+    """
+    Lock and delete the rows of group this worker still holds, returning
+    those tasks. Called inside the handler's transaction, so the rows go
+    with its commit. A task whose lease expired and was claimed again
+    elsewhere is left alone.
+    """
+    leases = Q()
+    for locked_by, locked_at in {(bg_task.locked_by, bg_task.locked_at) for bg_task in group}:
+        leases |= Q(locked_by=locked_by, locked_at=locked_at)
+    held = set(
+        BackgroundTask.objects.select_for_update()
+        .filter(leases, id__in=[bg_task.id for bg_task in group], status="running")
+        .values_list("id", flat=True)
+    )
+    BackgroundTask.objects.filter(id__in=held).delete()
+    return [bg_task for bg_task in group if bg_task.id in held]
+
+
+def _run_group(name, group):
+    """
+    Run one handler's claimed tasks. Returns the number that succeeded and
+    (task, exception) for those that failed.
+    """
+    try:
+        handler = get_handler(name)
+    except Exception as exc:
+        logger.exception("Background task %s has no handler", name)
+        return 0, [(bg_task, exc) for bg_task in group]
+
+    if handler.batch:
+        try:
+            with transaction.atomic():
+                held = _take(group)
+                if held:
+                    handler([bg_task.payload for bg_task in held])
+            return len(held), []
+        except Exception as exc:
+            if len(group) == 1:
+                logger.exception("Background task %s failed", name)
+                return 0, [(group[0], exc)]
+            logger.warning("Background task %s failed for a batch of %d; retrying one at a time", name, len(group))
+
+    succeeded, failures = 0, []
+    for bg_task in group:
+        try:
+            with transaction.atomic():
+                if _take([bg_task]):
+                    handler.run_each(bg_task.payload)
+                    succeeded += 1
+        except Exception as exc:
+            logger.exception("Background task %s failed (task %s)", name, bg_task.pk)
+            failures.append((bg_task, exc))
+    return succeeded, failures
+
+
+def process(tasks):
+    """
+    Run claimed tasks grouped by handler. Returns (succeeded, failed) counts;
+    tasks this worker no longer holds are skipped and count as neither.
+    """
+    groups = defaultdict(list)
+    for bg_task in tasks:
+        groups[bg_task.name].append(bg_task)
+
+    succeeded, failures = 0, []
+    for name, group in groups.items():
+        done, failed = _run_group(name, group)
+        succeeded += done
+        failures.extend(failed)
+    if failures:
+        _fail(failures)
+    return succeeded, len(failures)
+
+
+def run_pending(batch_size=100, worker=None):
+    """Drain every due task in this process. Handy for tests and benchmarks."""
+    worker = worker or worker_id()
+    total = 0
+    while True:
+        tasks = claim(batch_size, worker)
+        if not tasks:
+            return total
+        process(tasks)
+        total += len(tasks)
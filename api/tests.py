@@ -1,3 +1,430 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import io
+import json
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import PartnerAPIKey, User
+from ads.models import Ad, UserEarning
+from app.warmup import warm_up
+from . import benchmarking, checks, compression, renderers, schema, tasks
+from .compression import CompressionMiddleware, negotiate, precompress
+from .metrics import MetricsMiddleware, reset_metrics
+from .models import BackgroundTask
+from .querywatch import NPlusOneDetected, QueryInspectorMiddleware, fingerprint
+from .renderers import FastJSONParser, FastJSONRenderer
+from .snapshots import Snapshot
+from .throttling import TokenBucketStore, store
+
+
+class PartnerThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        store.reset()
+        partner = User.objects.create_user("p@example.com", "p", "partner", None)
+        self.api_key, raw_key = PartnerAPIKey.generate(partner)
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_API_TOKEN=raw_key)
+
+    def test_key_quota_overrides_scope_and_reports_headers(self):
+        self.api_key.quotas = {"gigs.jobs": "3/min"}
+        self.api_key.save()
+
+        statuses = [self.client.get("/api/gigs/jobs/") for _ in range(4)]
+
+        self.assertEqual([r.status_code for r in statuses], [200, 200, 200, 429])
+        self.assertEqual(statuses[0]["X-RateLimit-Limit"], "3")
+        self.assertEqual(statuses[2]["X-RateLimit-Remaining"], "0")
+        self.assertIn("Retry-After", statuses[3])
+
+    def test_leases_cap_the_quota_across_stores(self):
+        # Two stores stand in for two worker processes sharing one cache
+        workers = [TokenBucketStore(lease_size=4), TokenBucketStore(lease_size=4)]
+        allowed = sum(
+            workers[i % 2].consume("scope:key:1", 10, 60)[0] for i in range(30)
+        )
+        self.assertEqual(allowed, 10)
+
+
+class RequestMetricsTests(TestCase):
+    def test_metrics_endpoint_reports_queries_per_view(self):
+        reset_metrics()
+        admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.get("/api/gigs/jobs/")
+
+        response = client.get("/api/metrics/")
+        body = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('app_request_queries_count{view="jobs-list"} 1', body)
+        self.assertIn('app_request_serializer_seconds_count{view="jobs-list"} 1', body)
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(REQUEST_METRICS={"ENABLED": False})
+    def test_disabled_metrics_leave_the_middleware_stack(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: HttpResponse())
+
+    def test_metrics_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("u@example.com", "u", "user", None))
+        self.assertEqual(client.get("/api/metrics/").status_code, 403)
+
+
+class QueryInspectorTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        for i in range(10):
+            user = User.objects.create_user(f"u{i}@example.com", f"u{i}", "user", None)
+            if i % 2:
+                UserEarning.objects.create(user=user, total_earned="1.0000")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 12 AND b = 'x' AND c IN (%s, %s, %s)"),
+            fingerprint("SELECT * FROM t WHERE a = 7 AND b = 'y' AND c IN (%s)"),
+        )
+
+    def test_user_list_has_no_n_plus_one(self):
+        response = self.client.get("/api/users/user-list/")
+        self.assertEqual(len(response.data["body"]), 11)
+
+    def test_repeated_query_shape_fails_the_request(self):
+        from ads.serializers import UserListSerializer
+
+        original = UserListSerializer._earning
+        # Reintroduce the old per-row lookup
+        UserListSerializer._earning = lambda self, obj: UserEarning.objects.filter(user=obj).first()
+        try:
+            with self.assertRaisesMessage(NPlusOneDetected, "UserListSerializer.today_earned"):
+                self.client.get("/api/users/user-list/")
+        finally:
+            UserListSerializer._earning = original
+
+    def test_async_requests_are_inspected_without_adaptation(self):
+        async def view(request):
+            await sync_to_async(lambda: [list(User.objects.filter(pk=pk)) for pk in range(8)])()
+            return HttpResponse()
+
+        middleware = QueryInspectorMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertRaisesMessage(NPlusOneDetected, "8 queries of the same shape"):
+            async_to_sync(middleware)(RequestFactory().get("/async/"))
+
+
+class BackgroundTaskTests(TestCase):
+    def register(self, name, func, batch=False):
+        tasks.task(name, batch=batch)(func)
+        self.addCleanup(tasks._registry.pop, name)
+
+    def test_claimed_tasks_are_not_claimed_again(self):
+        for priority in (BackgroundTask.PRIORITY_NORMAL, BackgroundTask.PRIORITY_HIGH, BackgroundTask.PRIORITY_LOW):
+            tasks.enqueue("tests.noop", priority=priority)
+        tasks.enqueue("tests.noop", delay=60)
+
+        first = tasks.claim(2, "worker-a")
+        self.assertEqual([task.priority for task in first], [BackgroundTask.PRIORITY_HIGH, BackgroundTask.PRIORITY_NORMAL])
+        second = tasks.claim(10, "worker-b")
+        self.assertEqual([(task.priority, task.locked_by) for task in second], [(BackgroundTask.PRIORITY_LOW, "worker-b")])
+        self.assertEqual(tasks.claim(10, "worker-c"), [])
+
+    def test_failures_back_off_then_dead_letter(self):
+        def handler(payload):
+            if payload.get("bad"):
+                raise ValueError("bad payload")
+        self.register("tests.flaky", handler)
+        tasks.enqueue("tests.flaky", {"bad": True}, max_attempts=2)
+        tasks.enqueue("tests.flaky", {"bad": False})
+
+        with self.assertLogs("api.tasks", "ERROR"):
+            self.assertEqual(tasks.process(tasks.claim(10, "worker")), (1, 1))
+        bad = BackgroundTask.objects.get()
+        self.assertEqual((bad.status, bad.attempts), ("pending", 1))
+        self.assertAlmostEqual((bad.run_after - timezone.now()).total_seconds(), 5, delta=1)
+        self.assertIn("bad payload", bad.last_error)
+
+        BackgroundTask.objects.update(run_after=timezone.now())
+        with self.assertLogs("api.tasks", "ERROR"):
+            tasks.process(tasks.claim(10, "worker"))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ("failed", 2))
+        self.assertEqual(tasks.claim(10, "worker"), [])
+
+    def test_a_bad_payload_does_not_fail_its_batch(self):
+        def handler(payloads):
+            for payload in payloads:
+                tasks.enqueue("tests.written", payload)
+                if payload["n"] == 1:
+                    raise ValueError("bad payload")
+        self.register("tests.batch", handler, batch=True)
+        for n in range(3):
+            tasks.enqueue("tests.batch", {"n": n})
+
+        with self.assertLogs("api.tasks", "WARNING"):
+            self.assertEqual(tasks.process(tasks.claim(10, "worker")), (2, 1))
+        # The failed batch attempt was rolled back; the retries wrote once each
+        written = BackgroundTask.objects.filter(name="tests.written").values_list("payload__n", flat=True)
+        self.assertEqual(sorted(written), [0, 2])
+        self.assertEqual(BackgroundTask.objects.get(name="tests.batch").payload, {"n": 1})
+
+    def test_credited_batches_are_not_paid_twice(self):
+        user = User.objects.create_user("u@example.com", "u", "user", None)
+        for _ in range(2):
+            tasks.enqueue("ads.credit_earnings", {"user_id": user.id, "amount": "0.0100"})
+        tasks.claim(10, "worker-a")
+        # worker-a outlives its lease and the rows are claimed again
+        BackgroundTask.objects.update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        first = list(BackgroundTask.objects.filter(locked_by="worker-a"))
+        tasks.requeue_stale()
+        second = tasks.claim(10, "worker-b")
+
+        self.assertEqual(tasks.process(second), (2, 0))
+        self.assertEqual(tasks.process(first), (0, 0))
+        self.assertEqual(tasks.process(second), (0, 0))
+        self.assertEqual(UserEarning.objects.get(user=user).total_earned, Decimal("0.0200"))
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    @override_settings(BACKGROUND_TASKS={"EAGER": True})
+    def test_eager_tasks_wait_for_the_commit(self):
+        ran = []
+        self.register("tests.eager", ran.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            async_to_sync(tasks.aenqueue)("tests.eager", {"n": 1})
+            self.assertEqual(ran, [])
+        self.assertEqual(ran, [{"n": 1}])
+
+
+class SharedCacheCheckTests(TestCase):
+    LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    SHARED = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache:6379"}}
+
+    def run_check(self, **overrides):
+        with override_settings(**overrides):
+            return [(error.id, error.msg.split()[0]) for error in checks.check_shared_cache(None)]
+
+    def test_pacing_and_snapshots_refuse_a_per_process_cache(self):
+        self.assertEqual(
+            self.run_check(CACHES=self.LOCAL, DEBUG=False),
+            [("api.E001", "AD_PACING"), ("api.E001", "RESPONSE_SNAPSHOTS")],
+        )
+        self.assertEqual(self.run_check(CACHES=self.LOCAL, DEBUG=True)[0], ("api.W001", "AD_PACING"))
+
+    def test_shared_or_disabled_caches_pass(self):
+        self.assertEqual(self.run_check(CACHES=self.SHARED, DEBUG=False), [])
+        self.assertEqual(
+            self.run_check(CACHES=self.LOCAL, DEBUG=False, AD_PACING={"ENABLED": False}, RESPONSE_SNAPSHOTS={"ENABLED": False}),
+            [],
+        )
+
+
+class BenchmarkSuiteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_every_scenario_takes_the_success_path(self):
+        volumes = dict.fromkeys(benchmarking.DEFAULT_VOLUMES, 20)
+        benchmarking.seed_dataset(volumes)
+        requests = benchmarking.prepare_scenarios(3, "t")
+
+        for name in benchmarking.SCENARIOS:
+            with self.subTest(name):
+                result = benchmarking.run_scenario(requests[name], warmup=1)
+                self.assertEqual(result["statuses"], {"200": 2})
+                self.assertGreater(result["queries_per_request"], 0)
+
+    def test_compare_flags_latency_and_query_regressions(self):
+        before = {"scenarios": {"job_list": {"p95_ms": 10.0, "throughput_rps": 100.0, "queries_per_request": 2}}}
+        after = {"scenarios": {"job_list": {"p95_ms": 10.5, "throughput_rps": 80.0, "queries_per_request": 3}}}
+
+        regressed = {metric for _, metric, *_, flag in benchmarking.compare(before, after, 10) if flag}
+
+        self.assertEqual(regressed, {"throughput_rps", "queries_per_request"})
+
+    def test_cold_start_reaches_a_first_response(self):
+        result = benchmarking.cold_start("/api/metrics/", runs=1)
+
+        self.assertEqual(result["status"], 401)
+        self.assertGreater(result["boot_ms"], 0)
+        self.assertGreater(result["process_ms"], result["boot_ms"] + result["first_request_ms"])
+
+
+class FastJSONTests(TestCase):
+    def test_renders_like_drf(self):
+        data = {
+            "amount": Decimal("0.0125"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "at": datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+            "day": datetime.date(2024, 1, 2),
+            "text": "caf\u00e9 \u2028",
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_stdlib_fallback_without_orjson(self):
+        data = {"id": uuid.UUID("12345678-1234-5678-1234-567812345678"), "text": "caf\u00e9", "n": [1, None]}
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"n": [1, null]}')), {"n": [1, None]})
+            self.assertEqual(renderers.renderer_backend(), "json (stdlib)")
+
+    def test_indented_output_falls_back_to_stdlib(self):
+        body = FastJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        self.assertEqual(body, b'{\n    "a": 1\n}')
+
+    def test_parse_errors_match_drf(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO(b'{"ok": [1, 2.5]}')), {"ok": [1, 2.5]})
+        with self.assertRaisesMessage(ParseError, "Out of range float values are not JSON compliant"):
+            parser.parse(io.BytesIO(b'{"ok": NaN}'))
+
+
+@override_settings(COMPRESSION={"MIN_SIZE": 100, "CONTENT_TYPES": ["application/json"]})
+class CompressionTests(TestCase):
+    def respond(self, body, accept="gzip, deflate", **attrs):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        response = HttpResponse(body, content_type="application/json")
+        for name, value in attrs.items():
+            setattr(response, name, value)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation_honours_quality_values(self):
+        self.assertEqual(negotiate("gzip;q=0.5, br", ("br", "gzip")), "br")
+        self.assertEqual(negotiate("br;q=0, *", ("br", "gzip")), "gzip")
+        self.assertIsNone(negotiate("identity", ("gzip",)))
+
+    def test_bodies_over_the_threshold_are_gzipped(self):
+        body = b'{"data": "' + b"x" * 500 + b'"}'
+        response = self.respond(body)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), body)
+
+        self.assertFalse(self.respond(b'{"data": 1}').has_header("Content-Encoding"))
+        self.assertFalse(self.respond(body, accept="identity").has_header("Content-Encoding"))
+
+    def test_gzip_is_used_without_brotli(self):
+        body = b'{"data": "' + b"z" * 500 + b'"}'
+        with mock.patch.object(compression, "brotli", None), mock.patch.object(compression, "ENCODINGS", ("gzip",)):
+            self.assertEqual(set(precompress(body)), {"gzip"})
+            self.assertEqual(self.respond(body, accept="br, gzip;q=0.5")["Content-Encoding"], "gzip")
+
+    def test_precompressed_bodies_are_served_as_they_are(self):
+        body = b'{"data": "' + b"y" * 500 + b'"}'
+        encodings = precompress(body)
+        response = self.respond(body, precompressed=encodings)
+        self.assertEqual(response.content, encodings["gzip"])
+
+
+class SnapshotRowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.snapshot = Snapshot("rows", "ROWS_SECONDS", 60)
+        self.payload = {"status": "success", "data": [{"id": pk, "name": f"row {pk}"} for pk in (5, 3, 9, 1)]}
+        self.entry = self.snapshot.get(("rows",), lambda: self.payload, rows="data")
+
+    def test_indexed_body_matches_a_plain_render(self):
+        self.assertEqual(self.entry["body"], FastJSONRenderer().render(self.payload))
+
+    def test_rows_are_cut_out_of_the_stored_body(self):
+        for exclude in ({3}, {1}, {5}, {9, 1}, {5, 3, 9, 1}, {5, 1}, {42}):
+            response = self.snapshot.response(self.entry, exclude=exclude)
+            expected = [row["id"] for row in self.payload["data"] if row["id"] not in exclude]
+            self.assertEqual([row["id"] for row in json.loads(response.content)["data"]], expected)
+        self.assertEqual(self.snapshot.response(self.entry, exclude={42}).precompressed, self.entry["encodings"])
+        self.assertFalse(hasattr(self.snapshot.response(self.entry, exclude={3}), "precompressed"))
+
+
+@override_settings(SCHEMA_CACHE={"DIR": tempfile.mkdtemp()})
+class PrebuiltSchemaTests(TestCase):
+    def setUp(self):
+        schema.reset()
+        self.addCleanup(schema.reset)
+
+    def test_schema_is_served_with_etag_revalidation(self):
+        response = self.client.get("/api/swagger.json", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("/api/ads/user_ads/", json.loads(gzip.decompress(response.content))["paths"])
+
+        revalidated = self.client.get("/api/swagger.json", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get("/api/swagger.yaml")["Content-Type"], "application/yaml")
+
+    def test_every_view_builds_for_the_anonymous_schema_request(self):
+        with self.assertNoLogs("drf_yasg.inspectors", "WARNING"):
+            paths = schema.generate()["paths"]
+        self.assertIn("/api/gigs/submissions/", paths)
+
+    def test_files_are_swapped_in_whole(self):
+        built = schema.load()
+        directory = schema.write(built)
+        with mock.patch.object(schema.os, "replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                schema.write(built)
+        # The failed write left the previous copy intact and no temporary files behind
+        self.assertEqual(sorted(path.name for path in directory.iterdir() if path.name.startswith(".")), [])
+        self.assertEqual(schema.read(built["fingerprint"]), built)
+
+    def test_stored_schema_is_reused_until_the_sources_change(self):
+        built = schema.load()
+        schema.reset()
+        self.assertEqual(schema.read(built["fingerprint"]), built)
+        self.assertIsNone(schema.read("stale"))
+
+    def test_every_local_module_is_a_source(self):
+        sources = {str(path.relative_to(settings.BASE_DIR)) for path in schema.source_files()}
+        self.assertLessEqual(
+            {"gigs/pagination.py", "api/throttling.py", "accounts/authentication.py", "app/urls.py", "app/settings.py"},
+            sources,
+        )
+        self.assertFalse([path for path in sources if "/migrations/" in path])
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(WARMUP={"ENABLED": True, "ORIGINS": ["http://testserver"]})
+    def test_first_feed_request_is_served_from_the_primed_catalog(self):
+        Ad.objects.create(title="Ad", category="visit", amount="0.0100", duration=10, status="active")
+
+        timings = warm_up()
+
+        self.assertEqual(list(timings), ["database", "urls", "serializers", "tokens", "catalog"])
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/ads/user_ads/")
+        self.assertEqual(response.json()["data"][0]["title"], "Ad")
+
+    @override_settings(WARMUP={"ENABLED": True})
+    def test_warmed_connection_outlives_request_start(self):
+        warm_up(["database"])
+        # close_old_connections() on request_started closes it once close_at has passed
+        self.assertTrue(connection.is_usable())
+        self.assertGreater(connection.close_at, time.monotonic())
+
+    @override_settings(WARMUP={"ENABLED": True})
+    def test_database_step_is_skipped_inside_an_event_loop(self):
+        async def boot():
+            return warm_up(["database", "urls"])
+
+        self.assertEqual(list(asyncio.run(boot())), ["urls"])
@@ -0,0 +1,189 @@
+"""
+Token-bucket throttling for partner traffic.
+
+Each process keeps a token bucket per (scope, client) that refills at the
+quota's rate, so bursts are smoothed without a network round trip. To keep
+the quota cluster-wide, a bucket may only spend tokens it has leased from a
+per-window counter in the Django cache; leases are LEASE_SIZE requests, so
+the shared cache is hit once per LEASE_SIZE requests rather than per request.
+
+Quotas come from settings.PARTNER_THROTTLES, overridden per partner key by
+PartnerAPIKey.quotas:
+
+    PARTNER_THROTTLES = {
+        "DEFAULT_RATE": "600/min",
+        "SCOPES": {"thirdparty.watch": "120/min"},
+        "LEASE_SIZE": 20,
+    }
+
+Views set ``throttle_scope`` and mix in RateLimitHeadersMixin to report
+X-RateLimit-Limit / -Remaining / -Reset.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from accounts.authentication import get_request_api_key
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _setting(key, default):
+    return getattr(settings, "PARTNER_THROTTLES", {}).get(key, default)
+
+
+@lru_cache(maxsize=256)
+def parse_rate(rate):
+    """'120/min' -> (120, 60). Same format as DRF's throttle rates."""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "window", "leased", "shared_used")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.window = None
+        self.leased = 0
+        self.shared_used = 0
+
+
+class TokenBucketStore:
+    """
+    In-process token buckets whose spending is capped by leases taken from a
+    shared counter in the Django cache. consume() returns
+    (allowed, remaining, wait_seconds).
+    """
+
+    def __init__(self, cache_alias="default", lease_size=20, max_buckets=10000):
+        self.cache_alias = cache_alias
+        self.lease_size = lease_size
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def consume(self, key, limit, period):
+        now = time.monotonic()
+        window = int(time.time() // period)
+        with self._lock:
+            bucket = self._bucket(key, limit, now)
+            bucket.tokens = min(limit, bucket.tokens + (now - bucket.updated) * limit / period)
+            bucket.updated = now
+            if bucket.tokens < 1:
+                return False, 0, (1 - bucket.tokens) * period / limit
+            if bucket.window != window:
+                bucket.window, bucket.leased, bucket.shared_used = window, 0, 0
+            # Once the shared counter is spent, nothing is left until the next window
+            needs_lease = bucket.leased < 1 and bucket.shared_used < limit
+
+        if needs_lease:
+            # Outside the lock: a slow cache must not stall other clients' buckets
+            granted, shared_used = self._lease(key, limit, period, window)
+            with self._lock:
+                if bucket.window == window:
+                    bucket.leased += granted
+                    bucket.shared_used = shared_used
+
+        with self._lock:
+            if bucket.leased < 1:
+                return False, 0, period - time.time() % period
+            bucket.tokens -= 1
+            bucket.leased -= 1
+            unleased = max(0, limit - bucket.shared_used)
+            return True, int(min(bucket.tokens, bucket.leased + unleased)), 0
+
+    def _bucket(self, key, limit, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(limit, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _lease(self, key, limit, period, window):
+        cache_key = f"throttle:{key}:{window}"
+        self.cache.add(cache_key, 0, timeout=period + 1)
+        try:
+            used = self.cache.incr(cache_key, self.lease_size)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(cache_key, self.lease_size, timeout=period + 1)
+            used = self.lease_size
+        return max(0, min(self.lease_size, limit - (used - self.lease_size))), used
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+store = TokenBucketStore(
+    cache_alias=_setting("CACHE_ALIAS", "default"),
+    lease_size=_setting("LEASE_SIZE", 20),
+)
+
+
+def quota_for(scope, api_key=None):
+    """The rate for scope: the key's own override, then the scope's, then the default."""
+    if api_key is not None and api_key.quotas:
+        rate = api_key.quotas.get(scope) or api_key.quotas.get("*")
+        if rate:
+            return rate
+    return _setting("SCOPES", {}).get(scope) or _setting("DEFAULT_RATE", "600/min")
+
+
+class PartnerRateThrottle(BaseThrottle):
+    """Throttles requests made with a partner API key, per key and scope."""
+    partners_only = True
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None) or "default"
+        api_key = get_request_api_key(request)
+        if api_key is not None:
+            ident = f"key:{api_key.pk}"
+        elif self.partners_only:
+            return True
+        elif request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+
+        limit, period = parse_rate(quota_for(scope, api_key))
+        allowed, remaining, self._wait = store.consume(f"{scope}:{ident}", limit, period)
+        request._rate_limit = (limit, remaining, period - int(time.time() % period))
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class ThirdPartyRateThrottle(PartnerRateThrottle):
+    """Also throttles callers without a partner key, per user or IP."""
+    partners_only = False
+
+
+class RateLimitHeadersMixin:
+    """Adds X-RateLimit-* headers when a PartnerRateThrottle ran."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        rate_limit = getattr(request, "_rate_limit", None)
+        if rate_limit:
+            limit, remaining, reset = rate_limit
+            response["X-RateLimit-Limit"] = str(limit)
+            response["X-RateLimit-Remaining"] = str(remaining)
+            response["X-RateLimit-Reset"] = str(math.ceil(reset))
+        return response
@@ -1,24 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from ads.views import *
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from ads import async_views
+from api import views as api_views
+from api.lazy import lazy_view
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework import permissions
-
-""" Swagger """
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Job Portal - Opty IT",
-      default_version='v1',
-      description="This is the API documentation for our project",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="riyad.cse27@gmail.com"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
 
 router = DefaultRouter()
 router.register("ads", AdViewSet, basename="ads")
@@ -33,12 +19,20 @@ router.register("third-party-ads", ThirdPartyAdViewSet, basename="thirdpartyads"
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('gigs/', include("gigs.urls")),
 
-    # Swagger URLs
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Async (ASGI) variants of the watch flow
+    path('async/watch/<int:pk>/start_view/', async_views.start_view, name='async-watch-start-view'),
+    path('async/watch/<int:pk>/complete_view/', async_views.complete_view, name='async-watch-complete-view'),
+    path('async/watch/<int:pk>/api_complete/', async_views.api_complete, name='async-watch-api-complete'),
 
-    # JSON format
-    path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger.yaml', schema_view.without_ui(cache_timeout=0), name='schema-yaml'),
+    path('metrics/', api_views.metrics, name='metrics'),
+
+    # Swagger URLs; the docs views load on first use
+    path('swagger/', lazy_view('api.docs.swagger_ui'), name='schema-swagger-ui'),
+    path('redoc/', lazy_view('api.docs.redoc_ui'), name='schema-redoc'),
+
+    # JSON format, prebuilt by api.schema
+    path('swagger.json', lazy_view('api.docs.schema'), {'format': 'json'}, name='schema-json'),
+    path('swagger.yaml', lazy_view('api.docs.schema'), {'format': 'yaml'}, name='schema-yaml'),
 ]
\ No newline at end of file
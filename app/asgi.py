@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Build URL, serializer and cache state before the first request (app.warmup)
+from app.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +27,8 @@ SECRET_KEY = "django-insecure-jb&0plz*(if)0mgh*9+2q3oc=gk^1!olzz(!n4!2d$$^9k4d8*
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
 ALLOWED_HOSTS = ["*"]
 
 
@@ -110,10 +113,18 @@ SWAGGER_SETTINGS = {
         "Bearer": {"type": "apiKey", "name": "Authorization", "in": "header"}
     },
     "USE_SESSION_AUTH": False,
+    "SPEC_URL": "schema-json",
 }
 
 REDOC_SETTINGS = {
     "LAZY_RENDERING": False,
+    "SPEC_URL": "schema-json",
+}
+
+# Prebuilt OpenAPI documents (api.schema). Rebuilt when any module of the
+# project's apps changes; `manage.py build_schema` builds them ahead.
+SCHEMA_CACHE = {
+    "DIR": BASE_DIR / "var" / "schema",
 }
 
 AUTH_USER_MODEL = "accounts.User"
@@ -121,14 +132,147 @@ AUTH_USER_MODEL = "accounts.User"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.PartnerAPIKeyAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson-backed JSON (api.renderers); falls back to the stdlib without orjson.
+    # Swap in rest_framework.renderers.JSONRenderer / parsers.JSONParser to opt out.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Partner API keys (accounts.authentication). Verified keys are cached per
+# process for CACHE_TTL seconds; usage counts are written back every
+# USAGE_FLUSH_EVERY requests or USAGE_FLUSH_INTERVAL seconds.
+PARTNER_API_KEYS = {
+    "CACHE_SIZE": 10000,
+    "CACHE_TTL": 300,
+    "USAGE_FLUSH_EVERY": 100,
+    "USAGE_FLUSH_INTERVAL": 30,
+}
+
+# Token-bucket quotas for partner traffic (api.throttling), per throttle_scope.
+# PartnerAPIKey.quotas overrides these per key. Buckets lease LEASE_SIZE
+# requests at a time from the shared cache so limits hold across processes.
+PARTNER_THROTTLES = {
+    "DEFAULT_RATE": "600/min",
+    "SCOPES": {
+        "thirdparty.watch": "120/min",
+        "thirdparty.ads": "300/min",
+        "gigs.jobs": "300/min",
+        "gigs.submissions": "60/min",
+    },
+    "LEASE_SIZE": 20,
+    "CACHE_ALIAS": "default",
+}
+
+# Proof image uploads (gigs.media). Files are streamed to disk in chunks and
+# rejected once they pass MAX_FILE_SIZE bytes; thumbnails are rendered by the
+# task worker.
+PROOF_MEDIA = {
+    "MAX_FILE_SIZE": 10 * 1024 * 1024,
+    "THUMBNAIL_SIZE": 480,
+    "THUMBNAIL_QUALITY": 75,
+}
+
+# Process pool for Pillow work in task workers (api.imaging); 0 runs inline.
+IMAGING = {
+    "PROCESSES": 2,
+}
+
+# Banner renditions (ads.variants), rendered by the task worker whenever an
+# ad's image changes.
+AD_IMAGE_VARIANTS = {
+    "WIDTHS": [320, 640, 1080],
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": 80,
+}
+
+# Per-view latency/query/serializer histograms (api.metrics), served to admins
+# at /api/metrics/. SAMPLE_RATE is the fraction of requests measured.
+REQUEST_METRICS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "EXCLUDE_PATHS": ["/api/metrics/", "/static/", "/media/"],
+}
+
+# Slow-query log and N+1 detector (api.querywatch). On in development and
+# tests; set QUERY_INSPECTOR=1 to turn it on in production. Under
+# `manage.py test` an N+1 raises and fails the test instead of logging.
+QUERY_INSPECTOR = {
+    "ENABLED": DEBUG or TESTING or os.environ.get("QUERY_INSPECTOR") == "1",
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "SLOW_QUERY_MS": 100,
+    "RAISE": TESTING,
+    "VIEWS_IGNORED": [],
+}
+
+# Response compression (api.compression). Bodies under MIN_SIZE bytes are sent
+# uncompressed; brotli is used when the optional `brotli` package is installed.
+COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+    "BROTLI_DYNAMIC": True,
+    "CONTENT_TYPES": ["application/json", "application/yaml", "application/openapi+json", "text/plain"],
+}
+
+# Pre-rendered, precompressed responses for the ad feed and job listing
+# (api.snapshots), in seconds. Invalidation goes through the cache, so CACHES
+# must point at a shared backend (see api.checks).
+RESPONSE_SNAPSHOTS = {
+    "ENABLED": True,
+    "ADS_FEED_SECONDS": 300,
+    "JOB_LISTING_SECONDS": 60,
+}
+
+# Ad max_show and daily_budget enforcement (ads.pacing). Counters live in this
+# cache, which must be shared between workers (see api.checks); reconcile them with the
+# database from cron via `manage.py reconcile_ad_pacing`.
+AD_PACING = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "default",
+}
+
+# Feed ordering (ads.ranking): the score weights payout, room left under the
+# pacing caps and freshness, scaled per category.
+RANKING = {
+    "WEIGHTS": {"amount": 1.0, "remaining": 0.25, "freshness": 0.5},
+    "CATEGORY_WEIGHTS": {},
+    "FRESHNESS_HALF_LIFE_HOURS": 72,
+}
+
+# Worker warm-up run by app/wsgi.py and app/asgi.py (app.warmup). ORIGINS are
+# the public origins (e.g. https://api.example.com) to prime the ad catalog
+# snapshot for, comma-separated in WARMUP_ORIGINS.
+WARMUP = {
+    "ENABLED": not TESTING,
+    "STEPS": ["database", "urls", "serializers", "tokens", "catalog"],
+    "ORIGINS": [origin for origin in os.environ.get("WARMUP_ORIGINS", "").split(",") if origin],
+}
+
+# Database-backed task queue (api.tasks); workers run with `manage.py run_tasks`.
+# EAGER runs handlers on commit in-process instead of queueing them.
+BACKGROUND_TASKS = {
+    "EAGER": False,
+    "RETRY_BASE_DELAY": 5,
+    "VISIBILITY_TIMEOUT": 600,
 }
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.querywatch.QueryInspectorMiddleware",
+    "api.compression.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -163,9 +307,45 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections between requests, so the one app.warmup opens is
+        # still there for the first request; checked before reuse.
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
+        # Concurrent writers wait for the lock instead of failing with
+        # "database is locked"; IMMEDIATE takes the write lock up front so
+        # two transactions can't deadlock upgrading from a read.
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+        },
+        # File-backed so threaded tests share one database with real locking
+        "TEST": {
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
+# Ad pacing counters and snapshot invalidation (see AD_PACING and
+# RESPONSE_SNAPSHOTS) need a cache shared by every worker; set REDIS_URL in
+# production. The per-process fallback is only right for a single process, and
+# the api.E001 system check refuses it outside DEBUG.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# The test runner is one process, so its local cache is shared by everything
+SILENCED_SYSTEM_CHECKS = ["api.E001"] if TESTING else []
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -3,12 +3,15 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.lazy import lazy_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include("accounts.urls")),
     path('api/', include("api.urls")),
-    path("ckeditor5/", include('django_ckeditor_5.urls')),
+    # django_ckeditor_5.urls, with its one (admin-only) upload view loaded on first use
+    path("ckeditor5/image_upload/", lazy_view("django_ckeditor_5.views.upload_file"), name="ck_editor_5_upload_file"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,189 @@
+"""
+Worker warm-up.
+
+A fresh worker pays for lazily built state on its first requests: URL
+resolver population, DRF settings and serializer fields, the database
+connection, and empty caches (verified partner keys, the ad catalog
+snapshot). warm_up() does that work at boot instead. app/wsgi.py and
+app/asgi.py call it once the application is loaded, so a worker is warm
+before it accepts traffic.
+
+The warmed database connection is only reused if DATABASES sets
+CONN_MAX_AGE; at 0, request_started closes it before the first request.
+
+Preload-and-fork servers import the entry point once in the master and
+fork the workers from it, so the warm state is inherited. Database
+connections must not cross a fork, though. Close them in the master before
+forking and open new ones in each worker. For gunicorn --preload:
+
+    # gunicorn.conf.py
+    from app.warmup import pre_fork, post_fork
+
+ASGI servers may import the application inside their running event loop,
+where the ORM refuses to run. warm_up() then runs the steps in a thread of
+their own. Database connections are per thread, so the "database" step is
+skipped there: connections opened in that thread could never serve a
+request. The thread closes the connections its other steps opened.
+
+The ad catalog snapshots (the full feed and each category's shard) are
+keyed on the public origin, so they are only primed for the origins in
+WARMUP["ORIGINS"]. WARMUP["ENABLED"] turns warm-up off,
+and STEPS picks which steps run.
+"""
+import asyncio
+import io
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+STEPS = ("database", "urls", "serializers", "tokens", "catalog")
+
+
+def _setting(key, default):
+    return getattr(settings, "WARMUP", {}).get(key, default)
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def populate_urls():
+    resolver = get_resolver()
+    # Builds the reverse and namespace maps of every included resolver
+    resolver.reverse_dict
+    resolver.namespace_dict
+    for pattern in _walk(resolver.url_patterns):
+        pattern.lookup_str
+    # DRF imports its renderer, parser and authentication classes on first access
+    for name in ("DEFAULT_RENDERER_CLASSES", "DEFAULT_PARSER_CLASSES", "DEFAULT_AUTHENTICATION_CLASSES",
+                 "DEFAULT_PERMISSION_CLASSES", "DEFAULT_THROTTLE_CLASSES"):
+        getattr(api_settings, name)
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def build_serializers():
+    """Build the fields of every serializer the project defines; returns how many."""
+    base = Path(settings.BASE_DIR).resolve()
+    local_apps = {config.name for config in apps.get_app_configs() if base in Path(config.path).resolve().parents}
+    built = 0
+    for serializer_class in set(_subclasses(BaseSerializer)):
+        if serializer_class.__module__.split(".")[0] not in local_apps or issubclass(serializer_class, ListSerializer):
+            continue
+        try:
+            serializer_class().fields
+        except Exception:
+            logger.debug("Could not build %s during warm-up", serializer_class.__name__, exc_info=True)
+            continue
+        built += 1
+    return built
+
+
+def prime_tokens():
+    from accounts.authentication import prime_key_cache
+    prime_key_cache()
+
+
+def prime_catalog():
+    from ads import feed
+    for origin in _setting("ORIGINS", ()):
+        scheme, _, host = origin.partition("://")
+        request = WSGIRequest({
+            "REQUEST_METHOD": "GET", "PATH_INFO": "/api/ads/user_ads/", "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": scheme, "HTTP_HOST": host, "SERVER_NAME": host, "SERVER_PORT": "",
+        })
+        for category in (None, *feed.CATEGORIES):
+            feed.catalog(request, category)
+
+
+STEP_FUNCTIONS = {
+    "database": open_connections,
+    "urls": populate_urls,
+    "serializers": build_serializers,
+    "tokens": prime_tokens,
+    "catalog": prime_catalog,
+}
+
+
+def _run(steps):
+    timings = {}
+    for step in steps:
+        began = time.perf_counter()
+        try:
+            STEP_FUNCTIONS[step]()
+        except Exception:
+            # A cold worker is still a working worker
+            logger.exception("Warm-up step %r failed", step)
+        timings[step] = round((time.perf_counter() - began) * 1000, 1)
+    return timings
+
+
+def warm_up(steps=None):
+    """Run the warm-up steps; returns {step: milliseconds}. In an event loop, "database" is skipped."""
+    if not _setting("ENABLED", True):
+        return {}
+    steps = steps or _setting("STEPS", STEPS)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        timings = _run(steps)
+    else:
+        # Inside an event loop (see the module docstring): a thread, without the database step
+        steps = [step for step in steps if step != "database"]
+        result = {}
+
+        def run():
+            try:
+                result.update(_run(steps))
+            finally:
+                close_connections()
+
+        thread = threading.Thread(target=run, name="warm-up")
+        thread.start()
+        thread.join()
+        timings = result
+    logger.info(
+        "Warm-up finished in %.0f ms (%s)",
+        sum(timings.values()), ", ".join(f"{step} {ms:.0f} ms" for step, ms in timings.items()),
+    )
+    return timings
+
+
+def pre_fork(server=None, worker=None):
+    """Server hook, in the master before each fork: don't hand connections to the worker."""
+    close_connections()
+
+
+def post_fork(server=None, worker=None):
+    """Server hook, in each new worker: connect before the first request."""
+    if _setting("ENABLED", True) and "database" in _setting("STEPS", STEPS):
+        open_connections()
@@ -6,4 +6,6 @@ admin.site.register(Job)
 admin.site.register(ProofRequirement)
 admin.site.register(JobSubmission)
 admin.site.register(ProofSubmission)
+admin.site.register(ProofMedia)
 admin.site.register(Transaction)
+admin.site.register(UserBalance)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GigsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gigs'
+
+    def ready(self):
+        # Connects the snapshot invalidation signals
+        from . import listing  # noqa: F401
@@ -0,0 +1,33 @@
+"""
+The job listing snapshot.
+
+JobViewSet.list without ?detail is the same for every caller with the same
+filters (partners see only open jobs), so it is rendered once per filter
+combination into a snapshot (api.snapshots). Job saves and deletes
+invalidate it through signals. Slot counters and bulk inserts bypass
+save(), so slots.py and the bulk paths call changed() themselves.
+"""
+from django.db.models.signals import post_delete, post_save
+
+from api.snapshots import Snapshot
+from .models import Job, JobCategory
+
+snapshot = Snapshot("jobs-list", "JOB_LISTING_SECONDS", 60)
+
+# Query parameters the listing can be cached for; anything else is served live
+CACHEABLE_PARAMS = {"category", "status"}
+
+
+def changed():
+    snapshot.invalidate_on_commit()
+
+
+def _job_changed(sender, **kwargs):
+    changed()
+
+
+post_save.connect(_job_changed, sender=Job, dispatch_uid="gigs_listing_job_saved")
+post_delete.connect(_job_changed, sender=Job, dispatch_uid="gigs_listing_job_deleted")
+# category_name is part of every row
+post_save.connect(_job_changed, sender=JobCategory, dispatch_uid="gigs_listing_category_saved")
+post_delete.connect(_job_changed, sender=JobCategory, dispatch_uid="gigs_listing_category_deleted")
@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.models import User
+from gigs.models import Job, JobCategory
+from gigs.slots import has_free_slot
+from gigs.views import JobViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with jobs and time the JobViewSet listing "
+        "queries with and without the listing indexes and the .only() projection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=1_000_000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page", type=int, default=50, help="Rows fetched by the first-page queries.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the scratch database between runs.")
+        parser.add_argument("--explain", action="store_true", help="Print the query plans.")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            if not Job.objects.exists():
+                self.seed(options["jobs"], options["categories"])
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def seed(self, total, categories):
+        self.stdout.write(f"Seeding {total} jobs...")
+        user = User.objects.create_user(email="bench@example.com", username="bench", role="admin", password=None)
+        cats = JobCategory.objects.bulk_create(
+            [JobCategory(name=f"Category {i}", slug=f"category-{i}") for i in range(categories)]
+        )
+        body = "<p>" + ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 60) + "</p>"
+        batch = []
+        for i in range(total):
+            needed = random.randint(1, 50)
+            batch.append(Job(
+                category=random.choice(cats),
+                title=f"Job {i}",
+                task_description=body,
+                note=body,
+                freelancers_needed=needed,
+                freelancers_completed=random.randint(0, needed),
+                earning_per_task="0.50",
+                status=random.choice(("active", "paused", "completed")),
+                created_by=user,
+            ))
+            if len(batch) == 10_000:
+                Job.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Job.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor != "postgresql" else "ANALYZE gigs_job")
+
+    def scenarios(self, page):
+        """name -> (filtered queryset, row limit or None)"""
+        category_id = JobCategory.objects.values_list("id", flat=True).first()
+        by_category = Job.objects.select_related("category").filter(status="active", category_id=category_id)
+        available = Job.objects.select_related("category").filter(status="active", **has_free_slot())
+        return {
+            "category listing (all rows)": (by_category, None),
+            "category listing (first page)": (by_category, page),
+            "partner available (first page)": (available, page),
+        }
+
+    def time_query(self, queryset, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def run(self, options):
+        indexes = Job._meta.indexes
+        results = {}
+
+        for label, with_indexes in (("before", False), ("after", True)):
+            if not with_indexes:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.remove_index(Job, index)
+            for name, (queryset, limit) in self.scenarios(options["page"]).items():
+                if with_indexes:
+                    queryset = queryset.only(*JobViewSet.list_only_fields)
+                else:
+                    queryset = queryset.order_by()  # no stable ordering before
+                if limit:
+                    queryset = queryset[:limit]
+                if options["explain"]:
+                    self.stdout.write(f"[{label}] {name}:\n{queryset.explain()}")
+                results[(name, label)] = self.time_query(queryset, options["repeat"])
+            if not with_indexes:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(Job, index)
+
+        self.stdout.write(f"\n{'query':<34}{'before (ms)':>14}{'after (ms)':>14}")
+        for name in self.scenarios(options["page"]):
+            before, after = results[(name, "before")], results[(name, "after")]
+            self.stdout.write(f"{name:<34}{before:>14.2f}{after:>14.2f}")
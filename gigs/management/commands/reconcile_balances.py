@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gigs.models import Transaction, UserBalance
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the Transaction ledger and check every row's balance_after and "
+        "each user's cached UserBalance against the running sum."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rewrite cached balances that disagree with the ledger.")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cached = dict(UserBalance.objects.values_list("user_id", "balance"))
+        ledger = {}
+        bad_rows = 0
+
+        rows = (
+            Transaction.objects.order_by("user_id", "id")
+            .values_list("id", "user_id", "transaction_type", "amount", "balance_after")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        for row_id, user_id, transaction_type, amount, balance_after in rows:
+            signed = -amount if transaction_type in Transaction.DEBIT_TYPES else amount
+            running = ledger.get(user_id, Decimal("0.00")) + signed
+            ledger[user_id] = running
+            if balance_after != running:
+                bad_rows += 1
+                self.stdout.write(
+                    f"Transaction {row_id} (user {user_id}): balance_after {balance_after}, ledger says {running}"
+                )
+
+        mismatched = {
+            user_id: ledger.get(user_id, Decimal("0.00"))
+            for user_id in set(ledger) | set(cached)
+            if cached.get(user_id, Decimal("0.00")) != ledger.get(user_id, Decimal("0.00"))
+        }
+        for user_id, expected in sorted(mismatched.items()):
+            self.stdout.write(f"User {user_id}: cached {cached.get(user_id)}, ledger says {expected}")
+
+        if mismatched and options["fix"]:
+            with transaction.atomic():
+                for user_id, expected in mismatched.items():
+                    UserBalance.objects.update_or_create(user_id=user_id, defaults={"balance": expected})
+            self.stdout.write(self.style.SUCCESS(f"Rewrote {len(mismatched)} cached balance(s)."))
+
+        summary = f"{len(ledger)} user(s) checked, {bad_rows} bad row(s), {len(mismatched)} balance mismatch(es)."
+        if bad_rows or mismatched:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
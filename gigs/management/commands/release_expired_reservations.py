@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gigs.slots import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Release job slots held by reservations past their timeout. Run it from cron every minute or so."
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservation(s)."))
@@ -0,0 +1,147 @@
+"""
+Proof image uploads.
+
+ProofUploadHandler streams each uploaded file to a temporary file in chunks,
+hashing it as it goes and aborting as soon as it passes MAX_FILE_SIZE or
+turns out not to be an image, so nothing is buffered in memory and oversized
+uploads are cut off early. store_proof_media() then moves each file into a
+content-addressed path (one copy per sha256) and the thumbnail task renders
+the review thumbnails in the shared imaging pool.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.template.defaultfilters import filesizeformat
+from rest_framework import exceptions, status
+
+from .models import ProofMedia
+
+# Leading bytes -> (content type, extension)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', ('image/jpeg', 'jpg')),
+    (b'\x89PNG\r\n\x1a\n', ('image/png', 'png')),
+    (b'GIF87a', ('image/gif', 'gif')),
+    (b'GIF89a', ('image/gif', 'gif')),
+)
+
+
+def _setting(key, default):
+    return getattr(settings, "PROOF_MEDIA", {}).get(key, default)
+
+
+def sniff_image_type(header):
+    """(content_type, extension) from a file's first bytes, or None."""
+    for signature, image_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return ('image/webp', 'webp')
+    return None
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Uploaded file is too large."
+    default_code = 'upload_too_large'
+
+
+class ProofUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploads to disk, hashing and size-checking each chunk."""
+    chunk_size = 256 * 2 ** 10
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        self.image_type = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.image_type is None:
+            self.image_type = sniff_image_type(raw_data[:12])
+            if self.image_type is None:
+                raise exceptions.ParseError("Proof images must be JPEG, PNG, GIF or WebP.")
+
+        self.received += len(raw_data)
+        max_size = _setting("MAX_FILE_SIZE", 10 * 2 ** 20)
+        if self.received > max_size:
+            raise UploadTooLarge(f"Proof images may be at most {filesizeformat(max_size)}.")
+
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.hasher.hexdigest()
+        upload.image_type = self.image_type
+        return upload
+
+
+def inspect_upload(upload):
+    """
+    (sha256, image_type) for an uploaded file. Files that came through
+    ProofUploadHandler already carry both; anything else is read once here.
+    """
+    if getattr(upload, 'sha256', None):
+        return upload.sha256, upload.image_type
+    hasher = hashlib.sha256()
+    image_type = None
+    upload.seek(0)
+    for chunk in upload.chunks():
+        if image_type is None:
+            image_type = sniff_image_type(chunk[:12]) or False
+        hasher.update(chunk)
+    upload.seek(0)
+    return hasher.hexdigest(), image_type or None
+
+
+def media_path(sha256, extension, kind='proof_media'):
+    return f"{kind}/{sha256[:2]}/{sha256}.{extension}"
+
+
+def store_proof_media(uploads):
+    """
+    ProofMedia rows for the given uploads, in order. Content already on
+    file is reused without writing anything; new content is written once.
+    """
+    inspected = [inspect_upload(upload) for upload in uploads]
+    existing = ProofMedia.objects.in_bulk(
+        {sha256 for sha256, _ in inspected}, field_name='sha256'
+    )
+
+    media = []
+    for upload, (sha256, (content_type, extension)) in zip(uploads, inspected):
+        if sha256 not in existing:
+            existing[sha256] = _create_media(upload, sha256, content_type, extension)
+        media.append(existing[sha256])
+    return media
+
+
+def _create_media(upload, sha256, content_type, extension):
+    name = media_path(sha256, extension)
+    # Content-addressed: a file already at this path has these exact bytes
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    try:
+        with transaction.atomic():
+            return ProofMedia.objects.create(
+                sha256=sha256, file=name, content_type=content_type, size=upload.size
+            )
+    except IntegrityError:
+        # A concurrent upload of the same content won the race
+        return ProofMedia.objects.get(sha256=sha256)
+
+
+def thumbnail_path(media):
+    return media_path(media.sha256, 'jpg', kind='proof_thumbnails')
+
+
+def thumbnail_jobs(media_items):
+    size = _setting("THUMBNAIL_SIZE", 480)
+    quality = _setting("THUMBNAIL_QUALITY", 75)
+    return [
+        (default_storage.path(item.file.name), default_storage.path(thumbnail_path(item)), size, quality)
+        for item in media_items
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:28
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0002_job_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('submitted', 'Submitted'), ('completed', 'Completed'), ('released', 'Released'), ('expired', 'Expired')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_available_idx',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='freelancers_reserved',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('freelancers_needed__gt', django.db.models.expressions.CombinedExpression(models.F('freelancers_completed'), '+', models.F('freelancers_reserved')))), fields=['status', '-created_at', '-id'], name='job_available_idx'),
+        ),
+        migrations.AddField(
+            model_name='jobreservation',
+            name='freelancer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_reservations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='jobreservation',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='gigs.job'),
+        ),
+        migrations.AddIndex(
+            model_name='jobreservation',
+            index=models.Index(fields=['status', 'expires_at'], name='gigs_jobres_status_7a884a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='jobreservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('active', 'submitted'))), fields=('job', 'freelancer'), name='unique_open_job_reservation'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_balances(apps, schema_editor):
+    """Stamp existing ledger rows with running balances and seed UserBalance."""
+    Transaction = apps.get_model('gigs', 'Transaction')
+    UserBalance = apps.get_model('gigs', 'UserBalance')
+
+    balances = {}
+    for row in Transaction.objects.order_by('user_id', 'id').iterator(chunk_size=2000):
+        amount = -row.amount if row.transaction_type == 'withdrawal' else row.amount
+        balances[row.user_id] = balances.get(row.user_id, Decimal('0.00')) + amount
+        row.balance_after = balances[row.user_id]
+        row.save(update_fields=['balance_after'])
+
+    UserBalance.objects.bulk_create(
+        [UserBalance(user_id=user_id, balance=balance) for user_id, balance in balances.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0003_job_reservations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='balance_after',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'id'], name='gigs_transa_user_id_1ecac9_idx'),
+        ),
+        migrations.AddField(
+            model_name='userbalance',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_account', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0005_proof_media'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobsubmission',
+            index=models.Index(fields=['status', 'submitted_at'], name='submission_status_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobsubmission',
+            index=models.Index(fields=['job', 'status'], name='submission_job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0006_submission_review_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobsubmission',
+            name='submission_status_queue_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobsubmission',
+            index=models.Index(fields=['status', 'submitted_at', 'id'], name='submission_status_queue_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from decimal import Decimal
 import uuid
 from django.utils import timezone
 from django.conf import settings
@@ -28,6 +29,7 @@ class Job(models.Model):
     note = RichTextField(blank=True, null=True)
     freelancers_needed = models.IntegerField(default=1)
     freelancers_completed = models.IntegerField(default=0)
+    freelancers_reserved = models.IntegerField(default=0)
     earning_per_task = models.DecimalField(max_digits=10, decimal_places=2)
     timeout_minutes = models.IntegerField(default=30)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
@@ -35,12 +37,64 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['status', 'category', '-created_at', '-id'], name='job_status_cat_created_idx'),
+            # Partner listings only ever look at jobs with open slots
+            # The condition has no literals so it still matches parameterised queries
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='job_available_idx',
+                condition=models.Q(
+                    freelancers_needed__gt=models.F('freelancers_completed') + models.F('freelancers_reserved')
+                ),
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
     @property
     def is_available(self):
-        return self.status == 'active' and self.freelancers_completed < self.freelancers_needed
+        return (
+            self.status == 'active'
+            and self.freelancers_completed + self.freelancers_reserved < self.freelancers_needed
+        )
+
+
+class JobReservation(models.Model):
+    """A slot held for a freelancer while they work on a job."""
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('submitted', 'Submitted'),
+        ('completed', 'Completed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    )
+    # Reservations in these states still hold a slot on the job
+    OPEN_STATUSES = ('active', 'submitted')
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='reservations')
+    freelancer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='job_reservations')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job', 'freelancer'],
+                condition=models.Q(status__in=('active', 'submitted')),
+                name='unique_open_job_reservation',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.job.title} - {self.freelancer.username} | {self.status}"
 
 class ProofRequirement(models.Model):
     PROOF_TYPE_CHOICES = (
@@ -79,32 +133,168 @@ class JobSubmission(models.Model):
 
     class Meta:
         unique_together = ('job', 'freelancer')
+        indexes = [
+            # Review queue: status filter, oldest first; id breaks submitted_at ties for the cursor
+            models.Index(fields=['status', 'submitted_at', 'id'], name='submission_status_queue_idx'),
+            models.Index(fields=['job', 'status'], name='submission_job_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.job.title} - {self.freelancer.username}"
 
+class ProofMedia(models.Model):
+    """
+    An uploaded proof image, stored once per distinct content. Files live at
+    content-addressed paths, so the same screenshot submitted twice shares
+    one file and one thumbnail.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    thumbnail = models.FileField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=50)
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Proof media"
+
+    def __str__(self):
+        return self.sha256[:12]
+
+
 class ProofSubmission(models.Model):
     submission = models.ForeignKey(JobSubmission, on_delete=models.CASCADE, related_name='proofs')
     proof_requirement = models.ForeignKey(ProofRequirement, on_delete=models.CASCADE)
     text_content = models.TextField(blank=True)
+    # Legacy per-upload copies; new uploads go to media
     image = models.ImageField(upload_to='proof_images/', blank=True, null=True)
+    media = models.ForeignKey(ProofMedia, on_delete=models.PROTECT, null=True, blank=True, related_name='proofs')
 
     def __str__(self):
         return f"{self.submission.id} - {self.proof_requirement.title}"
 
+class TransactionQuerySet(models.QuerySet):
+    """The ledger is append-only: rows are added with record()/record_many() and never changed."""
+
+    def update(self, **kwargs):
+        raise TypeError("Transactions are append-only and cannot be updated.")
+
+    def delete(self):
+        raise TypeError("Transactions are append-only and cannot be deleted.")
+
+
+class TransactionManager(models.Manager.from_queryset(TransactionQuerySet)):
+    def record(self, user, transaction_type, amount, description, job_submission=None):
+        return self.record_many([
+            Transaction(
+                user=user, transaction_type=transaction_type, amount=amount,
+                description=description, job_submission=job_submission
+            )
+        ])[0]
+
+    def record_many(self, transactions):
+        """
+        Append transactions and move each user's cached balance in one pass:
+        lock the affected UserBalance rows, stamp every row with the running
+        balance_after, then write balances and ledger rows in bulk.
+        """
+        if not transactions:
+            return []
+
+        with transaction.atomic():
+            user_ids = sorted({entry.user_id for entry in transactions})
+            UserBalance.objects.bulk_create(
+                [UserBalance(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+            )
+            balances = {
+                account.user_id: account
+                for account in UserBalance.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+            }
+
+            now = timezone.now()
+            for entry in transactions:
+                account = balances[entry.user_id]
+                account.balance += entry.signed_amount
+                account.updated_at = now
+                entry.balance_after = account.balance
+
+            UserBalance.objects.bulk_update(balances.values(), ['balance', 'updated_at'])
+            return self.bulk_create(transactions)
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPE_CHOICES = (
         ('earning', 'Earning'),
         ('withdrawal', 'Withdrawal'),
         ('commission', 'Commission'),
     )
+    # Types that take money out of the balance
+    DEBIT_TYPES = ('withdrawal',)
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions')
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPE_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     description = models.CharField(max_length=255)
     job_submission = models.ForeignKey(JobSubmission, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TransactionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.transaction_type} - {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Transactions are append-only and cannot be updated.")
+        if self.balance_after is None:
+            # Route single inserts through the ledger so the balance stays in sync
+            Transaction.objects.record_many([self])
+            self._state.adding = False
+            return
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Transactions are append-only and cannot be deleted.")
+
+    @property
+    def signed_amount(self):
+        amount = Decimal(str(self.amount))
+        return -amount if self.transaction_type in self.DEBIT_TYPES else amount
+
+    @classmethod
+    def for_submission(cls, submission, job_title):
+        """Unsaved earning (and partner commission) rows for an approved submission."""
+        transactions = [
+            cls(
+                user_id=submission.freelancer_id,
+                transaction_type='earning',
+                amount=submission.freelancer_earning,
+                description=f"Earning from job: {job_title}",
+                job_submission=submission
+            )
+        ]
+        if submission.partner_id:
+            transactions.append(cls(
+                user_id=submission.partner_id,
+                transaction_type='commission',
+                amount=submission.partner_earning,
+                description=f"Commission from job: {job_title}",
+                job_submission=submission
+            ))
+        return transactions
+
+
+class UserBalance(models.Model):
+    """Running balance cached from the Transaction ledger, so reads are O(1)."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='balance_account')
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"{self.user.username} - {self.transaction_type} - {self.amount}"
\ No newline at end of file
+        return f"{self.user.username} | Balance: ${self.balance}"
@@ -0,0 +1,80 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class ReviewQueuePagination(CursorPagination):
+    """
+    Keyset pagination over (status, submitted_at, id): each page is an index
+    range scan from the cursor, so deep pages cost the same as the first.
+
+    submitted_at alone is not unique (bulk-created submissions share it), and
+    DRF's cursor falls back to an offset within ties, which skips or repeats
+    rows once reviewed submissions leave the queue. The cursor here carries
+    every ordering field and filters on the whole tuple, so it never needs an
+    offset.
+    """
+    ordering = ('submitted_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by(*(f'-{field}' for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._beyond(queryset.model, position, 'lt' if reverse else 'gt'))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        # Next continues after the last row shown, previous before the first
+        self.next_position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else position
+        self.previous_position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else position
+        if (self.has_next or self.has_previous) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        return '|'.join(str(getattr(instance, field)) for field in ordering)
+
+    def _beyond(self, model, position, lookup):
+        """Rows after (gt) or before (lt) position in (submitted_at, id) order."""
+        values = position.split('|', len(self.ordering) - 1)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, values)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            condition |= Q(**dict(zip(self.ordering[:i], values[:i])), **{f'{field}__{lookup}': values[i]})
+        return condition
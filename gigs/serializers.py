@@ -1,8 +1,20 @@
+from decimal import Decimal
 from rest_framework import serializers
 from .models import *
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.template.defaultfilters import filesizeformat
+from .html import sanitize_html
+from .media import inspect_upload, store_proof_media
+from . import listing, slots
+from accounts.authentication import get_request_partner
+from api.tasks import enqueue
 from accounts.models import User
 
+JOB_HTML_CACHE_SECONDS = 60 * 60 * 24
+
+
 class ProofRequirementSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProofRequirement
@@ -24,13 +36,106 @@ class JobSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'category', 'category_name', 'title', 'task_description',
             'note', 'freelancers_needed', 'freelancers_completed',
-            'earning_per_task', 'timeout_minutes', 'status',
+            'freelancers_reserved', 'earning_per_task', 'timeout_minutes', 'status',
             'proof_requirements', 'created_at', 'is_available'
         ]
-        read_only_fields = ['id', 'freelancers_completed', 'created_at']
+        read_only_fields = ['id', 'freelancers_completed', 'freelancers_reserved', 'created_at']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(job_html(instance))
+        return data
+
+
+def job_html(job):
+    """
+    Sanitized task_description/note, cached per job version. updated_at
+    changes on every save, so an edit never serves a stale body.
+    """
+    version = job.updated_at.timestamp() if job.updated_at else 0
+    key = f"job-html:{job.pk}:{version}"
+    bodies = cache.get(key)
+    if bodies is None:
+        bodies = {
+            'task_description': sanitize_html(job.task_description),
+            'note': sanitize_html(job.note),
+        }
+        cache.set(key, bodies, JOB_HTML_CACHE_SECONDS)
+    return bodies
+
+
+class JobListSerializer(serializers.ModelSerializer):
+    """Summary shape for listings; retrieve returns the full JobSerializer."""
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'category', 'category_name', 'title', 'freelancers_needed',
+            'freelancers_completed', 'freelancers_reserved', 'earning_per_task',
+            'timeout_minutes', 'status', 'created_at', 'is_available'
+        ]
+        read_only_fields = fields
+
+
+def build_proof_requirements(job, proof_requirements_data):
+    return [
+        ProofRequirement(
+            job=job,
+            title=proof_data['title'],
+            proof_type=proof_data['proof_type'],
+            order=idx
+        )
+        for idx, proof_data in enumerate(proof_requirements_data)
+    ]
+
+
+class JobCategoryField(serializers.PrimaryKeyRelatedField):
+    """Uses the categories preloaded by JobCreateListSerializer when present."""
+
+    def to_internal_value(self, data):
+        categories = self.context.get('categories')
+        if categories:
+            try:
+                return categories[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class JobCreateListSerializer(serializers.ListSerializer):
+    """Creates a batch of jobs and all their proof requirements in two INSERTs."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            category_ids = set()
+            for item in data:
+                try:
+                    category_ids.add(int(item.get('category')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context['categories'] = JobCategory.objects.in_bulk(category_ids)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        jobs = []
+        requirements = []
+        for item in validated_data:
+            proof_requirements_data = item.pop('proof_requirements', [])
+            job = Job(**item)
+            jobs.append(job)
+            requirements.extend(build_proof_requirements(job, proof_requirements_data))
+
+        with db_transaction.atomic():
+            Job.objects.bulk_create(jobs)
+            ProofRequirement.objects.bulk_create(requirements)
+            # bulk_create sends no post_save
+            listing.changed()
+        return jobs
 
 
 class JobCreateSerializer(serializers.ModelSerializer):
+    category = JobCategoryField(queryset=JobCategory.objects.all())
     proof_requirements = serializers.ListField(
         child=serializers.DictField(), write_only=True
     )
@@ -42,18 +147,14 @@ class JobCreateSerializer(serializers.ModelSerializer):
             'freelancers_needed', 'earning_per_task', 'timeout_minutes',
             'proof_requirements'
         ]
+        list_serializer_class = JobCreateListSerializer
 
     def create(self, validated_data):
         proof_requirements_data = validated_data.pop('proof_requirements', [])
-        job = Job.objects.create(**validated_data)
 
-        for idx, proof_data in enumerate(proof_requirements_data):
-            ProofRequirement.objects.create(
-                job=job,
-                title=proof_data['title'],
-                proof_type=proof_data['proof_type'],
-                order=idx
-            )
+        with db_transaction.atomic():
+            job = Job.objects.create(**validated_data)
+            ProofRequirement.objects.bulk_create(build_proof_requirements(job, proof_requirements_data))
 
         return job
 
@@ -61,10 +162,30 @@ class JobCreateSerializer(serializers.ModelSerializer):
 class ProofSubmissionSerializer(serializers.ModelSerializer):
     proof_requirement_title = serializers.CharField(source='proof_requirement.title', read_only=True)
     proof_requirement_type = serializers.CharField(source='proof_requirement.proof_type', read_only=True)
+    image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = ProofSubmission
-        fields = ['id', 'proof_requirement', 'proof_requirement_title', 'proof_requirement_type', 'text_content', 'image']
+        fields = [
+            'id', 'proof_requirement', 'proof_requirement_title', 'proof_requirement_type',
+            'text_content', 'image', 'thumbnail'
+        ]
+
+    def _url(self, file):
+        if not file:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(file.url) if request else file.url
+
+    def get_image(self, obj):
+        return self._url(obj.media.file if obj.media_id else obj.image)
+
+    def get_thumbnail(self, obj):
+        # Until the worker has rendered it, reviewers get the original
+        if obj.media_id:
+            return self._url(obj.media.thumbnail or obj.media.file)
+        return self._url(obj.image)
 
 
 class JobSubmissionSerializer(serializers.ModelSerializer):
@@ -82,15 +203,34 @@ class JobSubmissionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'submitted_at', 'reviewed_at']
 
 
+class ProofInputSerializer(serializers.Serializer):
+    """One proof in a submission. Multipart clients send proofs[0]proof_requirement_id, proofs[0]image, ..."""
+    proof_requirement_id = serializers.IntegerField()
+    text_content = serializers.CharField(required=False, allow_blank=True, default='')
+    # Plain FileField: the type is checked from the leading bytes, without decoding the image
+    image = serializers.FileField(required=False, allow_null=True)
+
+    def validate_image(self, value):
+        if not value:
+            return None
+        max_size = getattr(settings, 'PROOF_MEDIA', {}).get('MAX_FILE_SIZE', 10 * 2 ** 20)
+        if value.size > max_size:
+            raise serializers.ValidationError(f"Proof images may be at most {filesizeformat(max_size)}.")
+        if inspect_upload(value)[1] is None:
+            raise serializers.ValidationError("Proof images must be JPEG, PNG, GIF or WebP.")
+        return value
+
+
 class JobSubmissionCreateSerializer(serializers.ModelSerializer):
-    proofs = serializers.ListField(child=serializers.DictField(), write_only=True)
+    proofs = ProofInputSerializer(many=True, write_only=True)
 
     class Meta:
         model = JobSubmission
         fields = ['job', 'proofs']
 
     def validate_job(self, value):
-        if not value.is_available:
+        # A freelancer holding a reservation can submit even if the other slots are gone
+        if not value.is_available and not slots.open_reservation(value, self.context['request'].user):
             raise serializers.ValidationError("This job is no longer available.")
         return value
 
@@ -101,20 +241,29 @@ class JobSubmissionCreateSerializer(serializers.ModelSerializer):
         if JobSubmission.objects.filter(job=job, freelancer=freelancer).exists():
             raise serializers.ValidationError("You have already submitted this job.")
 
+        # Check every proof_requirement_id belongs to this job in one query
+        requirement_ids = {proof['proof_requirement_id'] for proof in data['proofs']}
+
+        valid_ids = set(
+            ProofRequirement.objects.filter(job=job, id__in=requirement_ids).values_list('id', flat=True)
+        )
+        invalid_ids = requirement_ids - valid_ids
+        if invalid_ids:
+            raise serializers.ValidationError(
+                {"proofs": f"Invalid proof_requirement_id for this job: {sorted(invalid_ids)}"}
+            )
+
         return data
 
     def create(self, validated_data):
         proofs_data = validated_data.pop('proofs')
         request = self.context['request']
 
-        # Get partner from API token if exists
-        partner = None
-        api_token = request.headers.get('X-API-Token')
-        if api_token:
-            partner = settings.AUTH_USER_MODEL.objects.filter(api_token=api_token, user_type='partner').first()
+        # Partner platform the freelancer came through, if any
+        partner = get_request_partner(request)
 
         # Calculate earnings
-        job = validated_data['job']
+        job = validated_data.pop('job')
         if partner:
             partner_earning = job.earning_per_task
             freelancer_earning = job.earning_per_task / 2
@@ -122,26 +271,44 @@ class JobSubmissionCreateSerializer(serializers.ModelSerializer):
             partner_earning = 0
             freelancer_earning = job.earning_per_task
 
-        submission = JobSubmission.objects.create(
-            job=job,
-            freelancer=request.user,
-            partner=partner,
-            partner_earning=partner_earning,
-            freelancer_earning=freelancer_earning,
-            **validated_data
-        )
+        with db_transaction.atomic():
+            images = [proof['image'] for proof in proofs_data if proof.get('image')]
+            media = iter(store_proof_media(images))
 
-        for proof_data in proofs_data:
-            ProofSubmission.objects.create(
-                submission=submission,
-                proof_requirement_id=proof_data['proof_requirement_id'],
-                text_content=proof_data.get('text_content', ''),
-                image=proof_data.get('image')
+            submission = JobSubmission.objects.create(
+                job=job,
+                freelancer=request.user,
+                partner=partner,
+                partner_earning=partner_earning,
+                freelancer_earning=freelancer_earning,
+                **validated_data
             )
 
+            proofs = ProofSubmission.objects.bulk_create([
+                ProofSubmission(
+                    submission=submission,
+                    proof_requirement_id=proof_data['proof_requirement_id'],
+                    text_content=proof_data.get('text_content', ''),
+                    media=next(media) if proof_data.get('image') else None
+                )
+                for proof_data in proofs_data
+            ])
+
+            new_media_ids = {proof.media_id for proof in proofs if proof.media_id and not proof.media.thumbnail}
+            for media_id in new_media_ids:
+                enqueue("gigs.make_proof_thumbnails", {"media_id": media_id})
+
+            slots.mark_submitted(job, request.user)
+
         return submission
 
 
+class BulkReviewSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=10000)
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    admin_note = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class UserSerializer(serializers.ModelSerializer):
     balance = serializers.SerializerMethodField()
     api_token = serializers.SerializerMethodField()
@@ -150,6 +317,22 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'role', 'balance', 'api_token']
         read_only_fields = ['id', 'api_token']
 
+    def get_balance(self, obj):
+        # Cached running balance; never a SUM over the ledger
+        try:
+            return obj.balance_account.balance
+        except UserBalance.DoesNotExist:
+            return Decimal("0.00")
+
+    def get_api_token(self, obj):
+        # Masked: the full key is only returned once, when it is created
+        if obj.role != 'partner':
+            return None
+        keys = getattr(obj, 'active_api_keys', None)
+        if keys is None:
+            keys = obj.api_keys.filter(is_active=True)
+        return [f"{key.prefix}.{'*' * 8}" for key in keys]
+
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
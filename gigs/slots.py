@@ -0,0 +1,153 @@
+"""
+Job slot accounting.
+
+A job has freelancers_needed slots. Each is free, held by an open
+JobReservation (freelancers_reserved) or filled by an approved submission
+(freelancers_completed). Every change goes through a conditional UPDATE, or
+for batches an UPDATE under the job's row lock, so concurrent requests can
+never push completed + reserved past needed or lose an increment.
+
+Counter updates bypass save(), so each one also invalidates the job
+listing snapshot (listing.changed()).
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .listing import changed as listing_changed
+from .models import Job, JobReservation
+
+
+def has_free_slot():
+    """Filter for jobs that still have a slot nobody holds."""
+    return {'freelancers_needed__gt': F('freelancers_completed') + F('freelancers_reserved')}
+
+
+def open_reservation(job, freelancer):
+    return JobReservation.objects.filter(
+        job=job, freelancer=freelancer, status__in=JobReservation.OPEN_STATUSES
+    ).first()
+
+
+def reserve_slot(job, freelancer):
+    """
+    Hold a slot for timeout_minutes. Returns the (possibly existing)
+    reservation, or None if the job is full or inactive.
+    """
+    existing = open_reservation(job, freelancer)
+    if existing:
+        return existing
+
+    try:
+        with transaction.atomic():
+            claimed = Job.objects.filter(pk=job.pk, status='active', **has_free_slot()).update(
+                freelancers_reserved=F('freelancers_reserved') + 1
+            )
+            if not claimed:
+                return None
+            listing_changed()
+            return JobReservation.objects.create(
+                job=job,
+                freelancer=freelancer,
+                expires_at=timezone.now() + timedelta(minutes=job.timeout_minutes),
+            )
+    except IntegrityError:
+        # A concurrent request from the same freelancer won; our increment rolled back.
+        return open_reservation(job, freelancer)
+
+
+def mark_submitted(job, freelancer):
+    """A submitted reservation keeps its slot until review and no longer expires."""
+    return JobReservation.objects.filter(
+        job=job, freelancer=freelancer, status='active'
+    ).update(status='submitted')
+
+
+def fill_slot(job, freelancer):
+    """
+    Count an approved submission against the job. Uses the freelancer's
+    reservation if they hold one, otherwise a free slot. Returns False when
+    the job has no slot left for them.
+    """
+    with transaction.atomic():
+        converted = JobReservation.objects.filter(
+            job=job, freelancer=freelancer, status__in=JobReservation.OPEN_STATUSES
+        ).update(status='completed')
+
+        if converted:
+            updated = Job.objects.filter(pk=job.pk, freelancers_reserved__gt=0).update(
+                freelancers_reserved=F('freelancers_reserved') - 1,
+                freelancers_completed=F('freelancers_completed') + 1,
+            )
+        else:
+            updated = Job.objects.filter(pk=job.pk, **has_free_slot()).update(
+                freelancers_completed=F('freelancers_completed') + 1
+            )
+
+        if updated:
+            Job.objects.filter(
+                pk=job.pk, freelancers_completed__gte=F('freelancers_needed')
+            ).exclude(status='completed').update(status='completed')
+            listing_changed()
+        return bool(updated)
+
+
+def release_slot(job, freelancer, status='released'):
+    """Give back the freelancer's held slot, e.g. when their submission is rejected."""
+    with transaction.atomic():
+        released = JobReservation.objects.filter(
+            job=job, freelancer=freelancer, status__in=JobReservation.OPEN_STATUSES
+        ).update(status=status)
+        if released:
+            Job.objects.filter(pk=job.pk, freelancers_reserved__gte=released).update(
+                freelancers_reserved=F('freelancers_reserved') - released
+            )
+            listing_changed()
+    return released
+
+
+def release_expired_reservations(now=None, batch_size=1000):
+    """Expire active reservations past expires_at, one UPDATE pair per job. Returns the count."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        expired = list(
+            JobReservation.objects.filter(status='active', expires_at__lte=now)
+            .order_by('job_id')
+            .values_list('job_id', 'id')[:batch_size]
+        )
+        if not expired:
+            return total
+
+        for job_id, rows in groupby(expired, key=lambda row: row[0]):
+            ids = [reservation_id for _, reservation_id in rows]
+            with transaction.atomic():
+                released = JobReservation.objects.filter(id__in=ids, status='active').update(status='expired')
+                if released:
+                    Job.objects.filter(pk=job_id, freelancers_reserved__gte=released).update(
+                        freelancers_reserved=F('freelancers_reserved') - released
+                    )
+                    listing_changed()
+            total += released
+
+
+def fill_slots(job_id, reserved, wanted):
+    """
+    Batch version of fill_slot for one job: `reserved` approvals consume
+    reservations their freelancers hold, and up to `wanted` more take free
+    slots. Returns how many of the `wanted` were granted. Call it inside a
+    transaction; the job row stays locked until it commits.
+    """
+    job = Job.objects.select_for_update().get(pk=job_id)
+    free = max(0, job.freelancers_needed - job.freelancers_completed - job.freelancers_reserved)
+    granted = min(free, wanted)
+    if reserved or granted:
+        Job.objects.filter(pk=job_id).update(
+            freelancers_reserved=F('freelancers_reserved') - reserved,
+            freelancers_completed=F('freelancers_completed') + reserved + granted,
+        )
+        listing_changed()
+    return granted
@@ -0,0 +1,43 @@
+import logging
+
+from api import imaging
+from api.tasks import task
+from .models import JobSubmission, ProofMedia, Transaction
+from . import media, slots
+
+logger = logging.getLogger(__name__)
+
+
+@task("gigs.record_submission_transactions")
+def record_submission_transactions(payload):
+    """Create the earning/commission rows for an approved submission."""
+    submission = JobSubmission.objects.select_related('job').get(pk=payload['submission_id'])
+    # Retries must not double-pay.
+    if Transaction.objects.filter(job_submission=submission).exists():
+        return
+
+    Transaction.objects.record_many(Transaction.for_submission(submission, submission.job.title))
+
+
+@task("gigs.release_expired_reservations")
+def release_expired_reservations(payload):
+    slots.release_expired_reservations()
+
+
+@task("gigs.make_proof_thumbnails", batch=True)
+def make_proof_thumbnails(payloads):
+    """Render review thumbnails for new proof media in the imaging pool."""
+    pending = list(ProofMedia.objects.filter(
+        pk__in={payload['media_id'] for payload in payloads}, thumbnail=''
+    ))
+    results = imaging.run_many(imaging.resize, media.thumbnail_jobs(pending))
+
+    done = []
+    for item, result in zip(pending, results):
+        if isinstance(result, Exception):
+            # Undecodable images are not retried; reviewers fall back to the original
+            logger.warning("Thumbnail for proof media %s failed: %s", item.pk, result)
+            continue
+        item.thumbnail = media.thumbnail_path(item)
+        done.append(item)
+    ProofMedia.objects.bulk_update(done, ['thumbnail'])
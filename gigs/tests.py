@@ -1,3 +1,586 @@
-from django.test import TestCase
+import importlib
+import io
+import tempfile
+import threading
+import unittest
+import uuid
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import PartnerAPIKey, User
+from api.models import BackgroundTask
+from .html import sanitize_html
+from .models import *
+from .serializers import JobListSerializer, job_html
+from .views import JobViewSet
+from .tasks import make_proof_thumbnails
+from . import slots
+
+backfill = importlib.import_module("gigs.migrations.0004_balance_ledger")
+
+
+def make_job(admin, needed, **kwargs):
+    category = JobCategory.objects.get_or_create(name="General", slug="general")[0]
+    return Job.objects.create(
+        category=category, title="Job", earning_per_task="1.00",
+        freelancers_needed=needed, created_by=admin, **kwargs
+    )
+
+
+class SlotReservationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.freelancers = [
+            User.objects.create_user(f"f{i}@example.com", f"f{i}", "user", None) for i in range(3)
+        ]
+
+    def test_reservations_hold_slots_until_released(self):
+        job = make_job(self.admin, needed=2)
+
+        self.assertIsNotNone(slots.reserve_slot(job, self.freelancers[0]))
+        self.assertIsNotNone(slots.reserve_slot(job, self.freelancers[1]))
+        self.assertIsNone(slots.reserve_slot(job, self.freelancers[2]))
+
+        slots.release_slot(job, self.freelancers[0])
+        self.assertIsNotNone(slots.reserve_slot(job, self.freelancers[2]))
+        job.refresh_from_db()
+        self.assertEqual(job.freelancers_reserved, 2)
+
+    def test_expired_reservations_are_swept(self):
+        job = make_job(self.admin, needed=1, timeout_minutes=0)
+        slots.reserve_slot(job, self.freelancers[0])
+
+        self.assertEqual(slots.release_expired_reservations(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.freelancers_reserved, 0)
+        self.assertTrue(job.is_available)
+
+    def test_fill_slot_uses_reservation_then_free_slots(self):
+        job = make_job(self.admin, needed=2)
+        slots.reserve_slot(job, self.freelancers[0])
+
+        self.assertTrue(slots.fill_slot(job, self.freelancers[0]))
+        self.assertTrue(slots.fill_slot(job, self.freelancers[1]))
+        self.assertFalse(slots.fill_slot(job, self.freelancers[2]))
+
+        job.refresh_from_db()
+        self.assertEqual((job.freelancers_completed, job.freelancers_reserved), (2, 0))
+        self.assertEqual(job.status, 'completed')
+
+    def test_listing_snapshot_follows_slot_counters(self):
+        cache.clear()
+        job = make_job(self.admin, needed=2)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        client.get("/api/gigs/jobs/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            slots.reserve_slot(job, self.freelancers[0])
+        data = client.get("/api/gigs/jobs/").json()['data']
+        self.assertEqual(data[0]['freelancers_reserved'], 1)
+
+
+class JobSerializationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.job = make_job(self.admin, needed=2, task_description="<p>Do it</p>", note="<b>Note</b>")
+
+    def test_listing_is_the_summary_shape(self):
+        with CaptureQueriesContext(connection) as queries:
+            row = self.client.get("/api/gigs/jobs/").json()['data'][0]
+        self.assertEqual(list(row), JobListSerializer.Meta.fields)
+        # The rich text columns are not even loaded for listings
+        self.assertFalse(any('"task_description"' in query['sql'] for query in queries))
+
+        detail = self.client.get(f"/api/gigs/jobs/{self.job.pk}/").json()['data']
+        self.assertEqual(detail['task_description'], "<p>Do it</p>")
+        self.assertIn('proof_requirements', detail)
+
+    def test_descriptions_are_sanitized(self):
+        self.job.task_description = (
+            '<p onclick="steal()">Hi<script>alert(1)</script> '
+            '<a href="javascript:alert(1)" onmouseover="x()">here</a> <a href="https://example.com">ok</a></p>'
+        )
+        self.job.save()
+        self.assertEqual(
+            job_html(self.job)['task_description'],
+            '<p>Hi <a rel="noopener noreferrer nofollow">here</a> '
+            '<a href="https://example.com" rel="noopener noreferrer nofollow">ok</a></p>',
+        )
+        self.assertEqual(sanitize_html('<img src="x" onerror="alert(1)"><iframe>gone</iframe>'), '<img src="x">')
+
+    def test_cached_html_follows_updated_at(self):
+        self.assertEqual(job_html(self.job)['note'], "<b>Note</b>")
+        # update() leaves updated_at alone, so the cached body is still served
+        Job.objects.filter(pk=self.job.pk).update(note="<i>Changed</i>")
+        self.job.refresh_from_db()
+        self.assertEqual(job_html(self.job)['note'], "<b>Note</b>")
+
+        self.job.save()
+        self.assertEqual(job_html(self.job)['note'], "<i>Changed</i>")
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "Checks SQLite query plans")
+@override_settings(RESPONSE_SNAPSHOTS={"ENABLED": False})
+class JobListingPlanTests(TestCase):
+    """The job listing queries are answered from the 0002/0003 indexes, already in order."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.job = make_job(self.admin, needed=2, status="active")
+
+    def listing_plan(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(path).status_code, 200)
+        sql = next(query["sql"] for query in queries if 'FROM "gigs_job"' in query["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return "\n".join(row[-1] for row in cursor.fetchall())
+
+    def test_filtered_listing_uses_the_status_category_index(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        plan = self.listing_plan(client, f"/api/gigs/jobs/?status=active&category={self.job.category_id}")
+        self.assertIn("USING INDEX job_status_cat_created_idx (status=? AND category_id=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_partner_listing_uses_the_available_jobs_index(self):
+        partner = User.objects.create_user("partner@example.com", "partner", "partner", None)
+        client = APIClient()
+        client.credentials(HTTP_X_API_TOKEN=PartnerAPIKey.generate(partner)[1])
+        plan = self.listing_plan(client, "/api/gigs/jobs/")
+        self.assertIn("USING INDEX job_available_idx (status=?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class SubmissionCreateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.freelancer = User.objects.create_user("f@example.com", "f", "user", None)
+        self.job = make_job(self.admin, needed=2, status="active")
+        self.other_job = make_job(self.admin, needed=2, status="active")
+        self.requirements = [
+            ProofRequirement.objects.create(job=self.job, title=f"Step {i}", proof_type="text", order=i)
+            for i in range(3)
+        ]
+        self.foreign = ProofRequirement.objects.create(job=self.other_job, title="Other", proof_type="text")
+        self.client = APIClient()
+        self.client.force_authenticate(self.freelancer)
+
+    def submit(self, requirement_ids):
+        proofs = [{"proof_requirement_id": pk, "text_content": "done"} for pk in requirement_ids]
+        return self.client.post("/api/gigs/submissions/", {"job": self.job.pk, "proofs": proofs}, format="json")
+
+    def test_requirement_ids_are_checked_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit([self.requirements[0].pk, self.foreign.pk, 9999])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f"[{self.foreign.pk}, 9999]", str(response.json()["data"]["proofs"]))
+        requirement_queries = [query for query in queries if 'FROM "gigs_proofrequirement"' in query["sql"]]
+        self.assertEqual(len(requirement_queries), 1)
+        self.assertFalse(JobSubmission.objects.exists())
+
+    def test_proofs_are_inserted_together(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit([requirement.pk for requirement in self.requirements])
+        self.assertEqual(response.status_code, 201)
+        inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "gigs_proofsubmission"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ProofSubmission.objects.filter(submission__freelancer=self.freelancer).count(), 3)
+
+
+class BatchJobCreateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.category = JobCategory.objects.create(name="General", slug="general")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def job(self, **overrides):
+        return dict({
+            "category": self.category.pk, "title": "Batch job", "freelancers_needed": 3,
+            "earning_per_task": "1.50", "timeout_minutes": 30,
+            "proof_requirements": [{"title": "Screenshot", "proof_type": "image"}, {"title": "Link", "proof_type": "text"}],
+        }, **overrides)
+
+    def batch(self, jobs):
+        return self.client.post("/api/gigs/jobs/batch/", {"jobs": jobs}, format="json")
+
+    def test_jobs_and_requirements_are_created_in_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch([self.job(title=f"Job {i}") for i in range(20)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Job.objects.count(), 20)
+        self.assertEqual(ProofRequirement.objects.count(), 40)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("INSERT")]), 2)
+
+    def test_a_bad_row_inserts_nothing_and_is_located(self):
+        jobs = [self.job(), self.job(), self.job(title=""), self.job(category=9999)]
+        response = self.batch(jobs)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["data"]
+        self.assertEqual([bool(error) for error in errors], [False, False, True, True])
+        self.assertIn("title", errors[2])
+        self.assertIn("category", errors[3])
+        self.assertFalse(Job.objects.exists())
+
+    def test_batches_are_limited(self):
+        response = self.batch([self.job()] * (JobViewSet.batch_max_jobs + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+        freelancer = User.objects.create_user("f@example.com", "f", "user", None)
+        self.client.force_authenticate(freelancer)
+        self.assertEqual(self.batch([self.job()]).status_code, 403)
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.partner = User.objects.create_user("partner@example.com", "partner", "partner", None)
+        self.job = make_job(self.admin, needed=2, status="active")
+        self.freelancers = [
+            User.objects.create_user(f"f{i}@example.com", f"f{i}", "user", None) for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def submit(self, job, freelancer, minutes_ago, **kwargs):
+        submission = JobSubmission.objects.create(job=job, freelancer=freelancer, freelancer_earning="1.00", **kwargs)
+        JobSubmission.objects.filter(pk=submission.pk).update(submitted_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return submission
+
+    def review(self, submissions, action, **extra):
+        ids = [str(getattr(submission, "pk", submission)) for submission in submissions]
+        response = self.client.post("/api/gigs/submissions/bulk-review/", {"ids": ids, "action": action, **extra}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return {result["id"]: result["outcome"] for result in response.json()["data"]["results"]}
+
+    def test_approvals_stop_at_freelancers_needed(self):
+        # The reservation holder keeps their slot even though they submitted last
+        holder = self.freelancers[3]
+        reservation = slots.reserve_slot(self.job, holder)
+        submissions = [self.submit(self.job, freelancer, 10 - i) for i, freelancer in enumerate(self.freelancers)]
+        JobSubmission.objects.filter(pk=submissions[0].pk).update(partner=self.partner, partner_earning="0.50")
+        missing = uuid.uuid4()
+
+        outcomes = self.review(submissions + [submissions[0], missing], "approve")
+
+        self.assertEqual(outcomes, {
+            str(submissions[0].pk): "approved", str(submissions[1].pk): "no_slots",
+            str(submissions[2].pk): "no_slots", str(submissions[3].pk): "approved", str(missing): "not_found",
+        })
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.freelancers_completed, self.job.freelancers_reserved, self.job.status), (2, 0, "completed"))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, "completed")
+        self.assertEqual(JobSubmission.objects.filter(status="approved").count(), 2)
+        self.assertEqual(JobSubmission.objects.filter(status="pending").count(), 2)
+
+        ledger = {(entry.user_id, entry.transaction_type): entry.balance_after for entry in Transaction.objects.all()}
+        self.assertEqual(ledger, {
+            (self.freelancers[0].pk, "earning"): Decimal("1.00"),
+            (self.partner.pk, "commission"): Decimal("0.50"),
+            (holder.pk, "earning"): Decimal("1.00"),
+        })
+        self.assertEqual(UserBalance.objects.get(user=self.partner).balance, Decimal("0.50"))
+
+    def test_reviewed_submissions_are_left_alone(self):
+        first, second = (self.submit(self.job, freelancer, 5) for freelancer in self.freelancers[:2])
+        self.review([first], "approve")
+
+        outcomes = self.review([first, second], "reject", admin_note="Blurry")
+        self.assertEqual(outcomes, {str(first.pk): "already_reviewed", str(second.pk): "rejected"})
+        self.assertEqual(Transaction.objects.count(), 1)
+        first.refresh_from_db()
+        self.assertEqual(first.status, "approved")
+
+    def test_rejections_release_reservations(self):
+        reservation = slots.reserve_slot(self.job, self.freelancers[0])
+        submissions = [self.submit(self.job, freelancer, 5) for freelancer in self.freelancers[:2]]
+
+        outcomes = self.review(submissions, "reject", admin_note="Not done")
+
+        self.assertEqual(set(outcomes.values()), {"rejected"})
+        reservation.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertEqual((reservation.status, self.job.freelancers_reserved), ("released", 0))
+        self.assertEqual(set(JobSubmission.objects.values_list("admin_note", flat=True)), {"Not done"})
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_mixed_batches_are_settled_per_job(self):
+        small = make_job(self.admin, needed=1, status="active")
+        big_job = [self.submit(self.job, freelancer, 10 - i) for i, freelancer in enumerate(self.freelancers[:3])]
+        small_job = [self.submit(small, freelancer, 10 - i) for i, freelancer in enumerate(self.freelancers[:2])]
+        self.review([big_job[0]], "reject")
+
+        outcomes = self.review(big_job + small_job, "approve")
+
+        self.assertEqual([outcomes[str(submission.pk)] for submission in big_job], ["already_reviewed", "approved", "approved"])
+        self.assertEqual([outcomes[str(submission.pk)] for submission in small_job], ["approved", "no_slots"])
+        self.assertEqual(
+            sorted(Job.objects.values_list("freelancers_completed", "status")), [(1, "completed"), (2, "completed")]
+        )
+        self.assertEqual(Transaction.objects.filter(transaction_type="earning").count(), 3)
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f"l{i}@example.com", f"l{i}", "user", None) for i in range(2)]
+
+    def entry(self, user, transaction_type, amount, **kwargs):
+        return Transaction(user=user, transaction_type=transaction_type, amount=Decimal(amount), description="Test", **kwargs)
+
+    def balances_after(self, user):
+        return list(Transaction.objects.filter(user=user).order_by("id").values_list("balance_after", flat=True))
+
+    def test_balance_after_chains_across_calls(self):
+        first, second = self.users
+        Transaction.objects.record_many([self.entry(first, "earning", "5.00"), self.entry(second, "earning", "1.00"),
+                                         self.entry(first, "earning", "2.50")])
+        Transaction.objects.record_many([self.entry(first, "withdrawal", "3.00"), self.entry(first, "commission", "1.00")])
+
+        self.assertEqual(self.balances_after(first), [Decimal(v) for v in ("5.00", "7.50", "4.50", "5.50")])
+        self.assertEqual(self.balances_after(second), [Decimal("1.00")])
+        self.assertEqual(UserBalance.objects.get(user=first).balance, Decimal("5.50"))
+
+    def test_ledger_rows_cannot_change(self):
+        Transaction.objects.record_many([self.entry(self.users[0], "earning", "1.00")])
+        row = Transaction.objects.get()
+        with self.assertRaises(TypeError):
+            Transaction.objects.update(amount=Decimal("9.00"))
+        with self.assertRaises(TypeError):
+            Transaction.objects.filter(pk=row.pk).delete()
+        with self.assertRaises(TypeError):
+            row.save()
+        with self.assertRaises(TypeError):
+            row.delete()
+        self.assertEqual(Transaction.objects.get().amount, Decimal("1.00"))
+
+    def test_save_goes_through_the_ledger(self):
+        user = self.users[0]
+        Transaction.objects.record(user, "earning", Decimal("2.00"), "First")
+        row = self.entry(user, "withdrawal", "0.50")
+        row.save()
+        created = Transaction.objects.create(user=user, transaction_type="earning", amount=Decimal("1.00"), description="x")
+
+        self.assertEqual((row.balance_after, created.balance_after), (Decimal("1.50"), Decimal("2.50")))
+        self.assertEqual(UserBalance.objects.get(user=user).balance, Decimal("2.50"))
+
+    def test_reconcile_balances_reports_and_fixes_drift(self):
+        first, second = self.users
+        Transaction.objects.record_many([self.entry(first, "earning", "3.00"), self.entry(second, "earning", "1.00")])
+        UserBalance.objects.filter(user=first).update(balance=Decimal("99.00"))
+        # A row written around record_many, with a wrong running balance
+        Transaction.objects.bulk_create([self.entry(second, "earning", "1.00", balance_after=Decimal("5.00"))])
+
+        out = io.StringIO()
+        call_command("reconcile_balances", stdout=out)
+        self.assertIn(f"User {first.pk}: cached 99.00, ledger says 3.00", out.getvalue())
+        self.assertIn("2 user(s) checked, 1 bad row(s), 2 balance mismatch(es).", out.getvalue())
+        self.assertEqual(UserBalance.objects.get(user=first).balance, Decimal("99.00"))
+
+        call_command("reconcile_balances", "--fix", stdout=io.StringIO())
+        self.assertEqual(UserBalance.objects.get(user=first).balance, Decimal("3.00"))
+        self.assertEqual(UserBalance.objects.get(user=second).balance, Decimal("2.00"))
+
+    def test_backfill_stamps_the_existing_ledger(self):
+        job = make_job(self.users[0], needed=3)
+        for user in self.users:
+            JobSubmission.objects.create(job=job, freelancer=user, status="approved", freelancer_earning="1.25")
+        # Rows as they were before the ledger columns: one earning per approved submission, no balances
+        Transaction.objects.bulk_create([
+            entry
+            for submission in JobSubmission.objects.filter(status="approved")
+            for entry in Transaction.for_submission(submission, job.title)
+        ] + [self.entry(self.users[0], "withdrawal", "0.25")])
+
+        state = MigrationExecutor(connection).loader.project_state(("gigs", "0004_balance_ledger"))
+        backfill.backfill_balances(state.apps, None)
+
+        self.assertEqual(Transaction.objects.filter(transaction_type="earning").count(), 2)
+        self.assertEqual(self.balances_after(self.users[0]), [Decimal("1.25"), Decimal("1.00")])
+        self.assertEqual(self.balances_after(self.users[1]), [Decimal("1.25")])
+        self.assertEqual(
+            dict(UserBalance.objects.values_list("user_id", "balance")),
+            {self.users[0].pk: Decimal("1.00"), self.users[1].pk: Decimal("1.25")},
+        )
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    """Many admins approving submissions for the same job at once."""
+    needed = 5
+    submissions = 25
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.job = make_job(self.admin, needed=self.needed)
+        self.submission_ids = [
+            JobSubmission.objects.create(
+                job=self.job,
+                freelancer=User.objects.create_user(f"f{i}@example.com", f"f{i}", "user", None),
+                freelancer_earning="1.00",
+            ).pk
+            for i in range(self.submissions)
+        ]
+
+    def approve(self, submission_id, results):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        try:
+            response = client.post(f"/api/gigs/submissions/{submission_id}/approve/")
+            results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_approvals_never_overshoot_freelancers_needed(self):
+        results = []
+        threads = [
+            threading.Thread(target=self.approve, args=(submission_id, results))
+            for submission_id in self.submission_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.freelancers_completed, self.needed)
+        self.assertEqual(self.job.status, 'completed')
+        self.assertEqual(results.count(200), self.needed)
+        self.assertEqual(results.count(409), self.submissions - self.needed)
+        self.assertEqual(JobSubmission.objects.filter(status='approved').count(), self.needed)
+
+    def test_duplicate_approvals_fill_one_slot(self):
+        results = []
+        threads = [
+            threading.Thread(target=self.approve, args=(self.submission_ids[0], results))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.job.refresh_from_db()
+        self.assertEqual(results.count(200), 1)
+        self.assertEqual(self.job.freelancers_completed, 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGING={"PROCESSES": 0})
+class ProofMediaTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        self.job = make_job(self.admin, needed=3)
+        self.requirement = ProofRequirement.objects.create(job=self.job, title="Screenshot", proof_type="image")
+
+    def submit(self, freelancer, content):
+        client = APIClient()
+        client.force_authenticate(freelancer)
+        upload = io.BytesIO(content)
+        upload.name = "proof.png"
+        return client.post("/api/gigs/submissions/", {
+            "job": self.job.pk,
+            "proofs[0]proof_requirement_id": self.requirement.pk,
+            "proofs[0]image": upload,
+        }, format="multipart")
+
+    def test_identical_uploads_share_media_and_thumbnail(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "red").save(buffer, "PNG")
+        for i in range(2):
+            freelancer = User.objects.create_user(f"f{i}@example.com", f"f{i}", "user", None)
+            self.assertEqual(self.submit(freelancer, buffer.getvalue()).status_code, 201)
+
+        media = ProofMedia.objects.get()
+        self.assertEqual(media.proofs.count(), 2)
+
+        make_proof_thumbnails([task.payload for task in BackgroundTask.objects.filter(name="gigs.make_proof_thumbnails")])
+        media.refresh_from_db()
+        with Image.open(media.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (480, 360))
+
+    def test_non_image_upload_is_rejected(self):
+        freelancer = User.objects.create_user("f@example.com", "f", "user", None)
+        self.assertEqual(self.submit(freelancer, b"#!/bin/sh\necho hi\n").status_code, 400)
+        self.assertFalse(ProofMedia.objects.exists())
+
+
+class ReviewQueueTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@example.com", "admin", None)
+        job = make_job(self.admin, needed=30)
+        requirements = [
+            ProofRequirement.objects.create(job=job, title=f"Step {i}", proof_type="text", order=i)
+            for i in range(3)
+        ]
+        for i in range(25):
+            submission = JobSubmission.objects.create(
+                job=job,
+                freelancer=User.objects.create_user(f"f{i}@example.com", f"f{i}", "user", None),
+            )
+            ProofSubmission.objects.bulk_create(
+                ProofSubmission(submission=submission, proof_requirement=requirement, text_content="done")
+                for requirement in requirements
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_query_count_is_constant_per_page(self):
+        for page_size in (5, 20):
+            # One query for the page, one for its proofs with their requirements and media
+            with self.assertNumQueries(2):
+                response = self.client.get(f"/api/gigs/submissions/review-queue/?page_size={page_size}")
+            self.assertEqual(len(response.data['data']['results']), page_size)
+
+    def test_cursor_walks_every_submission_once(self):
+        seen = []
+        url = "/api/gigs/submissions/review-queue/?page_size=10"
+        while url:
+            data = self.client.get(url).data['data']
+            seen += [submission['id'] for submission in data['results']]
+            url = data['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_cursor_survives_ties_and_reviews_between_pages(self):
+        # Bulk-created submissions share their timestamp
+        JobSubmission.objects.update(submitted_at=timezone.now())
+        expected = sorted(str(pk) for pk in JobSubmission.objects.values_list("id", flat=True))
+
+        seen = []
+        url = "/api/gigs/submissions/review-queue/?page_size=10"
+        while url:
+            data = self.client.get(url).data['data']
+            page = [submission['id'] for submission in data['results']]
+            seen += page
+            # Reviewing the page takes it out of the pending queue
+            JobSubmission.objects.filter(id__in=page[:7]).update(status='approved')
+            url = data['next']
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_the_page_before(self):
+        JobSubmission.objects.update(submitted_at=timezone.now())
+        first = self.client.get("/api/gigs/submissions/review-queue/?page_size=10").data['data']
+        second = self.client.get(first['next']).data['data']
+
+        back = self.client.get(second['previous']).data['data']
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
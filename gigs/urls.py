@@ -0,0 +1,14 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import *
+
+router = DefaultRouter()
+router.register("categories", JobCategoryViewSet, basename="job-categories")
+router.register("jobs", JobViewSet, basename="jobs")
+router.register("submissions", JobSubmissionViewSet, basename="job-submissions")
+router.register("users", UserViewSet, basename="gig-users")
+router.register("transactions", TransactionViewSet, basename="transactions")
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -2,12 +2,20 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from accounts.authentication import get_request_partner
+from accounts.models import PartnerAPIKey
 from accounts.permissions import IsUser, IsAdmin
 from django.utils import timezone
 from django.db import transaction as db_transaction
+from django.db.models import F, Prefetch
 from django.conf import settings
+from api.tasks import enqueue
+from api.throttling import PartnerRateThrottle, RateLimitHeadersMixin
 from .models import *
 from .serializers import *
+from .media import ProofUploadHandler
+from .pagination import ReviewQueuePagination
+from . import listing, slots
 
 class StandardResponse:
     @staticmethod
@@ -56,17 +64,37 @@ class JobCategoryViewSet(viewsets.ModelViewSet):
         return StandardResponse.error("Validation failed", serializer.errors)
 
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(RateLimitHeadersMixin, viewsets.ModelViewSet):
     queryset = Job.objects.all()
     permission_classes = [IsAuthenticated]
+    throttle_classes = [PartnerRateThrottle]
+    throttle_scope = 'gigs.jobs'
+
+    # Columns loaded for listings; the RichTextField bodies are skipped
+    list_only_fields = (
+        'id', 'category', 'category__name', 'title', 'freelancers_needed',
+        'freelancers_completed', 'freelancers_reserved', 'earning_per_task',
+        'timeout_minutes', 'status', 'created_at',
+    )
+
+    batch_max_jobs = 500
+
+    def wants_detail(self):
+        return self.action != 'list' or self.request.query_params.get('detail') in ('1', 'true')
 
     def get_serializer_class(self):
         if self.action == 'create':
             return JobCreateSerializer
+        if not self.wants_detail():
+            return JobListSerializer
         return JobSerializer
 
     def get_queryset(self):
-        queryset = Job.objects.select_related('category').prefetch_related('proof_requirements')
+        queryset = Job.objects.select_related('category')
+        if self.wants_detail():
+            queryset = queryset.prefetch_related('proof_requirements')
+        else:
+            queryset = queryset.only(*self.list_only_fields)
 
         category_id = self.request.query_params.get('category')
         if category_id:
@@ -77,16 +105,31 @@ class JobViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status=status_param)
 
         # For partners, show only active and available jobs
-        api_token = self.request.headers.get('X-API-Token')
-        if api_token:
-            queryset = queryset.filter(status='active', freelancers_completed__lt=models.F('freelancers_needed'))
+        if get_request_partner(self.request):
+            queryset = queryset.filter(status='active', **slots.has_free_slot())
 
         return queryset
 
     def list(self, request):
-        jobs = self.get_queryset()
-        serializer = self.get_serializer(jobs, many=True)
-        return StandardResponse.success("Jobs retrieved successfully", serializer.data)
+        def payload():
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            return {'success': True, 'message': "Jobs retrieved successfully", 'data': serializer.data}
+
+        # Summary listings come from the rendered snapshot; ?detail, other
+        # filters and the browsable API are built per request
+        if (
+            listing.snapshot.enabled
+            and not self.wants_detail()
+            and request.accepted_renderer.format == 'json'
+            and set(request.query_params) <= listing.CACHEABLE_PARAMS
+        ):
+            entry = listing.snapshot.get((
+                bool(get_request_partner(request)),
+                request.query_params.get('category', ''),
+                request.query_params.get('status', ''),
+            ), payload)
+            return listing.snapshot.response(entry)
+        return Response(payload(), status=status.HTTP_200_OK)
 
     def retrieve(self, request, pk=None):
         try:
@@ -106,6 +149,52 @@ class JobViewSet(viewsets.ModelViewSet):
             return StandardResponse.created("Job created successfully", serializer.data)
         return StandardResponse.error("Validation failed", serializer.errors)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """Create many jobs at once: {"jobs": [<job>, ...]}"""
+        if not request.user.is_staff:
+            return StandardResponse.error("Only admin can create jobs", status_code=status.HTTP_403_FORBIDDEN)
+
+        serializer = JobCreateSerializer(
+            data=request.data.get('jobs', []), many=True, max_length=self.batch_max_jobs
+        )
+        if serializer.is_valid():
+            jobs = serializer.save(created_by=request.user)
+            return StandardResponse.created(
+                f"{len(jobs)} jobs created successfully", JobListSerializer(jobs, many=True).data
+            )
+        return StandardResponse.error("Validation failed", serializer.errors)
+
+    @action(detail=True, methods=['post'])
+    def reserve(self, request, pk=None):
+        """Hold a slot on this job for its timeout_minutes."""
+        try:
+            job = Job.objects.get(pk=pk)
+        except Job.DoesNotExist:
+            return StandardResponse.error("Job not found", status_code=status.HTTP_404_NOT_FOUND)
+
+        reservation = slots.reserve_slot(job, request.user)
+        if reservation is None:
+            return StandardResponse.error("This job is no longer available.", status_code=status.HTTP_409_CONFLICT)
+
+        return StandardResponse.success("Slot reserved successfully", {
+            'job': str(job.pk),
+            'status': reservation.status,
+            'expires_at': reservation.expires_at,
+        })
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Give back a slot reserved with `reserve`."""
+        try:
+            job = Job.objects.get(pk=pk)
+        except Job.DoesNotExist:
+            return StandardResponse.error("Job not found", status_code=status.HTTP_404_NOT_FOUND)
+
+        if not slots.release_slot(job, request.user):
+            return StandardResponse.error("No open reservation for this job", status_code=status.HTTP_404_NOT_FOUND)
+        return StandardResponse.success("Reservation released successfully")
+
     def update(self, request, pk=None):
         if not request.user.is_staff:
             return StandardResponse.error("Only admin can update jobs", status_code=status.HTTP_403_FORBIDDEN)
@@ -133,9 +222,16 @@ class JobViewSet(viewsets.ModelViewSet):
             return StandardResponse.error("Job not found", status_code=status.HTTP_404_NOT_FOUND)
 
 
-class JobSubmissionViewSet(viewsets.ModelViewSet):
+class JobSubmissionViewSet(RateLimitHeadersMixin, viewsets.ModelViewSet):
     queryset = JobSubmission.objects.all()
     permission_classes = [IsAuthenticated]
+    throttle_classes = [PartnerRateThrottle]
+    throttle_scope = 'gigs.submissions'
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream proof images to disk with hashing and size caps instead of buffering them
+        request.upload_handlers = [ProofUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -143,18 +239,29 @@ class JobSubmissionViewSet(viewsets.ModelViewSet):
         return JobSubmissionSerializer
 
     def get_queryset(self):
-        queryset = JobSubmission.objects.select_related('job', 'freelancer', 'partner').prefetch_related('proofs')
+        # Schema generation runs the view with an anonymous user
+        if getattr(self, 'swagger_fake_view', False) or not self.request.user.is_authenticated:
+            return JobSubmission.objects.none()
+
+        queryset = JobSubmission.objects.select_related('job', 'freelancer', 'partner').prefetch_related(
+            self.proofs_prefetch()
+        )
 
         if self.request.user.is_staff:
             return queryset
 
         # Partners see submissions from their users
-        if self.request.user.user_type == 'partner':
+        if self.request.user.role == 'partner':
             return queryset.filter(partner=self.request.user)
 
         # Freelancers see only their submissions
         return queryset.filter(freelancer=self.request.user)
 
+    @staticmethod
+    def proofs_prefetch():
+        # ProofSubmissionSerializer reads proof_requirement and media on every proof
+        return Prefetch('proofs', queryset=ProofSubmission.objects.select_related('proof_requirement', 'media'))
+
     def list(self, request):
         submissions = self.get_queryset()
 
@@ -192,43 +299,23 @@ class JobSubmissionViewSet(viewsets.ModelViewSet):
             return StandardResponse.error("Submission already reviewed")
 
         with db_transaction.atomic():
+            # Only one of several concurrent reviews moves the submission out of pending
+            reviewed_at = timezone.now()
+            if not JobSubmission.objects.filter(pk=submission.pk, status='pending').update(
+                status='approved', reviewed_at=reviewed_at
+            ):
+                return StandardResponse.error("Submission already reviewed")
+
+            # Update job completed count; fails instead of overshooting freelancers_needed
+            if not slots.fill_slot(submission.job, submission.freelancer):
+                db_transaction.set_rollback(True)
+                return StandardResponse.error("This job has no open slots left", status_code=status.HTTP_409_CONFLICT)
+
             submission.status = 'approved'
-            submission.reviewed_at = timezone.now()
-            submission.save()
-
-            # Update job completed count
-            job = submission.job
-            job.freelancers_completed += 1
-            if job.freelancers_completed >= job.freelancers_needed:
-                job.status = 'completed'
-            job.save()
-
-            # Add earnings to freelancer
-            freelancer = submission.freelancer
-            freelancer.balance += submission.freelancer_earning
-            freelancer.save()
-
-            Transaction.objects.create(
-                user=freelancer,
-                transaction_type='earning',
-                amount=submission.freelancer_earning,
-                description=f"Earning from job: {job.title}",
-                job_submission=submission
-            )
+            submission.reviewed_at = reviewed_at
 
-            # Add commission to partner if exists
-            if submission.partner:
-                partner = submission.partner
-                partner.balance += submission.partner_earning
-                partner.save()
-
-                Transaction.objects.create(
-                    user=partner,
-                    transaction_type='commission',
-                    amount=submission.partner_earning,
-                    description=f"Commission from job: {job.title}",
-                    job_submission=submission
-                )
+            # Earning and commission transactions are recorded by the task worker
+            enqueue('gigs.record_submission_transactions', {'submission_id': str(submission.pk)})
 
         serializer = self.get_serializer(submission)
         return StandardResponse.success("Submission approved successfully", serializer.data)
@@ -243,17 +330,162 @@ class JobSubmissionViewSet(viewsets.ModelViewSet):
         if submission.status != 'pending':
             return StandardResponse.error("Submission already reviewed")
 
-        submission.status = 'rejected'
-        submission.reviewed_at = timezone.now()
-        submission.admin_note = request.data.get('admin_note', '')
-        submission.save()
+        with db_transaction.atomic():
+            submission.status = 'rejected'
+            submission.reviewed_at = timezone.now()
+            submission.admin_note = request.data.get('admin_note', '')
+            # Conditional UPDATE so a concurrent approval can't be overwritten
+            if not JobSubmission.objects.filter(pk=submission.pk, status='pending').update(
+                status=submission.status, reviewed_at=submission.reviewed_at, admin_note=submission.admin_note
+            ):
+                return StandardResponse.error("Submission already reviewed")
+
+            slots.release_slot(submission.job, submission.freelancer)
 
         serializer = self.get_serializer(submission)
         return StandardResponse.success("Submission rejected successfully", serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], url_path='review-queue')
+    def review_queue(self, request):
+        """
+        Submissions awaiting review, oldest first, with a cursor for the next page.
+        ?status= (default pending), ?job=, ?page_size= (max 200), ?cursor=
+        """
+        submissions = JobSubmission.objects.filter(
+            status=request.query_params.get('status', 'pending')
+        ).select_related('job', 'freelancer').prefetch_related(self.proofs_prefetch())
+
+        job_id = request.query_params.get('job')
+        if job_id:
+            submissions = submissions.filter(job_id=job_id)
+
+        paginator = ReviewQueuePagination()
+        page = paginator.paginate_queryset(submissions, request, view=self)
+        serializer = JobSubmissionSerializer(page, many=True, context=self.get_serializer_context())
+        return StandardResponse.success("Review queue retrieved successfully", {
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': serializer.data,
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], url_path='bulk-review')
+    def bulk_review(self, request):
+        """
+        Approve or reject many submissions at once:
+        {"ids": [...], "action": "approve" | "reject", "admin_note": ""}
+        Reports an outcome per id: approved, rejected, no_slots,
+        already_reviewed or not_found.
+        """
+        serializer = BulkReviewSerializer(data=request.data)
+        if not serializer.is_valid():
+            return StandardResponse.error("Validation failed", serializer.errors)
+
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        review_action = serializer.validated_data['action']
+        now = timezone.now()
+
+        with db_transaction.atomic():
+            submissions = list(
+                JobSubmission.objects.select_for_update(of=('self',))
+                .filter(id__in=ids)
+                .select_related('job')
+                .only(
+                    'id', 'status', 'freelancer_id', 'partner_id', 'submitted_at',
+                    'freelancer_earning', 'partner_earning', 'job__id', 'job__title',
+                )
+                .order_by('submitted_at')
+            )
+            outcomes = {submission_id: 'not_found' for submission_id in ids}
+            pending = []
+            for submission in submissions:
+                if submission.status == 'pending':
+                    pending.append(submission)
+                else:
+                    outcomes[submission.id] = 'already_reviewed'
+
+            # Open reservations held by these freelancers, keyed by (job, freelancer)
+            reservations = {
+                (job_id, freelancer_id): reservation_id
+                for reservation_id, job_id, freelancer_id in JobReservation.objects.filter(
+                    job_id__in={submission.job_id for submission in pending},
+                    freelancer_id__in={submission.freelancer_id for submission in pending},
+                    status__in=JobReservation.OPEN_STATUSES,
+                ).values_list('id', 'job_id', 'freelancer_id')
+            }
+
+            by_job = {}
+            for submission in pending:
+                by_job.setdefault(submission.job_id, []).append(submission)
+
+            reviewed = []
+            closed_reservations = []
+            if review_action == 'approve':
+                for job_id in sorted(by_job):
+                    group = by_job[job_id]
+                    holders = [s for s in group if (job_id, s.freelancer_id) in reservations]
+                    others = [s for s in group if (job_id, s.freelancer_id) not in reservations]
+                    granted = slots.fill_slots(job_id, len(holders), len(others))
+                    approved = holders + others[:granted]
+                    for submission in others[granted:]:
+                        outcomes[submission.id] = 'no_slots'
+                    for submission in approved:
+                        outcomes[submission.id] = 'approved'
+                        reservation_id = reservations.get((job_id, submission.freelancer_id))
+                        if reservation_id:
+                            closed_reservations.append(reservation_id)
+                    reviewed.extend(approved)
+
+                Job.objects.filter(
+                    pk__in=by_job.keys(), freelancers_completed__gte=F('freelancers_needed')
+                ).exclude(status='completed').update(status='completed')
+                JobReservation.objects.filter(id__in=closed_reservations).update(status='completed')
+                JobSubmission.objects.filter(id__in=[s.id for s in reviewed]).update(
+                    status='approved', reviewed_at=now
+                )
+                Transaction.objects.record_many([
+                    transaction
+                    for submission in reviewed
+                    for transaction in Transaction.for_submission(submission, submission.job.title)
+                ])
+            else:
+                released_per_job = {}
+                for submission in pending:
+                    outcomes[submission.id] = 'rejected'
+                    reservation_id = reservations.get((submission.job_id, submission.freelancer_id))
+                    if reservation_id:
+                        closed_reservations.append(reservation_id)
+                        released_per_job[submission.job_id] = released_per_job.get(submission.job_id, 0) + 1
+                reviewed = pending
+
+                JobReservation.objects.filter(id__in=closed_reservations).update(status='released')
+                for job_id, released in released_per_job.items():
+                    Job.objects.filter(pk=job_id).update(
+                        freelancers_reserved=F('freelancers_reserved') - released
+                    )
+                if released_per_job:
+                    listing.changed()
+                JobSubmission.objects.filter(id__in=[s.id for s in reviewed]).update(
+                    status='rejected', reviewed_at=now,
+                    admin_note=serializer.validated_data['admin_note']
+                )
+
+        summary = {}
+        for outcome in outcomes.values():
+            summary[outcome] = summary.get(outcome, 0) + 1
+        past_tense = {'approve': 'approved', 'reject': 'rejected'}[review_action]
+        return StandardResponse.success(
+            f"{len(reviewed)} submission(s) {past_tense}",
+            {
+                'summary': summary,
+                'results': [{'id': str(submission_id), 'outcome': outcome} for submission_id, outcome in outcomes.items()],
+            }
+        )
+
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('balance_account').prefetch_related(
+        Prefetch('api_keys', queryset=PartnerAPIKey.objects.filter(is_active=True), to_attr='active_api_keys')
+    )
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
@@ -269,14 +501,19 @@ class UserViewSet(viewsets.ModelViewSet):
             return StandardResponse.error("Only admin can register partners", status_code=status.HTTP_403_FORBIDDEN)
 
         data = request.data.copy()
-        data['user_type'] = 'partner'
+        data['role'] = 'partner'
 
         serializer = self.get_serializer(data=data)
         if serializer.is_valid():
-            user = serializer.save()
-            user.set_password(data.get('password'))
-            user.save()
-            return StandardResponse.created("Partner registered successfully", serializer.data)
+            with db_transaction.atomic():
+                user = serializer.save()
+                user.set_password(data.get('password'))
+                user.save()
+                api_key, raw_key = PartnerAPIKey.generate(user, name="Default")
+
+            # The raw key is only ever shown here; we keep just its hash
+            response_data = dict(serializer.data, api_token=raw_key)
+            return StandardResponse.created("Partner registered successfully", response_data)
         return StandardResponse.error("Validation failed", serializer.errors)
 
 
@@ -286,6 +523,8 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Transaction.objects.none()
         return Transaction.objects.filter(user=self.request.user).order_by('-created_at')
 
     def list(self, request):